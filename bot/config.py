@@ -1,17 +1,41 @@
 import os
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from typing import Dict
 
 
 @dataclass(frozen=True)
 class Settings:
     """Bot settings loaded from environment variables."""
     token: str
+    http_limit: int = 100
+    http_limit_per_host: int = 10
+    http_dns_cache_ttl: int = 300
+    http_keepalive_timeout: float = 30.0
+    http_host_limits: Dict[str, int] = field(default_factory=dict)
+
+
+def _parse_host_limits(raw: str) -> Dict[str, int]:
+    """Parse `host=limit,host=limit` into a dict, skipping malformed entries."""
+    limits = {}
+    for item in raw.split(","):
+        host, _, value = item.partition("=")
+        host = host.strip().lower()
+        if host and value.strip().isdigit():
+            limits[host] = int(value)
+    return limits
 
 
 def load_settings() -> Settings:
     """Load settings from environment variables."""
     token = os.getenv("DISCORD_TOKEN", "")
-    return Settings(token=token)
+    return Settings(
+        token=token,
+        http_limit=int(os.getenv("HTTP_POOL_LIMIT", "100")),
+        http_limit_per_host=int(os.getenv("HTTP_POOL_LIMIT_PER_HOST", "10")),
+        http_dns_cache_ttl=int(os.getenv("HTTP_DNS_CACHE_TTL", "300")),
+        http_keepalive_timeout=float(os.getenv("HTTP_KEEPALIVE_TIMEOUT", "30")),
+        http_host_limits=_parse_host_limits(os.getenv("HTTP_HOST_LIMITS", "")),
+    )
 
 
-settings = load_settings()
\ No newline at end of file
+settings = load_settings()
@@ -0,0 +1,116 @@
+"""Shared HTTP client used by every feature cog.
+
+A single `aiohttp.ClientSession` lives for the whole bot lifetime so that
+connections to GitHub, Outline and DeepSeek are pooled and kept alive instead
+of paying a TCP + TLS handshake on every request.
+"""
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Optional
+from urllib.parse import urlsplit
+
+import aiohttp
+
+from bot.config import Settings, load_settings
+
+logger = logging.getLogger(__name__)
+
+
+class HttpClient:
+    """Bot-lifetime HTTP client with per-host pooling and concurrency limits."""
+
+    def __init__(
+        self,
+        limit: int = 100,
+        limit_per_host: int = 10,
+        dns_cache_ttl: int = 300,
+        keepalive_timeout: float = 30.0,
+        host_limits: Optional[Dict[str, int]] = None,
+    ):
+        self._limit = limit
+        self._limit_per_host = limit_per_host
+        self._dns_cache_ttl = dns_cache_ttl
+        self._keepalive_timeout = keepalive_timeout
+        self._host_limits = {host.lower(): n for host, n in (host_limits or {}).items() if n > 0}
+        self._host_semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    @classmethod
+    def from_settings(cls, settings: Settings) -> "HttpClient":
+        return cls(
+            limit=settings.http_limit,
+            limit_per_host=settings.http_limit_per_host,
+            dns_cache_ttl=settings.http_dns_cache_ttl,
+            keepalive_timeout=settings.http_keepalive_timeout,
+            host_limits=settings.http_host_limits,
+        )
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        """Return the pooled session, creating it lazily inside the running loop."""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self._limit,
+                limit_per_host=self._limit_per_host,
+                ttl_dns_cache=self._dns_cache_ttl,
+                keepalive_timeout=self._keepalive_timeout,
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=30),
+            )
+        return self._session
+
+    def _semaphore_for(self, url: str) -> Optional[asyncio.Semaphore]:
+        host = (urlsplit(url).hostname or "").lower()
+        limit = self._host_limits.get(host)
+        if not limit:
+            return None
+        semaphore = self._host_semaphores.get(host)
+        if semaphore is None:
+            semaphore = self._host_semaphores[host] = asyncio.Semaphore(limit)
+        return semaphore
+
+    @asynccontextmanager
+    async def request(self, method: str, url: str, **kwargs) -> AsyncIterator[aiohttp.ClientResponse]:
+        """Issue a request on the shared session, honouring the host's concurrency limit."""
+        semaphore = self._semaphore_for(url)
+        if semaphore is None:
+            async with self.session.request(method, url, **kwargs) as resp:
+                yield resp
+            return
+        async with semaphore:
+            async with self.session.request(method, url, **kwargs) as resp:
+                yield resp
+
+    def get(self, url: str, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    async def close(self) -> None:
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+
+_client: Optional[HttpClient] = None
+
+
+def get_http_client() -> HttpClient:
+    """Return the process-wide HTTP client."""
+    global _client
+    if _client is None:
+        _client = HttpClient.from_settings(load_settings())
+    return _client
+
+
+async def close_http_client() -> None:
+    """Close the process-wide HTTP client. Safe to call more than once."""
+    global _client
+    if _client is not None:
+        await _client.close()
+        logger.info("HTTP client closed")
+        _client = None
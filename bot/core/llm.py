@@ -0,0 +1,151 @@
+"""Streaming chat completions from DeepSeek, rendered progressively into Discord messages."""
+import json
+import logging
+import os
+import time
+from typing import AsyncIterator, Callable, List, Optional
+
+import aiohttp
+import discord
+
+from bot.core.http import get_http_client
+
+logger = logging.getLogger(__name__)
+
+DEEPSEEK_CHAT_URL = "https://api.deepseek.com/v1/chat/completions"
+DISCORD_MESSAGE_LIMIT = 2000
+# Discord allows roughly 5 edits per 5 seconds per channel; stay a bit under that
+EDIT_INTERVAL = 1.2
+
+
+class LLMError(Exception):
+    """Raised when the chat completion endpoint rejects or breaks off a request."""
+
+
+async def stream_chat_completion(
+    messages: List[dict],
+    model: str = "deepseek-chat",
+    api_key: Optional[str] = None,
+    url: str = DEEPSEEK_CHAT_URL,
+    timeout: float = 60,
+    **params,
+) -> AsyncIterator[str]:
+    """
+    Yield content deltas from an OpenAI-compatible chat completion as they arrive.
+
+    The endpoint is called with `stream: true` and its server-sent events are
+    parsed line by line until the `[DONE]` sentinel.
+    """
+    api_key = (api_key or os.getenv("DEEPSEEK_API_KEY", "")).strip()
+    if not api_key:
+        raise LLMError("DEEPSEEK_API_KEY is not set")
+
+    payload = {"model": model, "messages": messages, "stream": True, **params}
+    headers = {
+        "Authorization": f"Bearer {api_key}",
+        "Content-Type": "application/json",
+        "Accept": "text/event-stream",
+    }
+    client = get_http_client()
+    async with client.post(url, json=payload, headers=headers, timeout=aiohttp.ClientTimeout(total=timeout)) as resp:
+        if resp.status != 200:
+            raise LLMError(f"Chat completion non-200: {resp.status} - {await resp.text()}")
+        async for raw in resp.content:
+            line = raw.decode("utf-8", errors="replace").strip()
+            if not line.startswith("data:"):
+                continue  # blank separators, comments and keep-alives
+            data = line[len("data:"):].strip()
+            if data == "[DONE]":
+                return
+            try:
+                event = json.loads(data)
+            except json.JSONDecodeError:
+                logger.debug("Skipping malformed SSE event: %s", data)
+                continue
+            choices = event.get("choices") or []
+            delta = ((choices[0] or {}).get("delta") or {}).get("content") if choices else None
+            if delta:
+                yield delta
+
+
+async def chat_completion(messages: List[dict], **kwargs) -> str:
+    """Collect a streamed chat completion into one string."""
+    parts = []
+    async for delta in stream_chat_completion(messages, **kwargs):
+        parts.append(delta)
+    return "".join(parts).strip()
+
+
+async def stream_to_message(
+    destination: discord.abc.Messageable,
+    chunks: AsyncIterator[str],
+    placeholder: str = "⏳ Generating...",
+    render: Callable[[str], str] = lambda text: text,
+    interval: float = EDIT_INTERVAL,
+) -> str:
+    """
+    Post a placeholder message and edit it as `chunks` stream in.
+
+    Edits are throttled to one per `interval` seconds (the first chunk is shown
+    immediately). `render` wraps the accumulated text, e.g. to add a heading or
+    code fence; it may change the text's length, so splits are chosen by
+    measuring the rendered result. If that outgrows a Discord message, the
+    current message is finalized and the rest continues in a new one. Returns
+    the full text.
+    """
+    message = await destination.send(placeholder)
+    text = ""
+    offset = 0  # start of the text shown in the current message
+    shown = None
+    last_edit = 0.0
+
+    def fits(end: int) -> bool:
+        return len(render(text[offset:end])) <= DISCORD_MESSAGE_LIMIT
+
+    def split_point() -> int:
+        """Longest prefix that renders within the limit, preferably ending on a newline; never empty."""
+        lo, hi = offset + 1, len(text)
+        if not fits(lo):
+            return lo  # render alone is over the limit; move on one character at a time
+        while lo < hi:
+            mid = (lo + hi + 1) // 2
+            if fits(mid):
+                lo = mid
+            else:
+                hi = mid - 1
+        # the newline ends this message, so the next one does not start with a blank line
+        newline = text.rfind("\n", offset, lo)
+        return newline + 1 if newline > offset else lo
+
+    async def show(final: bool = False):
+        nonlocal message, offset, shown, last_edit
+        body = render(text[offset:] or ("" if final else "…"))
+        while len(body) > DISCORD_MESSAGE_LIMIT and offset < len(text):
+            cut = split_point()
+            await message.edit(content=render(text[offset:cut])[:DISCORD_MESSAGE_LIMIT])
+            offset = cut
+            shown = render(text[offset:] or "…")[:DISCORD_MESSAGE_LIMIT]
+            message = await destination.send(shown)
+            body = render(text[offset:] or ("" if final else "…"))
+        body = body[:DISCORD_MESSAGE_LIMIT]
+        if body != shown:
+            await message.edit(content=body)
+            shown = body
+        last_edit = time.monotonic()
+
+    try:
+        async for delta in chunks:
+            text += delta
+            if shown is None or time.monotonic() - last_edit >= interval:
+                await show()
+    except Exception:
+        if text:
+            await show(final=True)
+        else:
+            await message.edit(content="⚠️ Generation failed.")
+        raise
+    if text:
+        await show(final=True)
+    else:
+        await message.edit(content="⚠️ No response was generated.")
+    return text
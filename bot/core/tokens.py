@@ -0,0 +1,11 @@
+"""Prompt budgeting helpers shared by the features that talk to an LLM."""
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Cheap token estimate without a tokenizer: about four characters per token for
+    English prose and code, never less than one token per whitespace-separated word.
+    """
+    if not text:
+        return 0
+    return max((len(text) + 3) // 4, len(text.split()))
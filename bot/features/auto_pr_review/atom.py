@@ -0,0 +1,90 @@
+import xml.etree.ElementTree as ET
+from typing import AsyncIterable, List, Optional, Tuple
+
+ATOM = "{http://www.w3.org/2005/Atom}"
+
+
+def _entry_dict(entry: ET.Element) -> dict:
+    link = entry.find(f"{ATOM}link")
+    return {
+        "id": entry.findtext(f"{ATOM}id"),
+        "title": entry.findtext(f"{ATOM}title"),
+        "link": link.get("href") if link is not None else None,
+        "updated": entry.findtext(f"{ATOM}updated"),
+        "author": entry.findtext(f"{ATOM}author/{ATOM}name"),
+    }
+
+
+class AtomEntryParser:
+    """
+    Incremental Atom parser built on XMLPullParser.
+
+    Feed it the response body chunk by chunk. Each finished <entry> is turned
+    into a dict and then detached from the tree, so memory does not grow with
+    feed size. Once the entry with id `stop_at` is seen, `done` is set and the
+    rest of the document can be left unread.
+    """
+
+    def __init__(self, stop_at: Optional[str] = None):
+        self.stop_at = stop_at
+        self.entries: List[dict] = []
+        self.done = False
+        self.reached_stop = False
+        self._parser = ET.XMLPullParser(events=("start", "end"))
+        self._root: Optional[ET.Element] = None
+
+    def feed(self, data: bytes):
+        if self.done:
+            return
+        self._parser.feed(data)
+        for event, elem in self._parser.read_events():
+            if event == "start":
+                if self._root is None:
+                    self._root = elem
+                continue
+            if elem.tag != f"{ATOM}entry":
+                continue
+            entry = _entry_dict(elem)
+            # free the finished entry; the feed root would otherwise keep every one alive
+            elem.clear()
+            if self._root is not None:
+                self._root.remove(elem)
+            if self.stop_at is not None and entry["id"] == self.stop_at:
+                self.done = self.reached_stop = True
+                return
+            self.entries.append(entry)
+
+    def close(self):
+        if not self.done:
+            self._parser.close()
+            self.done = True
+
+
+async def read_new_entries(chunks: AsyncIterable[bytes], stop_at: Optional[str] = None) -> Tuple[List[dict], bool]:
+    """
+    Parse entries from a streamed feed, newest first, up to (excluding) `stop_at`.
+
+    Returns the entries and whether `stop_at` was reached. A malformed feed yields
+    no entries, like `parse_atom_entries`.
+    """
+    parser = AtomEntryParser(stop_at)
+    try:
+        async for chunk in chunks:
+            parser.feed(chunk)
+            if parser.done:
+                break
+        parser.close()
+    except ET.ParseError:
+        return [], False
+    return parser.entries, parser.reached_stop
+
+
+def parse_atom_entries(xml_text: str) -> List[dict]:
+    """Return list of entries as dicts with keys id,title,link,updated,author"""
+    parser = AtomEntryParser()
+    try:
+        parser.feed(xml_text.encode("utf-8") if isinstance(xml_text, str) else xml_text)
+        parser.close()
+    except ET.ParseError:
+        return []
+    return parser.entries
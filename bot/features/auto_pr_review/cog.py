@@ -1,29 +1,77 @@
 from urllib import request
 from discord.ext import tasks, commands
 import aiohttp
-import aiofiles
-import xml.etree.ElementTree as ET
 import re
 import os
-import json
 import asyncio
+import time
+from datetime import datetime
+from contextlib import AsyncExitStack, asynccontextmanager
+
+from bot.core.http import get_http_client
+from bot.core.llm import stream_chat_completion, stream_to_message
+from bot.core.singleflight import SingleFlight
+from bot.features.auto_pr_review.atom import parse_atom_entries, read_new_entries
+from bot.features.auto_pr_review.conditional import ValidatorCache, validator_headers
+from bot.features.auto_pr_review.diff_stream import parse_diff_stream
+from bot.features.auto_pr_review.diff_summary import summarize_diff
+from bot.features.auto_pr_review.feed_scheduler import FeedScheduler
+from bot.features.auto_pr_review.ignore_matcher import IgnoreMatcher
+from bot.features.auto_pr_review.review_cache import ReviewCache
+from bot.features.auto_pr_review.store import TrackerStore
+from bot.features.auto_pr_review.webhooks import WebhookServer
 
 
 DEEPSEEK_API_KEY = os.getenv("DEEPSEEK_API_KEY")  # Deep Seek API
-MAX_LINES = 50  # Limit of max diff changes sent to the deepseek API to save tokens
+DIFF_READ_LINES = 2000  # changed lines read from a diff before it is summarized
+DIFF_FILE_LINES = 200  # changed lines read per file, so one large file leaves room for the others
+DIFF_TOKEN_BUDGET = int(os.getenv("REVIEW_DIFF_TOKENS", "1500"))  # diff tokens sent to the deepseek API
+PROMPT_VERSION = 2  # bump when the review prompt changes so cached reviews are not reused
 MAX_TOKEN = 150  # Limit for token usage
-STORAGE_PATH = os.path.join(os.path.dirname(__file__), "tracked_repos.json")
+STORAGE_PATH = os.path.join(os.path.dirname(__file__), "tracked_repos.json")  # legacy, migrated into DB_PATH
+DB_PATH = os.getenv("AUTO_PR_REVIEW_DB", os.path.join(os.path.dirname(__file__), "tracked_repos.sqlite3"))
+FEED_TICK_SECONDS = 15  # how often the poller checks which feeds are due
+REVIEW_CONCURRENCY = int(os.getenv("REVIEW_CONCURRENCY", "4"))  # commits reviewed at once
+REVIEW_BATCH_LIMIT = max(1, int(os.getenv("REVIEW_BATCH_LIMIT", "10")))  # commits reviewed per push
+BACKFILL_CONCURRENCY = 8  # PR detail requests in flight during !backfillstats
+BACKFILL_MAX_PAGES = 20  # pages of 100 PRs per repo
+WEBHOOK_SECRET = os.getenv("GITHUB_WEBHOOK_SECRET")  # enables the webhook receiver when set
 
 
 GITHUB_PAT = os.getenv(
     "GITHUB_PAT"
 )  # github pat is needed to make requests to GitHub API
 
+# identical concurrent GETs (e.g. several users reviewing the same PR) share one request
+github_flight = SingleFlight()
+# ETag / Last-Modified of recent GETs, so unchanged resources come back as a cheap 304
+github_validators = ValidatorCache()
+
 #retry/backoff for transient errors + rate limits
-async def api_call_retry(session, method, url, retries=3, backoff_factor=1, headers=None, **kwargs):
+async def api_call_retry(method, url, retries=3, backoff_factor=1, headers=None, **kwargs):
+        if method == "GET" and not kwargs:
+            key = (url, tuple(sorted((headers or {}).items())))
+            return await github_flight.do(key, lambda: _conditional_get(url, retries, backoff_factor, headers))
+        return await _api_call_retry(method, url, retries, backoff_factor, headers, **kwargs)
+
+async def _conditional_get(url, retries, backoff_factor, headers):
+        # the same URL can be fetched as JSON or as a diff, so the Accept header is part of the key
+        key = (url, (headers or {}).get("Accept"))
+        conditional_headers = {**(headers or {}), **github_validators.request_headers(key)}
+        resp = await _api_call_retry("GET", url, retries, backoff_factor, conditional_headers, validator_key=key)
+        if resp.status == 304:
+            cached = github_validators.replay(key)
+            if cached is not None:
+                return cached
+            # the cached body was evicted in the meantime, fetch it unconditionally
+            resp = await _api_call_retry("GET", url, retries, backoff_factor, headers, validator_key=key)
+        return resp
+
+async def _api_call_retry(method, url, retries=3, backoff_factor=1, headers=None, validator_key=None, **kwargs):
+        client = get_http_client()
         for attempt in range(retries + 1):
             try:
-                async with session.request(method, url, headers=headers, **kwargs) as resp:
+                async with client.request(method, url, headers=headers, **kwargs) as resp:
                     if resp.status == 429:
                         retry_after = resp.headers.get("retry after")
                         if retry_after:
@@ -35,42 +83,125 @@ async def api_call_retry(session, method, url, retries=3, backoff_factor=1, head
                         await asyncio.sleep(backoff_factor * (2** attempt))
                         continue
 
+                    # read the body while the connection is still held so callers can
+                    # use .json()/.text() after it has been returned to the pool
+                    body = await resp.read()
+                    if validator_key is not None and resp.status == 200:
+                        # read() refuses once the response is released, so keep the body now
+                        github_validators.store(validator_key, resp.headers, body, resp.charset)
                     return resp
             except (aiohttp.ClientError, asyncio.TimeoutError):
                 await asyncio.sleep(backoff_factor * (2 ** attempt))
         raise Exception(f"api request failed after {retries} retries")
 
 
-#async functions for requests
-async def get_file_paths(url, headers):
-            async with aiohttp.ClientSession() as session:
-                resp = await api_call_retry(session, "GET", url, headers=headers)
-                return resp
-                
+IGNORE_PATTERNS = {
+    ".md",
+    ".git",
+    "LICENSE",
+    ".txt",
+    ".env",
+    "mock",
+    "test_data",
+    "sample_data",
+    ".png",
+    ".jpg",
+    ".jpeg",
+    ".gif",
+    ".pdf",
+    ".zip",
+    ".exe",
+    ".dll",
+    ".bin",
+    ".csv",
+    ".mp3",
+    ".mp4",
+}
+
+
+IGNORE_MATCHER = IgnoreMatcher(IGNORE_PATTERNS)
+
+
+def is_ignored_path(path):
+    """True for docs, data, binaries and other files not worth sending to the AI."""
+    return IGNORE_MATCHER.matches(path)
+
+
+# changed lines that carry no review value (imports, comments, blank lines)
+def keep_line(line):
+    ignore_prefixes = ("import ", "from ", "#", "'''", '"""')
+    return bool(line) and not line.startswith(ignore_prefixes)
+
+
+async def replay_text(text):
+    """Yield an already generated review as a single chunk, for stream_to_message."""
+    yield text
+
+
+# pull_request webhook actions that trigger a review
+PR_REVIEW_ACTIONS = {"opened", "reopened", "synchronize", "ready_for_review"}
+
+
+def iso_timestamp(value):
+    """Convert a GitHub ISO-8601 timestamp ("2024-05-01T12:00:00Z") to unix seconds."""
+    return int(datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp())
+
+
+def commit_entry(commit):
+    """Turn a push webhook commit into the same dict shape as a commits.atom entry."""
+    author = commit.get("author") or {}
+    return {
+        "id": f"tag:github.com,2008:Grit::Commit/{commit['id']}",
+        "title": (commit.get("message") or "").split("\n", 1)[0],
+        "link": commit.get("url"),
+        "updated": commit.get("timestamp"),
+        "author": author.get("username") or author.get("name"),
+    }
+
+
+# like api_call_retry for GETs, but hands the response over unread so large bodies can be streamed
+@asynccontextmanager
+async def stream_call_retry(url, retries=3, backoff_factor=1, headers=None):
+        client = get_http_client()
+        for attempt in range(retries + 1):
+            stack = AsyncExitStack()
+            try:
+                resp = await stack.enter_async_context(client.request("GET", url, headers=headers))
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                await stack.aclose()
+                await asyncio.sleep(backoff_factor * (2 ** attempt))
+                continue
+            if resp.status in {429, 500, 502, 503, 504}:
+                await stack.aclose()
+                await asyncio.sleep(backoff_factor * (2 ** attempt))
+                continue
+            async with stack:
+                yield resp
+            return
+        raise Exception(f"api request failed after {retries} retries")
+
+
+#async functions for requests (all share the bot-wide pooled session)
 async def get_commit_information(url, headers):
-        async with aiohttp.ClientSession() as session:
-            resp = await api_call_retry(session, "GET", url, headers=headers)
-            return resp
+        return await api_call_retry("GET", url, headers=headers)
             
 async def analyze_with_ai(url, headers, json, timeout):
-        async with aiohttp.ClientSession() as session:
-            resp = await api_call_retry(session, "POST", url, headers=headers, json=json, timeout=timeout)
-            return resp
+        return await api_call_retry("POST", url, headers=headers, json=json, timeout=aiohttp.ClientTimeout(total=timeout))
             
 async def get_diff(url, headers):
-        async with aiohttp.ClientSession() as session:
-            resp = await api_call_retry(session, "GET", url, headers=headers)
-            return resp
+        return await api_call_retry("GET", url, headers=headers)
             
+async def list_pull_requests(repo, page, headers):
+        # one page of a repo's PRs in any state, 100 per page
+        return await api_call_retry(
+            "GET", f"https://api.github.com/repos/Electrium-Mobility/{repo}/pulls?state=all&per_page=100&page={page}", headers=headers
+        )
+
 async def get_pulls(url):
-        async with aiohttp.ClientSession() as session:
-            resp = await api_call_retry(session, "GET", url)
-            return resp
+        return await api_call_retry("GET", url)
             
 async def get_feed(url):
-        async with aiohttp.ClientSession() as session:
-            resp = await api_call_retry(session, "GET", url)
-            return resp
+        return await api_call_retry("GET", url)
 
 class AutoPRReviewCog(commands.Cog):
     """Auto PR Review Assistant feature placeholder implementation."""
@@ -78,59 +209,49 @@ class AutoPRReviewCog(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
         self.tracked_feeds = {}
-
+        self.store = TrackerStore(DB_PATH, json_path=STORAGE_PATH)
+        self.feed_not_modified = 0
+        self.webhook_server = None
+        self.review_cache = ReviewCache(
+            os.getenv("REVIEW_CACHE_DIR", os.path.join(os.path.dirname(__file__), "review_cache")),
+            max_bytes=int(float(os.getenv("REVIEW_CACHE_MAX_MB", "20")) * 1_000_000),
+        )
+        # caps concurrent diff fetches + AI reviews across all feeds
+        self.review_semaphore = asyncio.Semaphore(REVIEW_CONCURRENCY)
+        self.feed_scheduler = FeedScheduler(
+            self.poll_feed,
+            min_interval=float(os.getenv("FEED_POLL_MIN_INTERVAL", "60")),
+            max_interval=float(os.getenv("FEED_POLL_MAX_INTERVAL", "900")),
+            concurrency=int(os.getenv("FEED_POLL_CONCURRENCY", "16")),
+        )
 
     async def cog_load(self):
         await self.load_tracked_feeds()
+        if WEBHOOK_SECRET:
+            self.webhook_server = WebhookServer(
+                self.handle_webhook,
+                WEBHOOK_SECRET,
+                host=os.getenv("GITHUB_WEBHOOK_HOST", "0.0.0.0"),
+                port=int(os.getenv("GITHUB_WEBHOOK_PORT", "8080")),
+                path=os.getenv("GITHUB_WEBHOOK_PATH", "/github/webhook"),
+            )
+            try:
+                await self.webhook_server.start()
+            except Exception as e:
+                # e.g. the port is taken: keep the cog (and polling at full rate) running
+                print(f"GitHub webhook receiver could not start, relying on polling: {e}")
+                self.webhook_server = None
+            else:
+                # webhooks deliver changes immediately; keep polling only as a slow safety net
+                self.feed_scheduler.min_interval = self.feed_scheduler.max_interval
         self.poll_atom_feeds.start()
 
-    # method that returns files to ignore when putting it into ai
-    async def ignore_files(self, repo):
-
-        headers={
-                "Authorization": f"token {GITHUB_PAT}",
-                "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_8_2) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/29.0.1521.3 Safari/537.36",
-            }
-        raw_response = await get_file_paths(f"https://api.github.com/repos/Electrium-Mobility/{repo}/git/trees/main?recursive=1", headers)
-
-        if raw_response.status != 200:
-            print(f"Error: {raw_response.status}")
-            return
-
-        response_json = await raw_response.json()
-
-        paths = [item["path"] for item in response_json["tree"]]
-
-        ignore_patterns = {
-            ".md",
-            ".git",
-            "LICENSE",
-            ".txt",
-            ".env",
-            "mock",
-            "test_data",
-            "sample_data",
-            ".png",
-            ".jpg",
-            ".jpeg",
-            ".gif",
-            ".pdf",
-            ".zip",
-            ".exe",
-            ".dll",
-            ".bin",
-            ".csv",
-            ".mp3",
-            ".mp4",
-        }
-
-        ignore_files = [
-            path
-            for path in paths
-            if any(pattern in path for pattern in ignore_patterns)
-        ]
-
-        return ignore_files
+    async def cog_unload(self):
+        self.poll_atom_feeds.cancel()
+        await self.feed_scheduler.close()
+        if self.webhook_server is not None:
+            await self.webhook_server.stop()
+        await self.store.close()
 
     # method to get number of additions and deletions
     async def commit_information(self, repo, commit_sha):
@@ -152,98 +273,70 @@ class AutoPRReviewCog(commands.Cog):
         print(f"Total Number of Deletions are {deleted_lines}.")
         print(f"Total Number of Additions are {added_lines}.")
 
-    # method to remove unimportant lines from diff changes
-    def filter_lines(self, lines):
-        ignore_prefixes = ("import ", "from ", "#", "'''", '"""')
-        return [
-            l for l in lines if l.strip() and not l.strip().startswith(ignore_prefixes)
-        ]
-
-    # method to extract only the diff changes from diff_text
-    def extract_changes(self, diff_text):
-        added_lines = []
-        removed_lines = []
-
-        for line in diff_text.splitlines():
-            if line.startswith("+++") or line.startswith("---"):
-                continue
-
-            ## Only add the lines the begin with + or -
-            if line.startswith("+"):
-                added_lines.append(line[1:].strip())
-            elif line.startswith("-"):
-                removed_lines.append(line[1:].strip())
+    # method to build the chat messages for a review of the extracted diff changes
+    def review_messages(self, summary):
+        prompt = f"""
+            You are an experienced senior software engineer performing an code review.
+
+            The diff below is grouped by file (### path, with added/removed line counts).
+            Under each hunk header (@@ ...), lines starting with - were removed and lines
+            starting with + were added. Imports, comments and blank lines are left out, and
+            large diffs are sampled, so omitted hunks and files are noted.
+
+            -----------------------------
+{summary}
+            -----------------------------
+
+            Your task:
+            1. **Summarize** the key functional and structural changes in plain English.  
+            2. **Explain** the purpose or motivation behind the change if possible.  
+            3. **Identify** any potential issues (bugs, performance, style, or security risks).  
+            4. **Suggest** specific improvements or refactorings if relevant.  
+            5. **Generate a Recommendation Score (0–100)** indicating how ready this pull request is for approval, where:
+                            - 90–100: Ready to merge (high quality, minimal issues)
+                            - 70–89: Acceptable with minor improvements
+                            - 50–69: Needs moderate revisions before approval
+                            - Below 50: Requires major changes or rework
+
+
+            NOTE:Keep the tone concise, constructive, and focused on practical insights.
+            NOTE: Use bullet points or short paragraphs for readability.
+            NOTE: Divide your suggestions and summary with a header EX:(**Summary**, **Suggestions**)
+            NOTE: Start your points message with a dash (-) 
+            NOTE: Keep your response short, Stop once your summary is complete. DO NOT ADD EMOJIS
+            EXAMPLE OUTPUT: 
+            **Summary**
+            - Switched from OpenAI to DeepSeek for text summarization
+            - Changed model from GPT-4o-mini to deepseek-chat
+
+            **Potential Issues**
+            - Missing error handling for API calls
+            - No validation for missing environment variables
+
+            **Suggestions**
+            - Add try/except around API calls
+            - Validate environment variables before initialization
+
+            **Recommendation Score**
+            - 85
+        """
 
         return [
-            self.filter_lines(added_lines)[:MAX_LINES],
-            self.filter_lines(removed_lines)[:MAX_LINES],
+            {
+                "role": "system",
+                "content": "You are an experienced code reviewer analyzing Git diffs.",
+            },
+            {"role": "user", "content": prompt},
         ]
 
-    async def analyze_with_deepseek(self, changes):
-        added_lines = changes[0]
-        removed_lines = changes[1]
-
+    async def analyze_with_deepseek(self, summary):
         if not DEEPSEEK_API_KEY:
             return -1
         try:
-            prompt = f"""
-                You are an experienced senior software engineer performing an code review.
-
-                Each section shows the removed and added code extracted from the diff.
-
-                -----------------------------
-                🟥 REMOVED CODE (truncated to {len(removed_lines)} lines):
-                {removed_lines}
-
-                -----------------------------
-                🟩 ADDED CODE (truncated to {len(added_lines)} lines):
-                {added_lines}
-                -----------------------------
-
-                Your task:
-                1. **Summarize** the key functional and structural changes in plain English.  
-                2. **Explain** the purpose or motivation behind the change if possible.  
-                3. **Identify** any potential issues (bugs, performance, style, or security risks).  
-                4. **Suggest** specific improvements or refactorings if relevant.  
-                5. **Generate a Recommendation Score (0–100)** indicating how ready this pull request is for approval, where:
-                                - 90–100: Ready to merge (high quality, minimal issues)
-                                - 70–89: Acceptable with minor improvements
-                                - 50–69: Needs moderate revisions before approval
-                                - Below 50: Requires major changes or rework
-
-
-                NOTE:Keep the tone concise, constructive, and focused on practical insights.
-                NOTE: Use bullet points or short paragraphs for readability.
-                NOTE: Divide your suggestions and summary with a header EX:(**Summary**, **Suggestions**)
-                NOTE: Start your points message with a dash (-) 
-                NOTE: Keep your response short, Stop once your summary is complete. DO NOT ADD EMOJIS
-                EXAMPLE OUTPUT: 
-                **Summary**
-                - Switched from OpenAI to DeepSeek for text summarization
-                - Changed model from GPT-4o-mini to deepseek-chat
-
-                **Potential Issues**
-                - Missing error handling for API calls
-                - No validation for missing environment variables
-
-                **Suggestions**
-                - Add try/except around API calls
-                - Validate environment variables before initialization
-
-                **Recommendation Score**
-                - 85
-            """
-
             headers={"Authorization": f"Bearer {DEEPSEEK_API_KEY}"}
             json={
                     "model": "deepseek-coder",
-                    "messages": [
-                        {
-                            "role": "system",
-                            "content": "You are an experienced code reviewer analyzing Git diffs.",
-                        },
-                        {"role": "user", "content": prompt},
-                    ],
+                    "messages": self.review_messages(summary),
                     "max_tokens": MAX_TOKEN,
                 }
             timeout=30
@@ -255,13 +348,34 @@ class AutoPRReviewCog(commands.Cog):
         except Exception as e:
             return f"Error with deepseek: {e}"
 
-    async def analyze_diff(self, url):
+    # method to summarize the diff changes while streaming the diff, without holding it in memory
+    async def diff_summary(self, url):
         headers={"Accept": "application/vnd.github.v3.diff"}
-        diffResponse = await get_diff(url, headers)
+        async with stream_call_retry(url, headers=headers) as diffResponse:
+            if diffResponse.status != 200:
+                raise Exception(f"Failed to fetch diff (HTTP {diffResponse.status})")
+            parsed = await parse_diff_stream(
+                diffResponse.content.iter_chunked(16 * 1024),
+                is_ignored=is_ignored_path,
+                keep=keep_line,
+                max_lines=DIFF_READ_LINES,
+                max_file_lines=DIFF_FILE_LINES,
+            )
+        if parsed.truncated:
+            print(f"Diff for {url} truncated after {parsed.bytes_read} bytes")
+        return summarize_diff(parsed, DIFF_TOKEN_BUDGET)
+
+    async def analyze_diff(self, url):
+        summary = await self.diff_summary(url)
+        return await self.analyze_with_deepseek(summary)
 
-        diff_text = await diffResponse.text()
-        diff_changes = self.extract_changes(diff_text)
-        return await self.analyze_with_deepseek(diff_changes)
+    # method that streams the review of a diff as it is generated
+    async def stream_diff_review(self, url):
+        summary = await self.diff_summary(url)
+        async for delta in stream_chat_completion(
+            self.review_messages(summary), model="deepseek-coder", max_tokens=MAX_TOKEN, api_key=DEEPSEEK_API_KEY, timeout=30
+        ):
+            yield delta
 
     @commands.command(name="prreview")
     @commands.cooldown(
@@ -282,7 +396,10 @@ class AutoPRReviewCog(commands.Cog):
             return
 
         project, pullNumber = match.groups()
+        await self.post_pr_review(ctx, project, pullNumber)
 
+    # fetch a PR and post its details with a streamed AI review; shared by !prreview and webhooks
+    async def post_pr_review(self, ctx, project, pullNumber):
         response = await get_pulls(f"https://api.github.com/repos/Electrium-Mobility/{project}/pulls/{pullNumber}")
 
         if response.status != 200:
@@ -292,18 +409,6 @@ class AutoPRReviewCog(commands.Cog):
         else:
             responseJson = await response.json()
 
-            deepseek_response = await self.analyze_diff(
-                f"https://api.github.com/repos/Electrium-Mobility/{project}/pulls/{pullNumber}"
-            )
-            
-            # Handle case where DEEPSEEK_API_KEY is not set
-            if isinstance(deepseek_response, int):  # -1 returned when API key missing
-                deepseek_response = "⚠️ AI analysis unavailable (DEEPSEEK_API_KEY not configured)"
-            else:
-                deepseek_response = (
-                    deepseek_response.replace("\\n", "\n").replace("\n**", "\n\n**").strip()
-                )
-
             mergeable_state = responseJson.get("mergeable_state")
             merged = responseJson.get("merged", False)
 
@@ -318,13 +423,18 @@ class AutoPRReviewCog(commands.Cog):
             else:
                 merge_status = "❓ **Merge status unknown (GitHub still checking...)**"
 
-            # record contributor statistics (additions, deletions, and author)
-            author = responseJson['user']['login']
-            additions = responseJson['additions']
-            deletions = responseJson['deletions']
-            await self.update_contributor_stats(author, additions, deletions, project)
+            # record contributor statistics (additions, deletions, and author); a PR that is
+            # reviewed again replaces its earlier numbers instead of counting twice
+            self.store.record_pr(
+                project,
+                responseJson['number'],
+                responseJson['user']['login'],
+                responseJson['additions'],
+                responseJson['deletions'],
+                iso_timestamp(responseJson['created_at']),
+            )
 
-            await ctx.send(
+            header = (
                 f"✅ **Pull Request Received!**\n\n"
                 f"📦 **Repository:** `{project}`\n"
                 f"👤 **Author:** `{responseJson['user']['login']}`\n"
@@ -333,98 +443,51 @@ class AutoPRReviewCog(commands.Cog):
                 f"{merge_status}\n"
                 f"📝 **Title:** {responseJson['title']}\n"
                 f"🧠 **AI Summary:**\n"
-                f"{deepseek_response}\n"
-                f"🔗 **Link:** {responseJson['html_url']}"
             )
+            footer = f"\n🔗 **Link:** {responseJson['html_url']}"
 
-    async def load_tracked_feeds(self):
-        # load tracked feeds from storage.
-        if os.path.exists(STORAGE_PATH):
+            # Handle case where DEEPSEEK_API_KEY is not set
+            if not DEEPSEEK_API_KEY:
+                await ctx.send(header + "⚠️ AI analysis unavailable (DEEPSEEK_API_KEY not configured)" + footer)
+                return
+
+            render = lambda text: header + text.replace("\\n", "\n").replace("\n**", "\n\n**").strip() + footer
+
+            # an unchanged PR (same head SHA) is not reviewed twice; a single-commit PR
+            # has the same diff as its commit, so it shares the commit's review
+            scope = "commit" if responseJson.get("commits") == 1 else "pull"
+            cache_key = self.review_cache.make_key(
+                f"Electrium-Mobility/{project}", responseJson["head"]["sha"], scope, PROMPT_VERSION
+            )
+            cached = await self.review_cache.get(cache_key)
+            if cached is not None:
+                await stream_to_message(ctx, replay_text(cached), placeholder=header + "⏳ Loading review..." + footer, render=render)
+                return
+
+            # stream the AI summary into the message as it is generated
             try:
-                async with aiofiles.open(STORAGE_PATH, "r", encoding="utf-8") as f:
-                    content = await f.read()
-                    data = json.loads(content)
-                    # backward compatibility
-                    if isinstance(data, dict):
-                        self.tracked_feeds = data.get("feeds", data)
-                        self.contributor_stats = data.get("contributors", {})
-                    else:
-                        self.tracked_feeds = {}
-                        self.contributor_stats = {}
-            except Exception:
-                self.tracked_feeds = {}
-                self.contributor_stats = {}
-        else:
-            self.tracked_feeds = {}
-            self.contributor_stats = {}
-
-    async def save_tracked_feeds(self):
-        # save tracked feeds to storage.
-        data = {
-            "feeds": self.tracked_feeds,
-            "contributors": self.contributor_stats
-        }
-        async with aiofiles.open(STORAGE_PATH, "w", encoding="utf-8") as f:
-            await f.write(json.dumps(data, indent=2))
-
-    async def update_contributor_stats(self, author: str, additions: int, deletions: int, repo: str = None):
-        # update contributor statistics with lines changed.
-        if author not in self.contributor_stats:
-            self.contributor_stats[author] = {
-                "total_additions": 0,
-                "total_deletions": 0,
-                "total_changes": 0,
-                "pr_count": 0,
-                "repos": {}
-            }
-        
-        # update overall stats
-        self.contributor_stats[author]["total_additions"] += additions
-        self.contributor_stats[author]["total_deletions"] += deletions
-        self.contributor_stats[author]["total_changes"] += (additions + deletions)
-        self.contributor_stats[author]["pr_count"] += 1
-        
-        # update per-repo stats if repo is provided
-        if repo:
-            if repo not in self.contributor_stats[author]["repos"]:
-                self.contributor_stats[author]["repos"][repo] = {
-                    "additions": 0,
-                    "deletions": 0,
-                    "changes": 0,
-                    "pr_count": 0
-                }
-            self.contributor_stats[author]["repos"][repo]["additions"] += additions
-            self.contributor_stats[author]["repos"][repo]["deletions"] += deletions
-            self.contributor_stats[author]["repos"][repo]["changes"] += (additions + deletions)
-            self.contributor_stats[author]["repos"][repo]["pr_count"] += 1
-        
-        await self.save_tracked_feeds()
+                review = await stream_to_message(
+                    ctx,
+                    self.stream_diff_review(
+                        f"https://api.github.com/repos/Electrium-Mobility/{project}/pulls/{pullNumber}"
+                    ),
+                    placeholder=header + "⏳ Analyzing diff..." + footer,
+                    render=render,
+                )
+            except Exception as e:
+                await ctx.send(f"Error with deepseek: {e}")
+                return
+            if review:
+                await self.review_cache.put(cache_key, review)
+
+    async def load_tracked_feeds(self):
+        # load tracked feeds from the SQLite store (imports tracked_repos.json once)
+        await self.store.open()
+        self.tracked_feeds = await self.store.load_feeds()
 
     def parse_atom_entries(self, xml_text: str) -> list:
         """Return list of entries as dicts with keys id,title,link,updated,author"""
-        entries = []
-        try:
-            root = ET.fromstring(xml_text)
-            ns = {"atom": "http://www.w3.org/2005/Atom"}
-            found = root.findall("atom:entry", ns)
-            for entry in found:
-                eid = entry.find("atom:id", ns).text
-                title = entry.find("atom:title", ns).text
-                link = entry.find("atom:link", ns).get("href")
-                updated = entry.find("atom:updated", ns).text
-                author = entry.find("atom:author/atom:name", ns).text
-                entries.append(
-                    {
-                        "id": eid,
-                        "title": title,
-                        "link": link,
-                        "updated": updated,
-                        "author": author,
-                    }
-                )
-        except ET.ParseError:
-            return []
-        return entries
+        return parse_atom_entries(xml_text)
 
     @commands.command(name="trackrepo", aliases=["track"])
     async def trackrepo(self, ctx: commands.Context, repo: str):
@@ -466,8 +529,10 @@ class AutoPRReviewCog(commands.Cog):
                 "atom_url": atom_url,
                 "last_id": last_id,
                 "channel_id": ctx.channel.id,
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified"),
             }
-            self.save_tracked_feeds()
+            self.store.save_feed(key, self.tracked_feeds[key])
             await ctx.send(f"✅ Now tracking commits for {key} in this channel.")
 
     @commands.command(name="untrackrepo", aliases=["untrack"])
@@ -490,7 +555,7 @@ class AutoPRReviewCog(commands.Cog):
 
         if key in self.tracked_feeds:
             del self.tracked_feeds[key]
-            self.save_tracked_feeds()
+            self.store.delete_feed(key)
             await ctx.send(f"✅ Stopped tracking `{key}`.")
         else:
             await ctx.send("❌ That repository is not being tracked.")
@@ -508,134 +573,302 @@ class AutoPRReviewCog(commands.Cog):
         await ctx.send("Tracked feeds:\n" + "\n - ".join(lines))
 
     @commands.command(name="contributorstats", aliases=["stats", "contributors"])
-    async def contributorstats(self, ctx: commands.Context, contributor: str = None):
+    async def contributorstats(self, ctx: commands.Context, *args: str):
         # Display stats for contributors showing lines changed.
-        # If no username is provided, shows stats for all contributors.
-        if not self.contributor_stats:
-            await ctx.send("No contributor statistics available yet.")
-            return
-        
+        # Usage: !contributorstats [7d|30d|90d] [username | repo:<name>]
+        # Without a window, all-time totals are shown; without a username, the top 10.
+        since, window, contributor, repo = None, "all time", None, None
+        for arg in args:
+            m = re.fullmatch(r"(\d+)d", arg)
+            if m:
+                since = int(time.time()) - int(m.group(1)) * 86400
+                window = f"last {m.group(1)} days"
+            elif arg.startswith("repo:"):
+                repo = arg[len("repo:"):]
+            else:
+                contributor = arg
+
         if contributor:
             # show stats for specific contributor
-            if contributor not in self.contributor_stats:
-                await ctx.send(f"No statistics found for contributor `{contributor}`.")
+            result = await self.store.contributor(contributor, since=since)
+            if result is None:
+                await ctx.send(f"No statistics found for contributor `{contributor}` ({window}).")
                 return
-            
-            stats = self.contributor_stats[contributor]
+
+            (additions, deletions, changes, pr_count), repos = result
             repo_lines = []
-            for repo, repo_stats in stats["repos"].items():
+            for repo_name, repo_additions, repo_deletions, repo_changes, repo_prs in repos:
                 repo_lines.append(
-                    f"  • `{repo}`: {repo_stats['changes']:,} lines "
-                    f"(+{repo_stats['additions']:,} / -{repo_stats['deletions']:,}), "
-                    f"{repo_stats['pr_count']} PR{'s' if repo_stats['pr_count'] != 1 else ''}"
+                    f"  • `{repo_name}`: {repo_changes:,} lines "
+                    f"(+{repo_additions:,} / -{repo_deletions:,}), "
+                    f"{repo_prs} PR{'s' if repo_prs != 1 else ''}"
                 )
-            
+
             repo_breakdown = "\n".join(repo_lines) if repo_lines else "  No repository data"
-            
+
             await ctx.send(
-                f"**Contributor Statistics for `{contributor}`**\n\n"
-                f"**Total Lines Changed:** {stats['total_changes']:,}\n"
-                f"**Lines Added:** +{stats['total_additions']:,}\n"
-                f"**Lines Deleted:** -{stats['total_deletions']:,}\n"
-                f"**Pull Requests:** {stats['pr_count']}\n\n"
+                f"**Contributor Statistics for `{contributor}`** ({window})\n\n"
+                f"**Total Lines Changed:** {changes:,}\n"
+                f"**Lines Added:** +{additions:,}\n"
+                f"**Lines Deleted:** -{deletions:,}\n"
+                f"**Pull Requests:** {pr_count}\n\n"
                 f"**Per Repository:**\n{repo_breakdown}"
             )
         else:
-            # show stats for all contributors (sorted by total changes)
-            sorted_contributors = sorted(
-                self.contributor_stats.items(),
-                key=lambda x: x[1]["total_changes"],
-                reverse=True
-            )
-            
+            # top contributors by total changes, served from indexed queries
+            top = await self.store.leaderboard(limit=10, since=since, repo=repo)
+            if not top:
+                await ctx.send("No contributor statistics available yet.")
+                return
+
             lines = []
-            for username, stats in sorted_contributors[:10]:
+            for username, additions, deletions, changes, pr_count in top:
                 lines.append(
-                    f"**{username}**: {stats['total_changes']:,} lines changed "
-                    f"(+{stats['total_additions']:,} / -{stats['total_deletions']:,}), "
-                    f"{stats['pr_count']} PR{'s' if stats['pr_count'] != 1 else ''}"
+                    f"**{username}**: {changes:,} lines changed "
+                    f"(+{additions:,} / -{deletions:,}), "
+                    f"{pr_count} PR{'s' if pr_count != 1 else ''}"
                 )
-            
-            total_contributors = len(self.contributor_stats)
+
+            total_contributors = await self.store.contributor_count(since=since, repo=repo)
             footer = ""
             if total_contributors > 10:
                 footer = f"\n\n*Showing top 10 of {total_contributors} contributors. Use `!contributorstats <username>` for individual stats.*"
-            
+
+            scope = f"`{repo}`, {window}" if repo else window
             await ctx.send(
-                f"**Contributor Statistics**\n\n"
+                f"**Contributor Statistics** ({scope})\n\n"
                 + "\n".join(lines)
                 + footer
             )
 
-    @tasks.loop(minutes=1)
+    @commands.command(name="backfillstats")
+    @commands.has_permissions(manage_guild=True)
+    async def backfillstats(self, ctx: commands.Context, *repos: str):
+        """Import historical PRs from GitHub into contributor stats.
+        Usage: !backfillstats [repo ...] (defaults to all tracked repos)
+        Statistics of the backfilled repos are rebuilt from the imported PRs.
+        Needs Manage Server: a backfill costs one GitHub request per PR.
+        """
+        repos = list(repos) or [key.split("/", 1)[1] for key in self.tracked_feeds]
+        if not repos:
+            await ctx.send("No repositories given and none are tracked.")
+            return
+
+        status = await ctx.send(f"⏳ Backfilling PR history for {len(repos)} repo(s)...")
+        total = 0
+        backfilled = []
+        for repo in repos:
+            try:
+                count = await self.backfill_repo(repo)
+            except Exception as e:
+                await ctx.send(f"❌ Backfill of `{repo}` failed: {e}")
+                continue
+            total += count
+            backfilled.append(repo)
+            await status.edit(content=f"⏳ Backfilled `{repo}` ({count} PRs, {total} total)...")
+        self.store.rebuild_aggregates(backfilled)
+        await self.store.flush()
+        await status.edit(content=f"✅ Backfilled {total} PRs from {len(backfilled)} repo(s).")
+
+    @backfillstats.error
+    async def backfillstats_error(self, ctx: commands.Context, error):
+        if isinstance(error, commands.MissingPermissions):
+            await ctx.send("❌ Backfilling stats requires the Manage Server permission.")
+        else:
+            raise error
+
+    async def backfill_repo(self, repo, max_pages=BACKFILL_MAX_PAGES):
+        """Page through a repo's PRs and record each one; details are fetched with bounded concurrency."""
+        headers = {
+            "Authorization": f"token {GITHUB_PAT}",
+            "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_8_2) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/29.0.1521.3 Safari/537.36",
+        }
+        semaphore = asyncio.Semaphore(BACKFILL_CONCURRENCY)
+
+        async def record(number):
+            # the list endpoint has no additions/deletions, so each PR is fetched on its own
+            async with semaphore:
+                response = await get_commit_information(
+                    f"https://api.github.com/repos/Electrium-Mobility/{repo}/pulls/{number}", headers
+                )
+            if response.status != 200:
+                return 0
+            pr = await response.json()
+            if not pr.get("user"):
+                return 0  # deleted account
+            self.store.record_pr(
+                repo, pr["number"], pr["user"]["login"], pr["additions"], pr["deletions"], iso_timestamp(pr["created_at"])
+            )
+            return 1
+
+        count = 0
+        for page in range(1, max_pages + 1):
+            response = await list_pull_requests(repo, page, headers)
+            if response.status != 200:
+                raise Exception(f"HTTP {response.status} listing pull requests")
+            pulls = await response.json()
+            if not pulls:
+                break
+            count += sum(await asyncio.gather(*(record(pr["number"]) for pr in pulls)))
+            if len(pulls) < 100:
+                break
+        return count
+
+    @commands.command(name="feedstats")
+    async def feedstats(self, ctx: commands.Context):
+        """Show feed polling intervals and lag."""
+        stats = self.feed_scheduler.stats()
+        review_stats = self.review_cache.stats()
+        lines = [
+            f"**Feed poller:** {stats['feeds']} feeds, up to {self.feed_scheduler.concurrency} at once",
+            f"Last tick: {stats['last_tick_polled']} polls started, {stats['in_flight']} running | "
+            f"Lag avg {stats['avg_lag']:.1f}s / max {stats['max_lag']:.1f}s | Failing: {stats['failing']}",
+            f"Not modified (304): {self.feed_not_modified} feed polls, {github_validators.not_modified} API calls",
+            f"Review cache: {review_stats['entries']} reviews ({review_stats['bytes'] / 1_000_000:.1f} MB), "
+            f"{review_stats['hits']} hits / {review_stats['misses']} misses",
+        ]
+        # slowest feeds first
+        states = sorted(self.feed_scheduler.states.items(), key=lambda kv: kv[1].last_lag + kv[1].last_duration, reverse=True)
+        for key, state in states[:10]:
+            error = f" ⚠️ {state.last_error}" if state.last_error else ""
+            lines.append(
+                f" - `{key}`: every {state.interval:.0f}s, lag {state.last_lag:.1f}s, "
+                f"fetch {state.last_duration:.2f}s, {state.changes}/{state.polls} polls changed{error}"
+            )
+        await ctx.send("\n".join(lines))
+
+    # the loop only checks which feeds are due; each feed has its own adaptive interval
+    @tasks.loop(seconds=FEED_TICK_SECONDS)
     async def poll_atom_feeds(self):
         if not self.tracked_feeds:
             return
-        async with aiohttp.ClientSession() as session:
-            for key, info in self.tracked_feeds.items():
-                atom_url = info.get("atom_url")
-                # fetch feed asynchronously using aiohttp
+        # polls run as their own tasks, so a feed busy posting reviews never delays the next tick
+        self.feed_scheduler.run_due(list(self.tracked_feeds))
+
+    async def poll_feed(self, key) -> bool:
+        """Fetch one tracked feed and post its new commits. Returns True if there were any."""
+        info = self.tracked_feeds.get(key)
+        if info is None:
+            return False  # untracked while waiting for a slot
+        atom_url = info.get("atom_url")
+        session = get_http_client()
+        # conditional GET: an unchanged feed answers 304 and is not downloaded or parsed
+        headers = validator_headers(info.get("etag"), info.get("last_modified"))
+        async with session.get(atom_url, headers=headers, timeout=aiohttp.ClientTimeout(total=10)) as response:
+            if response.status == 304:
+                self.feed_not_modified += 1
+                return False
+            if response.status != 200:
+                raise Exception(f"HTTP {response.status}")
+            # parse while downloading and stop at the last seen entry; the older
+            # entries below it are never read
+            new_entries, _ = await read_new_entries(response.content.iter_chunked(16 * 1024), stop_at=info.get("last_id"))
+            validators = (response.headers.get("ETag"), response.headers.get("Last-Modified"))
+
+        if validators != (info.get("etag"), info.get("last_modified")):
+            info["etag"], info["last_modified"] = validators
+            self.store.save_feed(key, info)
+
+        if not new_entries:
+            return False
+        newest_id = new_entries[0]["id"]
+
+        await self.notify_commits(key, info, new_entries)
+
+        # update last_id to newest
+        self.tracked_feeds[key]["last_id"] = newest_id
+        self.store.save_feed(key, info)
+        return True
+
+    # post new commits (newest first in `entries`) to the feed's channel; shared by polling and webhooks
+    async def notify_commits(self, key, info, entries):
+        channel = self.bot.get_channel(info.get("channel_id"))
+        if not channel:
+            # fallback: skip or implement owner DM
+            return
+
+        # send notifications oldest-first; only the newest REVIEW_BATCH_LIMIT commits get an AI review
+        ordered = list(reversed(entries))
+        skipped, batch = ordered[:-REVIEW_BATCH_LIMIT], ordered[-REVIEW_BATCH_LIMIT:]
+        if skipped:
+            links = "\n".join(f"- [{e.get('title', '')}]({e.get('link', '')})" for e in skipped[-10:])
+            try:
+                await channel.send(
+                    f"🔔 {len(skipped)} earlier commit(s) in `{key}` were pushed together "
+                    f"(reviewing the latest {len(batch)}):\n{links}"
+                )
+            except Exception:
+                pass
+
+        # diffs are fetched and analyzed concurrently, then posted in commit order
+        reviews = [asyncio.ensure_future(self.review_commit(key, e)) for e in batch]
+        try:
+            for e, review in zip(batch, reviews):
+                msg = (
+                    f"🔔 New commit in `{key}`\n"
+                    f"**Author:** {e.get('author', '')}\n"
+                    f"**Message:** {e.get('title', '')}\n"
+                    f"[Link to commit]({e.get('link', '')})"
+                )
+                deepseek_response = await review
                 try:
-                    async with session.get(atom_url, timeout=aiohttp.ClientTimeout(total=10)) as response:
-                        if response.status != 200:
-                            continue
-                        # decode bytes to string for XML parsing
-                        xml_content = await response.text()
-                        entries = self.parse_atom_entries(xml_content)
+                    await channel.send(msg)
+                    await channel.send(deepseek_response)
+                except Exception:
+                    pass
+        finally:
+            for review in reviews:
+                review.cancel()
+
+    # fetch a commit's diff and analyze it with deepseek, bounded by the shared review semaphore
+    async def review_commit(self, key, entry):
+        sha = (entry.get("id") or "").rsplit("/", 1)[-1]
+        cache_key = self.review_cache.make_key(key, sha, "commit", PROMPT_VERSION)
+        deepseek_response = await self.review_cache.get(cache_key)
+        if deepseek_response is None:
+            async with self.review_semaphore:
+                try:
+                    deepseek_response = await self.analyze_diff(f"https://api.github.com/repos/{key}/commits/{sha}")
                 except Exception as e:
-                    print(f"Error fetching feed `{key}`: {e}")
-                    continue
-
-                if not entries:
-                    continue
-
-                newest_id = entries[0]["id"]
-                last_id = info.get("last_id")
-                if last_id == newest_id:
-                    continue
-
-                # find new entries up to newest
-                new_entries = []
-                for e in entries:
-                    if e["id"] == last_id:
-                        break
-                    new_entries.append(e)
-
-                # send notifications oldest-first
-                channel = self.bot.get_channel(info.get("channel_id"))
-                for e in reversed(new_entries):
-                    msg = (
-                        f"🔔 New commit in `{key}`\n"
-                        f"**Author:** {e.get('author', '')}\n"
-                        f"**Message:** {e.get('title', '')}\n"
-                        f"[Link to commit]({e.get('link', '')})"
-                    )
-
-                    # analyze commit information with deepseek
-                    deepseek_response = self.analyze_diff(e.get('link', ''))
-
-                    # handle case where DEEPSEEK_API_KEY is not set
-                    if isinstance(deepseek_response, int):  # -1 returned when API key missing
-                        deepseek_response = "⚠️ AI analysis unavailable (DEEPSEEK_API_KEY not configured)"
-                    else:
-                        deepseek_response = (
-                            deepseek_response.replace("\\n", "\n").replace("\n**", "\n\n**").strip()
-                        )
-
-                    try:
-                        if channel:
-                            await channel.send(msg)
-                            await channel.send(deepseek_response)
-                        else:
-                            # fallback: skip or implement owner DM
-                            pass
-                    except Exception:
-                        pass
-
-                # update last_id to newest
-                self.tracked_feeds[key]["last_id"] = newest_id
-                self.save_tracked_feeds()
+                    return f"⚠️ AI analysis failed: {e}"
+            if isinstance(deepseek_response, str) and not deepseek_response.startswith("Error with deepseek"):
+                await self.review_cache.put(cache_key, deepseek_response)
+
+        # handle case where DEEPSEEK_API_KEY is not set
+        if isinstance(deepseek_response, int):  # -1 returned when API key missing
+            return "⚠️ AI analysis unavailable (DEEPSEEK_API_KEY not configured)"
+        return deepseek_response.replace("\\n", "\n").replace("\n**", "\n\n**").strip()
+
+    async def handle_webhook(self, event, payload):
+        """Feed a GitHub webhook delivery into the same pipeline as polling and !prreview."""
+        key = (payload.get("repository") or {}).get("full_name")
+        info = self.tracked_feeds.get(key)
+        if info is None:
+            return  # only tracked repos are announced
+
+        if event == "push":
+            # commits.atom only lists the default branch, so ignore pushes elsewhere
+            default_branch = payload["repository"].get("default_branch")
+            if payload.get("ref") != f"refs/heads/{default_branch}":
+                return
+            entries = [commit_entry(c) for c in reversed(payload.get("commits", []))]
+            # skip commits the poller already announced
+            last_id = info.get("last_id")
+            ids = [e["id"] for e in entries]
+            if last_id in ids:
+                entries = entries[: ids.index(last_id)]
+            if not entries:
+                return
+            info["last_id"] = entries[0]["id"]
+            self.store.save_feed(key, info)
+            await self.notify_commits(key, info, entries)
 
+        elif event == "pull_request":
+            if payload.get("action") not in PR_REVIEW_ACTIONS:
+                return
+            channel = self.bot.get_channel(info.get("channel_id"))
+            if channel:
+                await self.post_pr_review(channel, payload["repository"]["name"], payload["pull_request"]["number"])
 
 async def setup(bot: commands.Bot):
     await bot.add_cog(AutoPRReviewCog(bot))
@@ -0,0 +1,90 @@
+import json
+from collections import OrderedDict
+from typing import Dict, Hashable, Optional, Tuple
+
+
+def validator_headers(etag: Optional[str], last_modified: Optional[str]) -> Dict[str, str]:
+    """Build the conditional request headers for the stored validators."""
+    headers = {}
+    if etag:
+        headers["If-None-Match"] = etag
+    if last_modified:
+        headers["If-Modified-Since"] = last_modified
+    return headers
+
+
+class CachedResponse:
+    """
+    Stand-in for a 200 response replayed from the validator cache after a 304.
+
+    Offers the parts of aiohttp.ClientResponse the GitHub helpers use.
+    """
+
+    status = 200
+    from_cache = True
+
+    def __init__(self, body: bytes, headers: Dict[str, str], charset: str = "utf-8"):
+        self._body = body
+        self.headers = headers
+        self.charset = charset
+
+    async def read(self) -> bytes:
+        return self._body
+
+    async def text(self) -> str:
+        return self._body.decode(self.charset, errors="replace")
+
+    async def json(self, **kwargs):
+        return json.loads(self._body.decode(self.charset))
+
+
+class ValidatorCache:
+    """
+    Remember ETag / Last-Modified and the body of recent GET responses.
+
+    Requests for a cached key are sent with If-None-Match / If-Modified-Since. When
+    GitHub answers 304 Not Modified, the stored body is replayed instead. Such
+    replies do not count against the API rate limit.
+    Bodies larger than `max_body_bytes` are not kept.
+    """
+
+    def __init__(self, max_entries: int = 512, max_body_bytes: int = 1_000_000):
+        self.max_entries = max_entries
+        self.max_body_bytes = max_body_bytes
+        # key -> (etag, last_modified, body, headers, charset)
+        self._entries: "OrderedDict[Hashable, Tuple[Optional[str], Optional[str], bytes, Dict[str, str], str]]" = OrderedDict()
+        self.not_modified = 0
+        self.modified = 0
+
+    def request_headers(self, key: Hashable) -> Dict[str, str]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return {}
+        return validator_headers(entry[0], entry[1])
+
+    def replay(self, key: Hashable) -> Optional[CachedResponse]:
+        """Return the cached response for `key` after the server answered 304."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        self._entries.move_to_end(key)
+        self.not_modified += 1
+        _, _, body, headers, charset = entry
+        return CachedResponse(body, headers, charset)
+
+    def store(self, key: Hashable, headers, body: bytes, charset: Optional[str] = None):
+        """Keep a 200 response if it carries validators; otherwise forget the key."""
+        self.modified += 1
+        etag = headers.get("ETag")
+        last_modified = headers.get("Last-Modified")
+        if not (etag or last_modified) or len(body) > self.max_body_bytes:
+            self._entries.pop(key, None)
+            return
+        kept_headers = {name: headers[name] for name in ("Content-Type", "ETag", "Last-Modified") if name in headers}
+        self._entries[key] = (etag, last_modified, body, kept_headers, charset or "utf-8")
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
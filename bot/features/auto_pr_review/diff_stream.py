@@ -0,0 +1,177 @@
+from dataclasses import dataclass, field
+from typing import AsyncIterable, AsyncIterator, Callable, List, Optional
+
+MAX_LINE_BYTES = 4096  # longer lines (minified or generated code) are cut
+
+
+@dataclass
+class Hunk:
+    header: str
+    # changed lines in diff order, each prefixed with "+" or "-"
+    lines: List[str] = field(default_factory=list)
+
+    @property
+    def added(self) -> List[str]:
+        return [line[1:] for line in self.lines if line.startswith("+")]
+
+    @property
+    def removed(self) -> List[str]:
+        return [line[1:] for line in self.lines if line.startswith("-")]
+
+
+@dataclass
+class FileDiff:
+    path: str
+    hunks: List[Hunk] = field(default_factory=list)
+    unread_lines: int = 0  # changed lines past the per-file limit, counted but not stored
+
+    @property
+    def added(self) -> List[str]:
+        return [line for hunk in self.hunks for line in hunk.added]
+
+    @property
+    def removed(self) -> List[str]:
+        return [line for hunk in self.hunks for line in hunk.removed]
+
+
+@dataclass
+class ParsedDiff:
+    files: List[FileDiff] = field(default_factory=list)
+    skipped_files: List[str] = field(default_factory=list)
+    truncated: bool = False  # the line or byte budget ran out before the end of the diff
+    bytes_read: int = 0
+
+    def changes(self) -> List[List[str]]:
+        """Return [added_lines, removed_lines] across all files, like `extract_changes`."""
+        return [
+            [line for f in self.files for line in f.added],
+            [line for f in self.files for line in f.removed],
+        ]
+
+
+def _path_from_header(line: str) -> str:
+    # "diff --git a/old/path b/new/path" -> "new/path"
+    rest = line[len("diff --git "):]
+    marker = rest.rfind(" b/")
+    return rest[marker + 3:] if marker != -1 else rest
+
+
+async def iter_lines(chunks: AsyncIterable[bytes], max_line_bytes: int = MAX_LINE_BYTES) -> AsyncIterator[bytes]:
+    """Split a byte stream into lines without ever buffering more than one capped line."""
+    buffer = b""
+    overflow = False  # inside a line that was already cut and emitted
+    async for chunk in chunks:
+        buffer += chunk
+        while True:
+            newline = buffer.find(b"\n")
+            if newline == -1:
+                if len(buffer) > max_line_bytes:
+                    if not overflow:
+                        yield buffer[:max_line_bytes]
+                        overflow = True
+                    buffer = b""
+                break
+            line, buffer = buffer[:newline], buffer[newline + 1:]
+            if overflow:
+                overflow = False
+                continue
+            yield line[:max_line_bytes]
+    if buffer and not overflow:
+        yield buffer[:max_line_bytes]
+
+
+class DiffParser:
+    """
+    Line-by-line unified diff parser with per-file hunks and a line budget.
+
+    Files for which `is_ignored(path)` is true are skipped from their
+    `diff --git` header on. Their content is never stored. Changed lines that
+    fail `keep` (imports, comments, blank lines) are dropped. A file keeps at
+    most `max_file_lines` changed lines; the rest are only counted in its
+    `unread_lines`, so one huge file cannot use up the budget of the files
+    after it. Once `max_lines` changed lines have been kept in total, `done`
+    is set and the caller should stop reading.
+    """
+
+    def __init__(
+        self,
+        is_ignored: Callable[[str], bool] = lambda path: False,
+        keep: Callable[[str], bool] = lambda line: bool(line),
+        max_lines: int = 100,
+        max_file_lines: Optional[int] = None,
+    ):
+        self.is_ignored = is_ignored
+        self.keep = keep
+        self.max_lines = max_lines
+        self.max_file_lines = max_file_lines
+        self.result = ParsedDiff()
+        self.kept = 0
+        self._file_kept = 0
+        self.done = False
+        self._file: Optional[FileDiff] = None
+        self._hunk: Optional[Hunk] = None
+        self._skipping = False
+
+    def feed_line(self, line: str):
+        if self.done:
+            return
+        if line.startswith("diff --git "):
+            path = _path_from_header(line)
+            self._hunk = None
+            self._file_kept = 0
+            self._skipping = self.is_ignored(path)
+            if self._skipping:
+                self._file = None
+                self.result.skipped_files.append(path)
+            else:
+                self._file = FileDiff(path)
+                self.result.files.append(self._file)
+            return
+        if self._skipping or self._file is None:
+            return
+        if line.startswith("@@"):
+            self._hunk = Hunk(line)
+            self._file.hunks.append(self._hunk)
+            return
+        if self._hunk is None:
+            return  # file header: index, mode, ---/+++ lines
+
+        if not line.startswith(("+", "-")):
+            return  # context or "\ No newline at end of file"
+        content = line[1:].strip()
+        if not self.keep(content):
+            return
+        if self.max_file_lines is not None and self._file_kept >= self.max_file_lines:
+            self._file.unread_lines += 1
+            return
+        self._hunk.lines.append(line[0] + content)
+        self.kept += 1
+        self._file_kept += 1
+        if self.kept >= self.max_lines:
+            self.result.truncated = True
+            self.done = True
+
+
+async def parse_diff_stream(
+    chunks: AsyncIterable[bytes],
+    is_ignored: Callable[[str], bool] = lambda path: False,
+    keep: Callable[[str], bool] = lambda line: bool(line),
+    max_lines: int = 100,
+    max_bytes: int = 5_000_000,
+    max_file_lines: Optional[int] = None,
+) -> ParsedDiff:
+    """
+    Parse a diff as it downloads and stop reading as soon as the budget is spent.
+
+    `max_bytes` also caps how much is read in total, including skipped files.
+    """
+    parser = DiffParser(is_ignored, keep, max_lines, max_file_lines)
+    async for raw in iter_lines(chunks):
+        parser.result.bytes_read += len(raw) + 1
+        parser.feed_line(raw.decode("utf-8", errors="replace").rstrip("\r"))
+        if parser.done:
+            break
+        if parser.result.bytes_read >= max_bytes:
+            parser.result.truncated = True
+            break
+    return parser.result
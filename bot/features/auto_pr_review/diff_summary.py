@@ -0,0 +1,140 @@
+import re
+from dataclasses import dataclass
+from typing import List
+
+from bot.core.tokens import estimate_tokens
+from bot.features.auto_pr_review.diff_stream import FileDiff, Hunk, ParsedDiff
+
+MAX_LINE_CHARS = 160  # changed lines are cut to this length in the prompt
+MIN_FILE_TOKENS = 40  # files that cannot get at least this much are only listed by name
+
+# lines that define or change control flow say more about a change than data or formatting
+STRONG_SIGNAL = re.compile(
+    r"^(def|class|async|await|return|raise|throw|if|elif|else|for|while|try|except|catch|finally|with|"
+    r"function|const|let|var|public|private|protected|static|fn|func|impl|struct|interface|switch|case)\b"
+)
+TRIVIAL = re.compile(r"^[\s{}()\[\];,.:]*$")
+
+
+def line_signal(line: str) -> float:
+    """How much a changed line (without its +/- prefix) tells the reviewer."""
+    if TRIVIAL.match(line):
+        return 0.1
+    if STRONG_SIGNAL.match(line):
+        return 2.0
+    return 1.0
+
+
+@dataclass
+class _ScoredHunk:
+    index: int
+    hunk: Hunk
+    score: float
+    cost: int
+
+
+def _render_line(line: str) -> str:
+    return line if len(line) <= MAX_LINE_CHARS else line[:MAX_LINE_CHARS] + "…"
+
+
+def _score_hunks(file: FileDiff) -> List[_ScoredHunk]:
+    scored = []
+    for i, hunk in enumerate(file.hunks):
+        if not hunk.lines:
+            continue
+        cost = estimate_tokens(hunk.header) + sum(estimate_tokens(_render_line(line)) for line in hunk.lines)
+        score = sum(line_signal(line[1:]) for line in hunk.lines)
+        scored.append(_ScoredHunk(i, hunk, score, cost))
+    return scored
+
+
+def _allocate(needs: List[int], budget: int) -> List[int]:
+    """Split `budget` fairly: small files get what they need, the rest share the remainder equally."""
+    shares = [0] * len(needs)
+    open_files = sorted(range(len(needs)), key=lambda i: needs[i])
+    remaining = budget
+    while open_files:
+        share = remaining // len(open_files)
+        smallest = open_files[0]
+        if needs[smallest] > share:
+            for i in open_files:
+                shares[i] = share
+            break
+        shares[smallest] = needs[smallest]
+        remaining -= needs[smallest]
+        open_files.pop(0)
+    return shares
+
+
+def summarize_diff(parsed: ParsedDiff, token_budget: int = 1500) -> str:
+    """
+    Render a diff as a compact per-file, per-hunk summary that fits `token_budget`.
+
+    Every file gets a fair share of the budget. Within a file, hunks are kept in
+    order of signal: larger hunks and definition or control-flow lines first.
+    The kept hunks are shown in diff order, and what was left out is stated.
+    """
+    files = []
+    for position, file in enumerate(parsed.files):
+        hunks = _score_hunks(file)
+        if hunks:
+            header_cost = estimate_tokens(file.path) + 8
+            files.append((position, file, hunks, header_cost + sum(h.cost for h in hunks), sum(h.score for h in hunks)))
+
+    # if there are too many files to give each a useful share, drop the weakest ones
+    files.sort(key=lambda f: f[4], reverse=True)
+    omitted_files = []
+    while files and token_budget // len(files) < MIN_FILE_TOKENS and len(files) > 1:
+        omitted_files.append(files.pop()[1].path)
+    shares = _allocate([f[3] for f in files], token_budget)
+
+    sections = []
+    for (_, file, hunks, _, _), share in sorted(zip(files, shares), key=lambda f: f[0][0]):
+        added = sum(len(h.hunk.added) for h in hunks)
+        removed = sum(len(h.hunk.removed) for h in hunks)
+        left = share - estimate_tokens(file.path) - 8
+
+        chosen = []
+        partial = None
+        for scored in sorted(hunks, key=lambda h: h.score, reverse=True):
+            if scored.cost <= left:
+                chosen.append(scored)
+                left -= scored.cost
+            elif partial is None and left > estimate_tokens(scored.hunk.header) + 4:
+                # take the start of the best hunk that does not fit whole
+                lines, cost = [], estimate_tokens(scored.hunk.header)
+                for line in scored.hunk.lines:
+                    line_cost = estimate_tokens(_render_line(line))
+                    if cost + line_cost > left:
+                        break
+                    lines.append(line)
+                    cost += line_cost
+                if lines:
+                    partial = (scored, lines)
+                    chosen.append(scored)
+                    left -= cost
+
+        omitted = len(hunks) - len(chosen)
+        heading = f"### {file.path} (+{added} -{removed}, {len(hunks)} hunk{'s' if len(hunks) != 1 else ''}"
+        if omitted:
+            heading += f", {omitted} omitted"
+        if file.unread_lines:
+            heading += f", {file.unread_lines} more changed lines not read"
+        heading += ")"
+        body = [heading]
+        for scored in sorted(chosen, key=lambda h: h.index):
+            lines = partial[1] if partial and partial[0] is scored else scored.hunk.lines
+            body.append(scored.hunk.header)
+            body.extend(_render_line(line) for line in lines)
+            if len(lines) < len(scored.hunk.lines):
+                body.append(f"… {len(scored.hunk.lines) - len(lines)} more changed lines")
+        sections.append("\n".join(body))
+
+    notes = []
+    if omitted_files:
+        notes.append(f"{len(omitted_files)} more changed file(s) not shown: {', '.join(omitted_files[:10])}")
+    if parsed.skipped_files:
+        notes.append(f"{len(parsed.skipped_files)} docs/data/binary file(s) skipped")
+    if parsed.truncated:
+        notes.append("Diff was cut off because it is very large")
+    return "\n\n".join(sections + notes) or "(no reviewable code changes)"
@@ -0,0 +1,126 @@
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional
+
+
+@dataclass
+class FeedState:
+    """Scheduling state and lag metrics for one tracked feed."""
+
+    interval: float
+    next_due: float = 0.0
+    last_polled: Optional[float] = None
+    last_duration: float = 0.0
+    last_lag: float = 0.0  # how late the last poll started compared to when it was due
+    max_lag: float = 0.0
+    polls: int = 0
+    changes: int = 0
+    failures: int = 0
+    last_error: Optional[str] = None
+
+
+class FeedScheduler:
+    """
+    Poll many feeds concurrently, each on its own adaptive interval.
+
+    `poll(key)` fetches one feed and returns True if it had new entries. Feeds
+    that change are polled again after `min_interval`; each quiet poll (or
+    failure) multiplies the interval by `backoff`, up to `max_interval`. At most
+    `concurrency` polls run at once.
+
+    Each due feed is polled in its own task, and `run_due` returns without
+    waiting for them. A feed whose previous poll is still running (for example
+    while its commits are being reviewed) is skipped, so one busy repo never
+    holds up the others.
+    """
+
+    def __init__(
+        self,
+        poll: Callable[[str], Awaitable[bool]],
+        min_interval: float = 60,
+        max_interval: float = 900,
+        backoff: float = 1.5,
+        concurrency: int = 16,
+    ):
+        self.poll = poll
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.concurrency = concurrency
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self.states: Dict[str, FeedState] = {}
+        self.in_flight: Dict[str, asyncio.Task] = {}
+        self.last_tick_polled = 0
+
+    def state(self, key: str) -> FeedState:
+        if key not in self.states:
+            self.states[key] = FeedState(interval=self.min_interval)
+        return self.states[key]
+
+    def forget(self, key: str):
+        self.states.pop(key, None)
+
+    def due(self, keys: Iterable[str], now: Optional[float] = None) -> List[str]:
+        now = time.time() if now is None else now
+        return [key for key in keys if self.state(key).next_due <= now]
+
+    def run_due(self, keys: Iterable[str]) -> int:
+        """Start a poll for every feed in `keys` that is due and not already running. Returns how many were started."""
+        keys = list(keys)
+        for key in set(self.states) - set(keys):
+            self.forget(key)  # untracked since the last tick
+
+        due = [key for key in self.due(keys) if key not in self.in_flight]
+        for key in due:
+            task = asyncio.create_task(self._run_one(key))
+            self.in_flight[key] = task
+            task.add_done_callback(lambda _, key=key: self.in_flight.pop(key, None))
+        self.last_tick_polled = len(due)
+        return len(due)
+
+    async def close(self):
+        """Cancel running polls and wait for them to stop."""
+        tasks = list(self.in_flight.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _run_one(self, key: str):
+        state = self.state(key)
+        async with self._semaphore:
+            now = time.time()
+            if state.next_due:
+                state.last_lag = max(0.0, now - state.next_due)
+                state.max_lag = max(state.max_lag, state.last_lag)
+            started = time.monotonic()
+            try:
+                changed = await self.poll(key)
+            except Exception as e:
+                changed = False
+                state.failures += 1
+                state.last_error = str(e) or type(e).__name__
+                print(f"Error polling feed `{key}`: {state.last_error}")
+            else:
+                state.last_error = None
+            state.last_duration = time.monotonic() - started
+            state.last_polled = now
+            state.polls += 1
+
+        if changed:
+            state.changes += 1
+            state.interval = self.min_interval
+        else:
+            state.interval = min(self.max_interval, state.interval * self.backoff)
+        state.next_due = time.time() + state.interval
+
+    def stats(self) -> Dict[str, float]:
+        lags = [s.last_lag for s in self.states.values() if s.polls]
+        return {
+            "feeds": len(self.states),
+            "last_tick_polled": self.last_tick_polled,
+            "in_flight": len(self.in_flight),
+            "avg_lag": sum(lags) / len(lags) if lags else 0.0,
+            "max_lag": max(lags, default=0.0),
+            "failing": sum(1 for s in self.states.values() if s.last_error),
+        }
@@ -0,0 +1,87 @@
+import re
+from typing import Dict, Iterable, List
+
+GLOB_CHARS = set("*?[")
+
+
+def _trie_regex(words: Iterable[str]) -> str:
+    """
+    Build a regex matching any of `words`, factored by common prefix.
+
+    ".png", ".pdf" and ".gif" become `\\.(?:gif|p(?:df|ng))`. At each position the
+    regex engine then checks one branch per distinct next character, not one
+    branch per pattern.
+    """
+    trie: Dict[str, dict] = {}
+    for word in words:
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def build(node: dict) -> str:
+        branches = [re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        # a word ends here but longer words continue: the rest is optional
+        return f"(?:{body})?" if "" in node else body
+
+    return build(trie)
+
+
+def _glob_regex(pattern: str) -> str:
+    """Translate a glob (`*`, `**`, `?`, `[...]`) into an unanchored regex over one path."""
+    out = []
+    i = 0
+    while i < len(pattern):
+        if pattern.startswith("**/", i):
+            out.append(r"(?:.*/)?")  # any number of directories, including none
+            i += 3
+            continue
+        if pattern.startswith("**", i):
+            out.append(r".*")
+            i += 2
+            continue
+        c = pattern[i]
+        if c == "*":
+            out.append(r"[^/]*")
+        elif c == "?":
+            out.append(r"[^/]")
+        elif c == "[" and pattern.find("]", i + 1) != -1:
+            end = pattern.find("]", i + 1)
+            out.append("[" + pattern[i + 1:end].replace("\\", "\\\\") + "]")
+            i = end
+        else:
+            out.append(re.escape(c))
+        i += 1
+    regex = "".join(out)
+    # "*.lock" style patterns are suffixes: they must reach the end of the path
+    if pattern.startswith("*") and not pattern.endswith("*"):
+        regex += r"\Z"
+    return regex
+
+
+class IgnoreMatcher:
+    """
+    All ignore patterns compiled into one regex.
+
+    Plain patterns match anywhere in the path, like the old
+    `any(pattern in path ...)` check. They are merged into a prefix trie.
+    Glob patterns support `*`, `**`, `?` and `[...]`. A path is checked with a
+    single regex search instead of one substring test per pattern.
+    """
+
+    def __init__(self, patterns: Iterable[str]):
+        self.patterns = sorted(set(patterns))
+        literals = [p for p in self.patterns if not GLOB_CHARS & set(p)]
+        globs = [p for p in self.patterns if GLOB_CHARS & set(p)]
+        alternatives = ([_trie_regex(literals)] if literals else []) + [_glob_regex(p) for p in globs]
+        self._search = re.compile("|".join(alternatives) or r"(?!)", re.DOTALL).search
+
+    def matches(self, path: str) -> bool:
+        return self._search(path) is not None
+
+    def filter(self, paths: Iterable[str]) -> List[str]:
+        """Return the paths that match, in their original order."""
+        return list(filter(self._search, paths))
@@ -0,0 +1,142 @@
+"""
+Replay recorded GitHub webhook deliveries against the Auto PR Review receiver.
+
+Usage:
+    python -m bot.features.auto_pr_review.replay payload.json [more.json ...]
+        [--event push] [--url http://localhost:8080/github/webhook] [--offline]
+
+Each file is either a bare webhook payload (pass `--event`) or a recorded
+delivery of the form {"headers": {"X-GitHub-Event": ...}, "payload": {...}},
+as copied from a repository's "Recent Deliveries" page.
+
+Deliveries are signed with GITHUB_WEBHOOK_SECRET from `.env` and POSTed to
+`--url`. With `--offline`, no server or network is needed: each delivery goes
+through an in-process receiver into the cog's real `handle_webhook`. Every
+replayed repo counts as tracked. Channel messages are printed, and the GitHub
+and DeepSeek calls behind reviews are replaced by printouts. Branch filtering,
+de-duplication and push/PR routing therefore run exactly as in the bot.
+"""
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import uuid
+
+from aiohttp import ClientSession
+from dotenv import load_dotenv
+
+from bot.features.auto_pr_review.webhooks import SIGNATURE_HEADER, WebhookServer, sign_payload
+
+
+def load_delivery(path, event=None):
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    if isinstance(data, dict) and "payload" in data and "headers" in data:
+        headers = dict(data["headers"])
+        payload = data["payload"]
+    else:
+        headers, payload = {}, data
+    if event:
+        headers["X-GitHub-Event"] = event
+    if "X-GitHub-Event" not in headers:
+        raise SystemExit(f"{path}: no X-GitHub-Event recorded, pass --event")
+    headers.setdefault("X-GitHub-Delivery", str(uuid.uuid4()))
+    return headers, payload
+
+
+class PrintChannel:
+    def __init__(self, channel_id):
+        self.id = channel_id
+
+    async def send(self, content=None, **kwargs):
+        print(f"  #{self.id} <- {content}")
+
+
+class OfflineBot:
+    def get_channel(self, channel_id):
+        return PrintChannel(channel_id)
+
+
+async def offline_cog(deliveries, directory):
+    """An AutoPRReviewCog that tracks every replayed repo and stays off the network."""
+    from bot.features.auto_pr_review.cog import AutoPRReviewCog
+    from bot.features.auto_pr_review.store import TrackerStore
+
+    cog = AutoPRReviewCog(OfflineBot())
+    cog.store = TrackerStore(os.path.join(directory, "replay.sqlite3"))
+    await cog.store.open()
+    for _, payload in deliveries:
+        key = (payload.get("repository") or {}).get("full_name")
+        if key:
+            cog.tracked_feeds.setdefault(key, {"atom_url": f"https://github.com/{key}/commits.atom", "last_id": "", "channel_id": key})
+
+    async def review_commit(key, entry):
+        return f"(AI review of {entry.get('id')} skipped offline)"
+
+    async def post_pr_review(channel, project, pull_number):
+        await channel.send(f"(AI review of {project}#{pull_number} skipped offline)")
+
+    cog.review_commit = review_commit
+    cog.post_pr_review = post_pr_review
+    return cog
+
+
+async def replay(paths, event, url, secret, offline):
+    deliveries = [load_delivery(path, event) for path in paths]
+
+    if offline:
+        from aiohttp.test_utils import TestClient, TestServer
+
+        directory = tempfile.TemporaryDirectory()
+        cog = await offline_cog(deliveries, directory.name)
+        server = WebhookServer(cog.handle_webhook, secret)
+        client = TestClient(TestServer(server.make_app()))
+        await client.start_server()
+        url = server.path
+        post = client.post
+    else:
+        client = ClientSession()
+        post = client.post
+
+    try:
+        for path, (headers, payload) in zip(paths, deliveries):
+            body = json.dumps(payload).encode("utf-8")
+            headers = {
+                "X-GitHub-Event": headers["X-GitHub-Event"],
+                "X-GitHub-Delivery": headers["X-GitHub-Delivery"],
+                "Content-Type": "application/json",
+                SIGNATURE_HEADER: sign_payload(secret, body),
+            }
+            async with post(url, data=body, headers=headers) as resp:
+                print(f"{path}: {headers['X-GitHub-Event']} -> HTTP {resp.status} {await resp.text()}")
+            if offline:
+                await server.drain()  # let the background dispatch run
+    finally:
+        await client.close()
+        if offline:
+            await cog.store.close()
+            directory.cleanup()
+
+
+def main():
+    load_dotenv()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("payloads", nargs="+", help="recorded payload or delivery JSON files")
+    parser.add_argument("--event", help="X-GitHub-Event for bare payload files (push, pull_request)")
+    parser.add_argument(
+        "--url",
+        default=f"http://localhost:{os.getenv('GITHUB_WEBHOOK_PORT', '8080')}{os.getenv('GITHUB_WEBHOOK_PATH', '/github/webhook')}",
+        help="receiver URL",
+    )
+    parser.add_argument("--secret", default=os.getenv("GITHUB_WEBHOOK_SECRET"), help="defaults to GITHUB_WEBHOOK_SECRET")
+    parser.add_argument("--offline", action="store_true", help="dispatch into an in-process cog that prints instead of posting")
+    args = parser.parse_args()
+    if not args.secret:
+        parser.error("set GITHUB_WEBHOOK_SECRET or pass --secret")
+
+    asyncio.run(replay(args.payloads, args.event, args.url, args.secret, args.offline))
+
+
+if __name__ == "__main__":
+    main()
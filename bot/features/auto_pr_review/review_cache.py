@@ -0,0 +1,116 @@
+import asyncio
+import hashlib
+import json
+import os
+import time
+from typing import Dict, Optional, Tuple
+
+
+class ReviewCache:
+    """
+    On-disk cache of AI reviews keyed by (repo, SHA, scope, prompt version).
+
+    Each review is one small JSON file named after the hash of its key. A file's
+    mtime is refreshed on every hit. When the directory grows past `max_bytes`,
+    the least recently used files are deleted. Bumping the prompt version leaves
+    old entries unreachable, and they age out the same way.
+    """
+
+    def __init__(self, directory: str, max_bytes: int = 20_000_000):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._sizes: Dict[str, Tuple[int, float]] = {}  # file name -> (size, last used)
+        self._total = 0
+        self._loaded = False
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(repo: str, sha: str, scope: str, prompt_version: int) -> str:
+        return f"{repo}@{sha}#{scope}:v{prompt_version}"
+
+    def _name(self, key: str) -> str:
+        return hashlib.sha256(key.encode("utf-8")).hexdigest() + ".json"
+
+    def _scan(self):
+        os.makedirs(self.directory, exist_ok=True)
+        for name in os.listdir(self.directory):
+            if not name.endswith(".json"):
+                continue
+            st = os.stat(os.path.join(self.directory, name))
+            self._sizes[name] = (st.st_size, st.st_mtime)
+        self._total = sum(size for size, _ in self._sizes.values())
+
+    async def _ensure_loaded(self):
+        if not self._loaded:
+            self._loaded = True
+            await asyncio.to_thread(self._scan)
+
+    def _read(self, name: str) -> Optional[dict]:
+        path = os.path.join(self.directory, name)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            os.utime(path)
+            return data
+        except (OSError, ValueError):
+            return None
+
+    def _write(self, name: str, data: dict) -> int:
+        path = os.path.join(self.directory, name)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+        return os.path.getsize(path)
+
+    def _delete(self, names):
+        for name in names:
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except OSError:
+                pass
+
+    async def get(self, key: str) -> Optional[str]:
+        await self._ensure_loaded()
+        name = self._name(key)
+        data = await asyncio.to_thread(self._read, name) if name in self._sizes else None
+        if data is None or data.get("key") != key:
+            self.misses += 1
+            return None
+        self._sizes[name] = (self._sizes[name][0], time.time())
+        self.hits += 1
+        return data.get("review")
+
+    async def put(self, key: str, review: str):
+        await self._ensure_loaded()
+        name = self._name(key)
+        try:
+            size = await asyncio.to_thread(self._write, name, {"key": key, "review": review, "created": time.time()})
+        except OSError as e:
+            print(f"Failed to store review in cache: {e}")
+            return
+        old_size, _ = self._sizes.get(name, (0, 0.0))
+        self._sizes[name] = (size, time.time())
+        self._total += size - old_size
+
+        if self._total > self.max_bytes:
+            evicted = []
+            for victim, (victim_size, _) in sorted(self._sizes.items(), key=lambda kv: kv[1][1]):
+                if self._total <= self.max_bytes or victim == name:
+                    break
+                del self._sizes[victim]
+                self._total -= victim_size
+                evicted.append(victim)
+            self.evictions += len(evicted)
+            await asyncio.to_thread(self._delete, evicted)
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "entries": len(self._sizes),
+            "bytes": self._total,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
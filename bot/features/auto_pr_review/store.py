@@ -0,0 +1,327 @@
+import asyncio
+import json
+import os
+import sqlite3
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS feeds (
+    key TEXT PRIMARY KEY,
+    atom_url TEXT NOT NULL,
+    channel_id INTEGER,
+    last_id TEXT,
+    etag TEXT,
+    last_modified TEXT
+);
+CREATE TABLE IF NOT EXISTS contributor_totals (
+    author TEXT PRIMARY KEY,
+    additions INTEGER NOT NULL DEFAULT 0,
+    deletions INTEGER NOT NULL DEFAULT 0,
+    changes INTEGER NOT NULL DEFAULT 0,
+    pr_count INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS contributor_repos (
+    author TEXT NOT NULL,
+    repo TEXT NOT NULL,
+    additions INTEGER NOT NULL DEFAULT 0,
+    deletions INTEGER NOT NULL DEFAULT 0,
+    changes INTEGER NOT NULL DEFAULT 0,
+    pr_count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (author, repo)
+);
+-- one row per pull request; windowed leaderboards are range scans over created_at
+CREATE TABLE IF NOT EXISTS pr_events (
+    repo TEXT NOT NULL,
+    number INTEGER NOT NULL,
+    author TEXT NOT NULL,
+    additions INTEGER NOT NULL,
+    deletions INTEGER NOT NULL,
+    created_at INTEGER NOT NULL,
+    PRIMARY KEY (repo, number)
+);
+CREATE INDEX IF NOT EXISTS idx_pr_events_time ON pr_events (created_at, author, additions, deletions);
+CREATE INDEX IF NOT EXISTS idx_pr_events_repo_time ON pr_events (repo, created_at, author, additions, deletions);
+CREATE INDEX IF NOT EXISTS idx_pr_events_author_time ON pr_events (author, created_at);
+CREATE INDEX IF NOT EXISTS idx_totals_changes ON contributor_totals (changes DESC);
+CREATE INDEX IF NOT EXISTS idx_repos_changes ON contributor_repos (repo, changes DESC);
+"""
+
+FEED_COLUMNS = ("atom_url", "channel_id", "last_id", "etag", "last_modified")
+
+UPSERT_FEED = """
+INSERT INTO feeds (key, atom_url, channel_id, last_id, etag, last_modified) VALUES (?, ?, ?, ?, ?, ?)
+ON CONFLICT(key) DO UPDATE SET
+    atom_url = excluded.atom_url, channel_id = excluded.channel_id, last_id = excluded.last_id,
+    etag = excluded.etag, last_modified = excluded.last_modified
+"""
+ADD_TOTALS = """
+INSERT INTO contributor_totals (author, additions, deletions, changes, pr_count) VALUES (?, ?, ?, ?, ?)
+ON CONFLICT(author) DO UPDATE SET
+    additions = additions + excluded.additions, deletions = deletions + excluded.deletions,
+    changes = changes + excluded.changes, pr_count = pr_count + excluded.pr_count
+"""
+ADD_REPO = """
+INSERT INTO contributor_repos (author, repo, additions, deletions, changes, pr_count) VALUES (?, ?, ?, ?, ?, ?)
+ON CONFLICT(author, repo) DO UPDATE SET
+    additions = additions + excluded.additions, deletions = deletions + excluded.deletions,
+    changes = changes + excluded.changes, pr_count = pr_count + excluded.pr_count
+"""
+
+
+class TrackerStore:
+    """
+    SQLite (WAL) storage for tracked feeds and contributor statistics.
+
+    Changes are queued as row-level operations and written together in one
+    transaction after `flush_delay` seconds. A burst of feed updates and PR
+    reviews therefore costs one commit. Each write touches only the rows that
+    changed. Contributor counters are incremented in SQL, so a flush can never
+    lose an update.
+
+    Every pull request is also kept as a timestamped row in `pr_events`.
+    All-time leaderboards read the maintained `contributor_*` aggregates.
+    Windowed ones (last N days, optionally per repo) are indexed range scans
+    over `pr_events`.
+
+    On first open, an existing `tracked_repos.json` is imported once.
+    """
+
+    def __init__(self, path: str, json_path: Optional[str] = None, flush_delay: float = 1.0):
+        self.path = path
+        self.json_path = json_path
+        self.flush_delay = flush_delay
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pending: List[Callable[[sqlite3.Connection], None]] = []
+        self._flush_task: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+
+    # --- lifecycle -------------------------------------------------------
+
+    def _open(self):
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(SCHEMA)
+        self._conn = conn
+        self._migrate_json()
+
+    async def open(self):
+        await asyncio.to_thread(self._open)
+
+    async def close(self):
+        await self.flush()
+        if self._conn is not None:
+            await asyncio.to_thread(self._conn.close)
+            self._conn = None
+
+    def _migrate_json(self):
+        conn = self._conn
+        if conn.execute("SELECT 1 FROM meta WHERE key = 'json_migrated'").fetchone():
+            return
+        data = {}
+        if self.json_path and os.path.exists(self.json_path):
+            try:
+                with open(self.json_path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"Could not read {self.json_path} for migration: {e}")
+        if not isinstance(data, dict):
+            data = {}
+        # older files held the feeds dict directly
+        feeds = data.get("feeds", data if "contributors" not in data else {})
+        contributors = data.get("contributors", {})
+
+        with conn:
+            for key, info in feeds.items():
+                if isinstance(info, dict) and info.get("atom_url"):
+                    conn.execute(UPSERT_FEED, (key, *(info.get(c) for c in FEED_COLUMNS)))
+            for author, stats in contributors.items():
+                conn.execute(
+                    "INSERT OR REPLACE INTO contributor_totals VALUES (?, ?, ?, ?, ?)",
+                    (author, stats.get("total_additions", 0), stats.get("total_deletions", 0),
+                     stats.get("total_changes", 0), stats.get("pr_count", 0)),
+                )
+                for repo, repo_stats in stats.get("repos", {}).items():
+                    conn.execute(
+                        "INSERT OR REPLACE INTO contributor_repos VALUES (?, ?, ?, ?, ?, ?)",
+                        (author, repo, repo_stats.get("additions", 0), repo_stats.get("deletions", 0),
+                         repo_stats.get("changes", 0), repo_stats.get("pr_count", 0)),
+                    )
+            conn.execute("INSERT INTO meta VALUES ('json_migrated', '1')")
+        if feeds or contributors:
+            print(f"Migrated {len(feeds)} feeds and {len(contributors)} contributors from {self.json_path}")
+
+    # --- reads -------------------------------------------------------------
+
+    def _load_feeds(self) -> Dict[str, dict]:
+        feeds = {}
+        for row in self._conn.execute("SELECT key, atom_url, channel_id, last_id, etag, last_modified FROM feeds"):
+            feeds[row[0]] = dict(zip(FEED_COLUMNS, row[1:]))
+        return feeds
+
+    async def load_feeds(self) -> Dict[str, dict]:
+        """Return tracked feeds in the shape the cog has always used."""
+        return await asyncio.to_thread(self._load_feeds)
+
+    def _query(self, sql: str, params: tuple = ()) -> List[tuple]:
+        return self._conn.execute(sql, params).fetchall()
+
+    async def query(self, sql: str, params: tuple = ()) -> List[tuple]:
+        """Run a read query after writing anything still queued."""
+        await self.flush()
+        async with self._lock:
+            return await asyncio.to_thread(self._query, sql, params)
+
+    async def leaderboard(self, limit: int = 10, since: Optional[int] = None, repo: Optional[str] = None) -> List[tuple]:
+        """
+        Top contributors by lines changed as (author, additions, deletions, changes, pr_count).
+
+        With `since` (unix time) only PRs opened since then count.
+        """
+        if since is None and repo is None:
+            return await self.query(
+                "SELECT author, additions, deletions, changes, pr_count FROM contributor_totals "
+                "ORDER BY changes DESC LIMIT ?",
+                (limit,),
+            )
+        if since is None:
+            return await self.query(
+                "SELECT author, additions, deletions, changes, pr_count FROM contributor_repos "
+                "WHERE repo = ? ORDER BY changes DESC LIMIT ?",
+                (repo, limit),
+            )
+        where, params = "created_at >= ?", (since,)
+        if repo is not None:
+            where, params = "repo = ? AND created_at >= ?", (repo, since)
+        return await self.query(
+            "SELECT author, SUM(additions), SUM(deletions), SUM(additions + deletions) AS changes, COUNT(*) "
+            f"FROM pr_events WHERE {where} GROUP BY author ORDER BY changes DESC LIMIT ?",
+            (*params, limit),
+        )
+
+    async def contributor_count(self, since: Optional[int] = None, repo: Optional[str] = None) -> int:
+        if since is None and repo is None:
+            rows = await self.query("SELECT COUNT(*) FROM contributor_totals")
+        elif since is None:
+            rows = await self.query("SELECT COUNT(*) FROM contributor_repos WHERE repo = ?", (repo,))
+        elif repo is None:
+            rows = await self.query("SELECT COUNT(DISTINCT author) FROM pr_events WHERE created_at >= ?", (since,))
+        else:
+            rows = await self.query(
+                "SELECT COUNT(DISTINCT author) FROM pr_events WHERE repo = ? AND created_at >= ?", (repo, since)
+            )
+        return rows[0][0]
+
+    async def contributor(self, author: str, since: Optional[int] = None) -> Optional[Tuple[tuple, List[tuple]]]:
+        """
+        Return ((additions, deletions, changes, pr_count), [(repo, additions, deletions, changes, pr_count), ...]).
+        """
+        if since is None:
+            totals = await self.query(
+                "SELECT additions, deletions, changes, pr_count FROM contributor_totals WHERE author = ?", (author,)
+            )
+            repos = await self.query(
+                "SELECT repo, additions, deletions, changes, pr_count FROM contributor_repos "
+                "WHERE author = ? ORDER BY changes DESC",
+                (author,),
+            )
+        else:
+            repos = await self.query(
+                "SELECT repo, SUM(additions), SUM(deletions), SUM(additions + deletions) AS changes, COUNT(*) "
+                "FROM pr_events WHERE author = ? AND created_at >= ? GROUP BY repo ORDER BY changes DESC",
+                (author, since),
+            )
+            totals = [tuple(sum(r[i] for r in repos) for i in range(1, 5))] if repos else []
+        if not totals:
+            return None
+        return totals[0], repos
+
+    # --- writes ------------------------------------------------------------
+
+    def save_feed(self, key: str, info: dict):
+        self._queue(UPSERT_FEED, (key, *(info.get(c) for c in FEED_COLUMNS)))
+
+    def delete_feed(self, key: str):
+        self._queue("DELETE FROM feeds WHERE key = ?", (key,))
+
+    def record_pr(self, repo: str, number: int, author: str, additions: int, deletions: int, created_at: int):
+        """
+        Record a pull request and fold it into the contributor aggregates.
+
+        A PR seen again (re-reviewed, new commits pushed, backfilled) replaces
+        its earlier numbers instead of counting twice.
+        """
+        self._pending_op(lambda conn: _record_pr(conn, repo, number, author, additions, deletions, created_at))
+
+    def rebuild_aggregates(self, repos: Iterable[str]):
+        """Recompute the aggregates of `repos` from `pr_events`, e.g. after a backfill."""
+        self._pending_op(lambda conn: _rebuild_aggregates(conn, list(repos)))
+
+    def _queue(self, sql: str, params: tuple):
+        self._pending_op(lambda conn: conn.execute(sql, params))
+
+    def _pending_op(self, op: Callable[[sqlite3.Connection], None]):
+        self._pending.append(op)
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.get_running_loop().create_task(self._flush_later())
+
+    async def _flush_later(self):
+        await asyncio.sleep(self.flush_delay)
+        await self.flush()
+
+    def _write(self, batch: List[Callable[[sqlite3.Connection], None]]):
+        with self._conn:
+            for op in batch:
+                op(self._conn)
+
+    async def flush(self):
+        """Write every queued change in one transaction."""
+        async with self._lock:
+            if not self._pending or self._conn is None:
+                return
+            batch, self._pending = self._pending, []
+            try:
+                await asyncio.to_thread(self._write, batch)
+            except sqlite3.Error as e:
+                # keep the changes for the next flush rather than dropping them
+                self._pending[:0] = batch
+                print(f"Failed to write tracker store: {e}")
+
+
+def _record_pr(conn: sqlite3.Connection, repo, number, author, additions, deletions, created_at):
+    previous = conn.execute(
+        "SELECT author, additions, deletions FROM pr_events WHERE repo = ? AND number = ?", (repo, number)
+    ).fetchone()
+    conn.execute(
+        "INSERT OR REPLACE INTO pr_events (repo, number, author, additions, deletions, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+        (repo, number, author, additions, deletions, created_at),
+    )
+    if previous is not None:
+        # take the old numbers back out before adding the new ones
+        old_author, old_additions, old_deletions = previous
+        old_changes = old_additions + old_deletions
+        conn.execute(ADD_TOTALS, (old_author, -old_additions, -old_deletions, -old_changes, -1))
+        conn.execute(ADD_REPO, (old_author, repo, -old_additions, -old_deletions, -old_changes, -1))
+    changes = additions + deletions
+    conn.execute(ADD_TOTALS, (author, additions, deletions, changes, 1))
+    conn.execute(ADD_REPO, (author, repo, additions, deletions, changes, 1))
+
+
+def _rebuild_aggregates(conn: sqlite3.Connection, repos: List[str]):
+    for repo in repos:
+        conn.execute("DELETE FROM contributor_repos WHERE repo = ?", (repo,))
+        conn.execute(
+            "INSERT INTO contributor_repos (author, repo, additions, deletions, changes, pr_count) "
+            "SELECT author, repo, SUM(additions), SUM(deletions), SUM(additions + deletions), COUNT(*) "
+            "FROM pr_events WHERE repo = ? GROUP BY author",
+            (repo,),
+        )
+    conn.execute("DELETE FROM contributor_totals")
+    conn.execute(
+        "INSERT INTO contributor_totals (author, additions, deletions, changes, pr_count) "
+        "SELECT author, SUM(additions), SUM(deletions), SUM(changes), SUM(pr_count) FROM contributor_repos GROUP BY author"
+    )
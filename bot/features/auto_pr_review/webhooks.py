@@ -0,0 +1,118 @@
+import asyncio
+import hashlib
+import hmac
+import json
+import logging
+from collections import deque
+from typing import Awaitable, Callable, Optional
+
+from aiohttp import web
+
+HANDLED_EVENTS = {"push", "pull_request"}
+SIGNATURE_HEADER = "X-Hub-Signature-256"
+
+logger = logging.getLogger(__name__)
+
+
+def sign_payload(secret: str, body: bytes) -> str:
+    """Return the `X-Hub-Signature-256` value GitHub sends for `body`."""
+    return "sha256=" + hmac.new(secret.encode("utf-8"), body, hashlib.sha256).hexdigest()
+
+
+def verify_signature(secret: str, body: bytes, signature: Optional[str]) -> bool:
+    if not signature:
+        return False
+    return hmac.compare_digest(sign_payload(secret, body), signature)
+
+
+class WebhookServer:
+    """
+    Small aiohttp server that receives GitHub webhooks inside the bot process.
+
+    Every delivery must carry a valid HMAC-SHA256 signature made with `secret`.
+    `push` and `pull_request` events are passed to `handler(event, payload)` in
+    the background, so GitHub gets its 202 right away. Other events (including
+    the initial `ping`) are acknowledged and ignored. Redelivered payloads are
+    dropped by their `X-GitHub-Delivery` id.
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[str, dict], Awaitable[None]],
+        secret: str,
+        host: str = "0.0.0.0",
+        port: int = 8080,
+        path: str = "/github/webhook",
+    ):
+        self.handler = handler
+        self.secret = secret
+        self.host = host
+        self.port = port
+        self.path = path
+        self._runner: Optional[web.AppRunner] = None
+        self._recent_deliveries = deque(maxlen=256)
+        self._tasks = set()
+        self.received = 0
+        self.rejected = 0
+
+    def make_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post(self.path, self.receive)
+        return app
+
+    async def start(self):
+        self._runner = web.AppRunner(self.make_app())
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        logger.info(f"GitHub webhook receiver listening on {self.host}:{self.port}{self.path}")
+
+    async def drain(self):
+        """Wait until every delivery accepted so far has been handled."""
+        while self._tasks:
+            await asyncio.gather(*list(self._tasks), return_exceptions=True)
+
+    async def stop(self, timeout: float = 10.0):
+        """Stop accepting deliveries, give accepted ones `timeout` seconds to finish, then cancel the rest."""
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+        try:
+            await asyncio.wait_for(self.drain(), timeout)
+        except asyncio.TimeoutError:
+            pending = list(self._tasks)
+            logger.warning(f"Cancelling {len(pending)} webhook deliveries still running after {timeout}s")
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+
+    async def receive(self, request: web.Request) -> web.Response:
+        body = await request.read()
+        if not verify_signature(self.secret, body, request.headers.get(SIGNATURE_HEADER)):
+            self.rejected += 1
+            return web.Response(status=401, text="invalid signature")
+
+        event = request.headers.get("X-GitHub-Event", "")
+        delivery = request.headers.get("X-GitHub-Delivery")
+        if event not in HANDLED_EVENTS:
+            return web.Response(status=202, text=f"ignored {event or 'unknown'} event")
+        if delivery and delivery in self._recent_deliveries:
+            return web.Response(status=202, text="duplicate delivery")
+
+        try:
+            payload = json.loads(body)
+        except ValueError:
+            return web.Response(status=400, text="invalid JSON")
+
+        if delivery:
+            self._recent_deliveries.append(delivery)
+        self.received += 1
+        task = asyncio.create_task(self._dispatch(event, payload))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return web.Response(status=202, text="accepted")
+
+    async def _dispatch(self, event: str, payload: dict):
+        try:
+            await self.handler(event, payload)
+        except Exception as e:
+            logger.error(f"Error handling {event} webhook: {e}")
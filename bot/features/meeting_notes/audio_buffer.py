@@ -0,0 +1,224 @@
+import threading
+from typing import Dict, Hashable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+SAMPLE_RATE = 48000
+BLOCK_SAMPLES = SAMPLE_RATE  # one second of mono int16 per block
+
+
+class BufferFull(Exception):
+    """Raised when the pool would grow past its block limit."""
+
+
+class BlockPool:
+    """
+    Fixed-size int16 blocks that are reused instead of allocated per packet.
+
+    Blocks are handed out by `acquire` and returned by `release`. Returned
+    blocks are zeroed and kept on a free list. The pool grows on demand up to
+    `max_blocks` (0 means no limit).
+    """
+
+    def __init__(self, block_samples: int = BLOCK_SAMPLES, max_blocks: int = 0):
+        self.block_samples = block_samples
+        self.max_blocks = max_blocks
+        self._free: List[np.ndarray] = []
+        self.allocated = 0
+
+    @property
+    def block_bytes(self) -> int:
+        return self.block_samples * 2
+
+    def acquire(self) -> np.ndarray:
+        if self._free:
+            return self._free.pop()
+        if self.max_blocks and self.allocated >= self.max_blocks:
+            raise BufferFull(f"audio buffer limit of {self.max_blocks} blocks reached")
+        self.allocated += 1
+        return np.zeros(self.block_samples, dtype=np.int16)
+
+    def release(self, block: np.ndarray):
+        block.fill(0)
+        self._free.append(block)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "allocated": self.allocated,
+            "free": len(self._free),
+            "bytes": self.allocated * self.block_bytes,
+        }
+
+
+class SpeakerBuffer:
+    """
+    One speaker's PCM on the session timeline, as sparse pool blocks.
+
+    Block `i` holds samples `i * block_samples` onward. Blocks are only
+    acquired for seconds the speaker actually talked; a missing block is
+    silence.
+    """
+
+    def __init__(self, pool: BlockPool):
+        self.pool = pool
+        self.blocks: Dict[int, np.ndarray] = {}
+        self.length = 0  # end of the furthest write, in samples
+
+    def write(self, samples: np.ndarray, position: Optional[int] = None) -> int:
+        """
+        Copy `samples` into the blocks at `position` (default: after the last
+        write). Returns how many samples fit before the pool ran out.
+        """
+        size = self.pool.block_samples
+        position = self.length if position is None else position
+        pos = 0
+        while pos < len(samples):
+            index, offset = divmod(position + pos, size)
+            block = self.blocks.get(index)
+            if block is None:
+                try:
+                    block = self.blocks[index] = self.pool.acquire()
+                except BufferFull:
+                    break
+            count = min(size - offset, len(samples) - pos)
+            block[offset:offset + count] = samples[pos:pos + count]
+            pos += count
+            self.length = max(self.length, position + pos)
+        return pos
+
+    def release(self):
+        for block in self.blocks.values():
+            self.pool.release(block)
+        self.blocks = {}
+        self.length = 0
+
+
+class RecordingBuffer:
+    """
+    Per-speaker PCM for one recording session, stored in pooled blocks.
+
+    `write` is called from the voice receive thread; everything else runs on
+    the event loop or the disk writer, so all access goes through one lock.
+    Speakers are keyed by user id, or by SSRC while the user is not yet known.
+    All speakers share one sample clock, so block `i` of every speaker covers
+    the same second. Finished blocks are taken off the front with `pop_ready`
+    and their memory goes back to the pool.
+    """
+
+    def __init__(self, sample_rate: int = SAMPLE_RATE, max_bytes: int = 0):
+        self.sample_rate = sample_rate
+        block_samples = sample_rate
+        self.pool = BlockPool(block_samples, max_bytes // (block_samples * 2) if max_bytes else 0)
+        self.speakers: Dict[Hashable, SpeakerBuffer] = {}
+        self.flushed = 0  # blocks already handed out by pop_ready
+        self.dropped = 0  # samples dropped because the pool was full
+        self.late = 0  # samples that arrived after their block was flushed
+        self._acc = np.empty(block_samples, dtype=np.int32)
+        self._lock = threading.Lock()
+
+    def __bool__(self) -> bool:
+        return any(speaker.length for speaker in self.speakers.values())
+
+    @property
+    def length(self) -> int:
+        """End of the session timeline, in samples."""
+        return max((speaker.length for speaker in self.speakers.values()), default=0)
+
+    def write(self, key: Hashable, samples: np.ndarray, position: Optional[int] = None):
+        with self._lock:
+            speaker = self.speakers.get(key)
+            if speaker is None:
+                speaker = self.speakers[key] = SpeakerBuffer(self.pool)
+            position = speaker.length if position is None else position
+            # the part of a late packet that falls into already flushed blocks is discarded
+            skip = min(len(samples), max(0, self.flushed * self.pool.block_samples - position))
+            if skip:
+                self.late += skip
+                samples, position = samples[skip:], position + skip
+            self.dropped += len(samples) - speaker.write(samples, position)
+
+    def pop_ready(
+        self, watermark: Optional[int] = None, tracks: bool = False
+    ) -> Optional[Tuple[np.ndarray, Dict[Hashable, np.ndarray]]]:
+        """
+        Remove the oldest unflushed block and return it mixed, or None.
+
+        A block is ready once it ends at or before `watermark` (a sample
+        position); with no watermark every remaining block is ready. Speakers
+        are summed in an int32 accumulator and saturated back to int16, so
+        overlapping speech clips instead of wrapping around. With `tracks`, each
+        speaker's own copy of the block is returned as well (silent speakers
+        are left out).
+        """
+        size = self.pool.block_samples
+        with self._lock:
+            index = self.flushed
+            start = index * size
+            length = self.length
+            if watermark is None:
+                if start >= length:
+                    return None
+                count = min(size, length - start)
+            elif start + size <= watermark:
+                count = size
+            else:
+                return None
+
+            parts = {}
+            for key, speaker in self.speakers.items():
+                block = speaker.blocks.pop(index, None)
+                if block is not None:
+                    parts[key] = block
+            if not parts:
+                mixed = np.zeros(count, dtype=np.int16)
+            elif len(parts) == 1:
+                mixed = next(iter(parts.values()))[:count].copy()
+            else:
+                acc = self._acc
+                blocks = iter(parts.values())
+                np.copyto(acc, next(blocks))
+                for block in blocks:
+                    np.add(acc, block, out=acc)
+                np.clip(acc, -32768, 32767, out=acc)
+                mixed = acc[:count].astype(np.int16)
+            own = {key: block[:count].copy() for key, block in parts.items()} if tracks else {}
+            for block in parts.values():
+                self.pool.release(block)
+            self.flushed += 1
+            return mixed, own
+
+    def duration(self, key: Optional[Hashable] = None) -> float:
+        with self._lock:
+            if key is not None:
+                speaker = self.speakers.get(key)
+                return speaker.length / self.sample_rate if speaker else 0.0
+            return self.length / self.sample_rate
+
+    def stats(self) -> Dict[str, object]:
+        """Memory report for the session: pool usage and per-speaker block counts."""
+        with self._lock:
+            speakers = {
+                key: {
+                    "seconds": len(speaker.blocks) * self.pool.block_samples / self.sample_rate,
+                    "blocks": len(speaker.blocks),
+                    "bytes": len(speaker.blocks) * self.pool.block_bytes,
+                }
+                for key, speaker in self.speakers.items()
+            }
+            return {
+                "pool": self.pool.stats(),
+                "speakers": speakers,
+                "flushed_seconds": self.flushed * self.pool.block_samples / self.sample_rate,
+                "dropped_seconds": self.dropped / self.sample_rate,
+                "late_seconds": self.late / self.sample_rate,
+            }
+
+    def release(self):
+        """Return every block to the pool and forget the speakers."""
+        with self._lock:
+            for speaker in self.speakers.values():
+                speaker.release()
+            self.speakers = {}
+            self.flushed = 0
+            self.dropped = 0
+            self.late = 0
@@ -0,0 +1,137 @@
+import logging
+import os
+import queue
+import threading
+from typing import Callable, Dict, Hashable, Optional
+
+import numpy as np
+import soundfile as sf
+
+from bot.features.meeting_notes.audio_buffer import RecordingBuffer
+
+log = logging.getLogger(__name__)
+
+
+class AudioWriter:
+    """
+    Streams a recording to disk from a background thread.
+
+    Finished blocks are moved from the `RecordingBuffer` into a bounded queue
+    by `pump`. That is called from the voice receive thread after each packet
+    and periodically from the event loop. The writer thread appends them to a
+    WAV file and flushes after every block, so the header is always current and
+    a crash loses at most the last few seconds. When the queue is full, blocks
+    simply stay in the buffer (itself bounded) until the disk catches up.
+
+    With `tracks`, every speaker also gets their own file on the same timeline.
+    `on_block`, if given, is called from the writer thread with every mixed
+    block after it is written.
+    """
+
+    def __init__(
+        self,
+        buffer: RecordingBuffer,
+        path: str,
+        latency: int,
+        queue_blocks: int = 8,
+        tracks: bool = False,
+        on_block: Optional[Callable[[np.ndarray], None]] = None,
+    ):
+        self.buffer = buffer
+        self.on_block = on_block
+        self.path = path
+        self.latency = latency  # samples to wait before a block counts as finished
+        self.tracks = tracks
+        self.track_paths: Dict[Hashable, str] = {}
+        self.frames = 0  # samples written to the mix
+        self.queue: "queue.Queue" = queue.Queue(maxsize=queue_blocks)
+        self.error: Optional[BaseException] = None
+        self._pump_lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name="meeting-audio-writer", daemon=True)
+
+    def start(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._thread.start()
+
+    def pump(self, now: Optional[int] = None) -> int:
+        """
+        Queue every block that ended `latency` samples before `now`; with no
+        `now`, queue everything left. Returns how many blocks were queued.
+        """
+        final = now is None
+        watermark = None if final else now - self.latency
+        queued = 0
+        with self._pump_lock:
+            while final or not self.queue.full():
+                item = self.buffer.pop_ready(watermark, tracks=self.tracks)
+                if item is None:
+                    break
+                # the final drain may wait for the writer; the voice thread never does
+                self.queue.put(item, block=final)
+                queued += 1
+        return queued
+
+    def close(self):
+        """Drain the buffer, wait for the writer and close the files. Blocking."""
+        if self._thread.is_alive():
+            self.pump()
+            self.queue.put(None)
+            self._thread.join()
+        if self.error is not None:
+            raise self.error
+
+    def _track_path(self, index: int) -> str:
+        stem, ext = os.path.splitext(self.path)
+        return f"{stem}_speaker{index}{ext}"
+
+    def _run(self):
+        sample_rate = self.buffer.sample_rate
+        silence = np.zeros(self.buffer.pool.block_samples, dtype=np.int16)
+        files: Dict[Hashable, sf.SoundFile] = {}
+        mix = None
+        try:
+            mix = sf.SoundFile(self.path, "w", sample_rate, 1, subtype="PCM_16")
+            while True:
+                item = self.queue.get()
+                if item is None:
+                    break
+                mixed, own = item
+                for key, block in own.items():
+                    track = files.get(key)
+                    if track is None:
+                        path = self._track_path(len(files))
+                        track = files[key] = sf.SoundFile(path, "w", sample_rate, 1, subtype="PCM_16")
+                        self.track_paths[key] = path
+                        # a speaker who joins late starts with silence, so every track shares the timeline
+                        for start in range(0, self.frames, len(silence)):
+                            track.write(silence[:self.frames - start])
+                    track.write(block)
+                for key, track in files.items():
+                    if key not in own:
+                        track.write(silence[:len(mixed)])
+                mix.write(mixed)
+                mix.flush()
+                self.frames += len(mixed)
+                if self.on_block is not None:
+                    try:
+                        self.on_block(mixed)
+                    except Exception as e:
+                        log.error(f"Audio block listener failed: {e}")
+                        self.on_block = None
+        except BaseException as e:
+            log.error(f"Audio writer failed: {e}")
+            self.error = e
+            # keep draining so producers waiting on the queue are not blocked forever
+            while self.queue.get() is not None:
+                pass
+        finally:
+            for f in [*files.values(), mix]:
+                if f is not None and not f.closed:
+                    f.close()
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "written_seconds": self.frames / self.buffer.sample_rate,
+            "queued": self.queue.qsize(),
+            "bytes": os.path.getsize(self.path) if os.path.exists(self.path) else 0,
+        }
@@ -1,11 +1,11 @@
 import discord
 from discord.ext import commands
 import discord.ext.voice_recv as voice_recv
-from openai import OpenAI
 import soundfile as sf
 import numpy as np
 import asyncio
 import os
+import time
 import logging
 from dotenv import load_dotenv
 import ctypes
@@ -16,17 +16,38 @@ from google.oauth2.service_account import Credentials
 from googleapiclient.errors import HttpError
 from datetime import datetime
 
+from bot.core.llm import chat_completion, stream_chat_completion, stream_to_message
+from bot.features.meeting_notes.audio_buffer import SAMPLE_RATE, RecordingBuffer
+from bot.features.meeting_notes.audio_writer import AudioWriter
+from bot.features.meeting_notes.live_transcription import LiveTranscriber, create_streaming_backend
+from bot.features.meeting_notes.transcode import iter_file, transcode
+
 log = logging.getLogger(__name__)
 
-# Initialize OpenAI client
 load_dotenv()
 
-client = OpenAI(api_key=os.environ.get('DEEPSEEK_API_KEY'), base_url="https://api.deepseek.com")
-
 DEEPGRAM_API_KEY = os.getenv("DEEPGRAM_API_KEY")
 
 deepgram = DeepgramClient(api_key=DEEPGRAM_API_KEY)
 
+# Upper bound on recorded PCM held in memory per session (0 = unlimited); audio normally
+# stays in memory only until it is written to disk, so this only fills if the disk stalls
+MAX_BUFFER_BYTES = int(os.getenv("MEETING_BUFFER_MAX_MB", "64")) * 1024 * 1024
+# Recordings are streamed here while recording and deleted once processed
+RECORDING_DIR = os.getenv("MEETING_RECORDING_DIR", "meeting_recordings")
+# Audio is written to disk once it is this old, leaving time for late packets
+WRITE_LATENCY = SAMPLE_RATE  # samples
+# Recordings are downsampled to this rate (a divisor of 48000) and FLAC-encoded before upload
+UPLOAD_SAMPLE_RATE = int(os.getenv("MEETING_UPLOAD_SAMPLE_RATE", "16000"))
+# Cut long silences from the mixed recording before upload (frames quieter than the threshold)
+VAD_TRIM = os.getenv("MEETING_VAD_TRIM", "false").lower() == "true"
+VAD_THRESHOLD_DB = float(os.getenv("MEETING_VAD_THRESHOLD_DB", "-45"))
+# Transcribe while recording: off | fake (offline, for testing) | deepgram (live websocket);
+# !stop then only has to summarize, falling back to batch transcription if streaming failed
+LIVE_TRANSCRIPTION = os.getenv("MEETING_LIVE_TRANSCRIPTION", "off")
+# Also save one track per speaker and transcribe them separately, labelled by speaker
+SPEAKER_TRACKS = os.getenv("MEETING_SPEAKER_TRACKS", "false").lower() == "true"
+
 # Load Opus DLL for audio decoding
 opus_path = os.getenv("OPUS_DLL_PATH")
 
@@ -53,22 +74,87 @@ ctypes.cdll.LoadLibrary(str(opus_dll_path))
 
 import opuslib
 
-# Decodes incoming Opus audio and stores PCM samples
+FRAME_SAMPLES = 960  # one 20 ms Opus frame at 48 kHz
+MAX_CONCEALED_FRAMES = 5  # longer gaps are left silent instead of concealed
+MAX_CLOCK_DRIFT = 2 * SAMPLE_RATE  # re-anchor a stream whose RTP clock strays this far from wall time
+
+
+# Opus decoder and RTP clock for one SSRC
+class SpeakerDecoder:
+    def __init__(self, clock):
+        self.decoder = opuslib.Decoder(SAMPLE_RATE, 1)
+        self.clock = clock
+        self.base_timestamp = None
+        self.anchor = 0
+        self.last_sequence = None
+        self.concealed = 0
+
+    def position(self, timestamp):
+        """Place an RTP timestamp on the session timeline (samples since recording started)."""
+        now = self.clock()
+        if self.base_timestamp is not None:
+            position = self.anchor + (timestamp - self.base_timestamp) % 2**32
+            if abs(position - now) <= MAX_CLOCK_DRIFT:
+                return position
+        # first packet, or the sender's clock jumped: pin this timestamp to wall time
+        self.base_timestamp, self.anchor = timestamp, now
+        return now
+
+    def decode(self, packet):
+        """Decode a packet into (position, pcm) frames, concealing packets lost just before it."""
+        frames = []
+        if self.last_sequence is not None:
+            lost = (packet.sequence - self.last_sequence - 1) % 2**16
+            if lost >= 2**15:
+                return frames  # late or duplicate packet; its slot has already been filled
+            if lost <= MAX_CONCEALED_FRAMES:
+                for back in range(lost, 0, -1):
+                    timestamp = (packet.timestamp - back * FRAME_SAMPLES) % 2**32
+                    if back == 1:
+                        # the frame right before this packet is rebuilt from its in-band FEC data
+                        pcm = self.decoder.decode(packet.decrypted_data, FRAME_SAMPLES, decode_fec=True)
+                    else:
+                        pcm = self.decoder.decode(b"", FRAME_SAMPLES, decode_fec=False)  # PLC
+                    frames.append((self.position(timestamp), pcm))
+                self.concealed += lost
+        self.last_sequence = packet.sequence
+        pcm = self.decoder.decode(packet.decrypted_data, FRAME_SAMPLES, decode_fec=False)
+        frames.append((self.position(packet.timestamp), pcm))
+        return frames
+
+
+# Decodes incoming Opus audio and stores PCM samples on a shared timeline
 class CombinedRecorder(voice_recv.AudioSink):
     def __init__(self, cog):
         super().__init__()
         self.cog = cog
-        self.decoder = opuslib.Decoder(48000, 1)
+        self.started = time.monotonic()
+        # decoder state is per stream: interleaving speakers through one decoder corrupts it
+        self.decoders = {}
 
     def wants_opus(self) -> bool:
         return True
 
+    def clock(self):
+        return int((time.monotonic() - self.started) * SAMPLE_RATE)
+
     def write(self, user, data):
+        packet = data.packet
+        # lost packets arrive as falsy placeholders and injected silence has no sequence;
+        # both are left as gaps, and losses are concealed once the next packet arrives
+        if not packet or packet.sequence < 0 or not data.opus:
+            return
         try:
-            if data.opus:
-                pcm = self.decoder.decode(data.opus, 960, decode_fec=False)
-                audio = np.frombuffer(pcm, dtype=np.int16)
-                self.cog.audio_buffer.append(audio)
+            decoder = self.decoders.get(packet.ssrc)
+            if decoder is None:
+                decoder = self.decoders[packet.ssrc] = SpeakerDecoder(self.clock)
+            # speakers are keyed by user id; packets from a not yet identified user by SSRC
+            key = user.id if user is not None else ("ssrc", packet.ssrc)
+            for position, pcm in decoder.decode(packet):
+                self.cog.audio_buffer.write(key, np.frombuffer(pcm, dtype=np.int16), position)
+            writer = self.cog.writer
+            if writer is not None:
+                writer.pump(self.clock())
         except opuslib.OpusError as e:
             log.warning(f"Decode error from {user}: {e}")
         except Exception as e:
@@ -83,9 +169,19 @@ class MeetingNotesCog(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
         self.vc = None
-        self.audio_buffer = []
+        self.audio_buffer = RecordingBuffer(max_bytes=MAX_BUFFER_BYTES)
+        self.track_paths = {}
+        self.writer = None
+        self.pump_task = None
+        self.live = None
         self.opus_available = self._validate_opus()
         super().__init__()
+
+        # recordings are deleted once processed, so anything left over was interrupted
+        if os.path.isdir(RECORDING_DIR):
+            leftovers = sorted(os.listdir(RECORDING_DIR))
+            if leftovers:
+                log.warning(f"Unprocessed recordings in {RECORDING_DIR}: {', '.join(leftovers)}")
     
     def _validate_opus(self) -> bool:
         """Validate that Opus library is loaded correctly."""
@@ -102,44 +198,129 @@ class MeetingNotesCog(commands.Cog):
             log.error(f"❌ Opus library validation failed: {e}")
             return False
 
-    # Create WAV file from recorded audio
+    # Finish the WAV file the writer has been streaming to disk during the recording
     async def cleanup(self):
-        if not self.audio_buffer:
-            print("No audio data received.")
+        if self.pump_task is not None:
+            self.pump_task.cancel()
+            self.pump_task = None
+        if self.writer is None:
             return None
 
+        log.info(f"Recording buffer before final flush: {self.format_buffer_stats()}")
+        writer, self.writer = self.writer, None
+
         # Move blocking I/O to executor to prevent bot freeze
-        def save_audio():
-            all_audio = np.concatenate(self.audio_buffer).astype(np.int16)
-            sf.write("meeting_audio.wav", all_audio, 48000, subtype="PCM_16")
-            print("Audio saved to meeting_audio.wav")
-            return "meeting_audio.wav"
-        
         loop = self.bot.loop
-        file_path = await loop.run_in_executor(None, save_audio)
-        return file_path
+        try:
+            await loop.run_in_executor(None, writer.close)
+        finally:
+            self.audio_buffer.release()
+        self.track_paths = writer.track_paths
+
+        if not writer.frames:
+            print("No audio data received.")
+            for path in [writer.path, *self.track_paths.values()]:
+                os.remove(path)
+            self.track_paths = {}
+            return None
+        print(f"Audio saved to {writer.path} ({len(self.track_paths)} speaker track(s))")
+        return writer.path
+
+    # Move finished blocks to the writer even while nobody is talking
+    async def pump_audio(self):
+        while True:
+            await asyncio.sleep(1)
+            self.writer.pump(self.recorder.clock())
+
+    # Transcribe one recording with Deepgram without blocking the event loop. The WAV is
+    # first shrunk to a 16 kHz FLAC, which is streamed from disk during the upload.
+    async def transcribe(self, file_path, trim=False, **options):
+        upload_path = os.path.splitext(file_path)[0] + ".flac"
+
+        def run():
+            stats = transcode(file_path, upload_path, rate=UPLOAD_SAMPLE_RATE, trim=trim, threshold_db=VAD_THRESHOLD_DB)
+            log.info(
+                f"Uploading {upload_path}: {stats['seconds_out']:.0f}s of {stats['seconds_in']:.0f}s, "
+                f"{stats['bytes_out'] / 1e6:.1f} MB (WAV was {stats['bytes_in'] / 1e6:.1f} MB)"
+            )
+            return deepgram.listen.v1.media.transcribe_file(
+                request=iter_file(upload_path),
+                model="nova-3",
+                smart_format=True,
+                **options,
+            )
+
+        try:
+            return await self.bot.loop.run_in_executor(None, run)
+        finally:
+            if os.path.exists(upload_path):
+                os.remove(upload_path)
+
+    # Finish live transcription; returns its transcript, or None if batch transcription is needed
+    async def finish_live(self):
+        if self.live is None:
+            return None
+        live, self.live = self.live, None
+        await live.finish()
+        stats = live.stats()
+        log.info(
+            f"Live transcription: {stats['segments']} segments from {stats['sent_seconds']:.0f}s of audio, "
+            f"{stats['dropped_seconds']:.0f}s dropped"
+        )
+        if live.error is not None or live.dropped:
+            return None
+        return live.transcript() or None
+
+    # Transcribe each speaker track and interleave the utterances by start time; tracks are
+    # never silence-trimmed, as that would shift their timestamps against each other
+    async def transcribe_tracks(self, guild):
+        segments = []
+        for key, path in self.track_paths.items():
+            member = guild.get_member(key) if isinstance(key, int) and guild else None
+            name = member.display_name if member else f"Speaker {key[1] if isinstance(key, tuple) else key}"
+            response = await self.transcribe(path, utterances=True)
+            for utterance in getattr(response.results, "utterances", None) or []:
+                segments.append((utterance.start, name, utterance.transcript))
+        segments.sort(key=lambda segment: segment[0])
+        return "\n".join(f"{name}: {text}" for _, name, text in segments)
+
+    def format_buffer_stats(self) -> str:
+        stats = self.audio_buffer.stats()
+        pool = stats["pool"]
+        text = (
+            f"{len(stats['speakers'])} speaker(s), {self.audio_buffer.duration():.0f}s, "
+            f"{pool['allocated']} blocks ({pool['bytes'] / 1e6:.1f} MB, {pool['free']} free)"
+        )
+        if stats["dropped_seconds"]:
+            text += f", {stats['dropped_seconds']:.0f}s dropped at the buffer limit"
+        if stats["late_seconds"]:
+            text += f", {stats['late_seconds']:.1f}s arrived after being written"
+        return text
     
-    # Summarize text using DeepSeek
-    async def summarize_text(self, text):
+    # Summarize text using DeepSeek, streaming into `destination` when one is given
+    async def summarize_text(self, text, destination=None):
+        messages = [
+            {
+                "role": "system",
+                "content": (
+                    "You are an AI that summarizes multi-speaker meeting transcripts."
+                    "Write a concise summary focusing on key topics, decisions, and action items."
+                    "Ignore filler words or greetings. Write in a bullet points."
+                    "Focus on tasks assigned to each individual and any general descisions made."
+                ),
+            },
+            {"role": "user", "content": text},
+        ]
         try:
-            response = client.chat.completions.create(
-                model="deepseek-chat",
-                messages=[
-                    {
-                        "role": "system",
-                        "content": (
-                            "You are an AI that summarizes multi-speaker meeting transcripts."
-                            "Write a concise summary focusing on key topics, decisions, and action items."
-                            "Ignore filler words or greetings. Write in a bullet points."
-                            "Focus on tasks assigned to each individual and any general descisions made."
-                        ),
-                    },
-                    {"role": "user", "content": text},
-                ],
-                stream=False,
-                max_tokens=300,
+            if destination is None:
+                return await chat_completion(messages, model="deepseek-chat", max_tokens=300) or None
+            summary = await stream_to_message(
+                destination,
+                stream_chat_completion(messages, model="deepseek-chat", max_tokens=300),
+                placeholder="**Meeting Summary:**\n⏳ Summarizing...",
+                render=lambda partial: f"**Meeting Summary:**\n```{partial.strip()}```",
             )
-            return response.choices[0].message.content.strip()
+            return summary.strip() or None
         except Exception as e:
             log.error(f"Error during summarization: {e}")
             return None
@@ -198,14 +379,70 @@ class MeetingNotesCog(commands.Cog):
         if ctx.author.voice is None:
             return await ctx.send("You must be in a voice channel to use this command.")
 
+        if self.vc is not None or self.writer is not None:
+            return await ctx.send("I'm already recording. Use `!stop` to end the current recording first.")
+
         channel = ctx.author.voice.channel
         self.vc = await channel.connect(cls=voice_recv.VoiceRecvClient)
-
+        # a new session is starting: reuse the pooled blocks from the previous one
+        self.audio_buffer.release()
+
+        # a live session left over from a recording that failed to stop is closed, not leaked
+        await self.finish_live()
+        backend = create_streaming_backend(LIVE_TRANSCRIPTION)
+        if backend is not None:
+            live = LiveTranscriber(backend, self.bot.loop, SAMPLE_RATE)
+            try:
+                await live.start()
+                self.live = live
+            except Exception as e:
+                log.error(f"Could not start live transcription: {e}")
+                await ctx.send("⚠️ Live transcription is unavailable; the meeting will be transcribed after `!stop`.")
+
+        path = os.path.join(RECORDING_DIR, f"meeting_{datetime.now():%Y%m%d_%H%M%S}.wav")
+        self.writer = AudioWriter(
+            self.audio_buffer, path, WRITE_LATENCY, tracks=SPEAKER_TRACKS, on_block=self.live.feed if self.live else None
+        )
+        self.writer.start()
         self.recorder = CombinedRecorder(self)
         self.vc.listen(self.recorder)
+        self.pump_task = asyncio.create_task(self.pump_audio())
 
         await ctx.send("Started recording... use `!stop` to end.")
 
+    # Command to show the memory used by the current recording
+    @commands.command(name="recstatus")
+    async def recstatus(self, ctx):
+        stats = self.audio_buffer.stats()
+        lines = [f"**Recording buffer:** {self.format_buffer_stats()}"]
+        if self.writer is not None:
+            written = self.writer.stats()
+            lines.append(
+                f"**On disk:** {written['written_seconds']:.0f}s in `{self.writer.path}` "
+                f"({written['bytes'] / 1e6:.1f} MB, {written['queued']} block(s) queued)"
+            )
+        if self.live is not None:
+            live = self.live.stats()
+            lines.append(
+                f"**Live transcription:** {live['segments']} segments, {live['sent_seconds']:.0f}s sent "
+                f"({live['queued']} block(s) queued, {live['dropped_seconds']:.0f}s dropped)"
+            )
+        for key, speaker in stats["speakers"].items():
+            name = f"<@{key}>" if isinstance(key, int) else f"SSRC {key[1]}"
+            lines.append(f"• {name}: {speaker['seconds']:.0f}s, {speaker['blocks']} blocks ({speaker['bytes'] / 1e6:.1f} MB)")
+        await ctx.send("\n".join(lines))
+
+    # Command to show the live transcript so far
+    @commands.command(name="transcript")
+    async def transcript(self, ctx):
+        if self.live is None:
+            return await ctx.send("Live transcription is not running.")
+        text = self.live.transcript()
+        if not text:
+            return await ctx.send("Nothing transcribed yet.")
+        # Discord messages are limited to 2000 characters; show the most recent part
+        await ctx.send(f"**Live transcript:**\n{'…' if len(text) > 1900 else ''}{text[-1900:]}")
+
     # Command to stop recording and process audio
     @commands.command(name="stop")
     async def stop(self, ctx):
@@ -216,29 +453,32 @@ class MeetingNotesCog(commands.Cog):
         if not self.vc:
             return await ctx.send("I'm not currently recording.")
 
-        await self.vc.disconnect(force=True)
+        vc, self.vc = self.vc, None
+        await vc.disconnect(force=True)
         await ctx.send("Stopped recording. Processing meeting audio...")
 
-        file_path = await self.cleanup()
+        # the live session is finished even when the WAV file cannot be completed
+        try:
+            file_path = await self.cleanup()
+        finally:
+            live_transcript = await self.finish_live()
         if not file_path:
             return await ctx.send("No audio captured.")
 
-        await asyncio.sleep(2)
-
-        # Transcribe audio using OpenAI Whisper
+        # Transcribe audio using Deepgram unless it was transcribed live; with speaker tracks
+        # the transcript is labelled per speaker
         try:
-            with open(file_path, "rb") as audio_file:
-                response = deepgram.listen.v1.media.transcribe_file(
-                    request=audio_file.read(),
-                    model="nova-3",
-                    smart_format=True,
-                )
-            transcript_text = response.results.channels[0].alternatives[0].transcript
-            summary = await self.summarize_text(transcript_text)
-
-            if summary:
-                await ctx.send(f"**Meeting Summary:**\n```{summary}```")
+            if live_transcript:
+                transcript_text = live_transcript
+            elif self.track_paths:
+                transcript_text = await self.transcribe_tracks(ctx.guild)
             else:
+                response = await self.transcribe(file_path, trim=VAD_TRIM)
+                transcript_text = response.results.channels[0].alternatives[0].transcript
+            # summary is streamed into the channel as it is generated
+            summary = await self.summarize_text(transcript_text, ctx)
+
+            if not summary:
                 await ctx.send("Could not generate a summary.")
         except Exception as e:
             await ctx.send(f"Error processing meeting: {e}")
@@ -247,7 +487,9 @@ class MeetingNotesCog(commands.Cog):
         # Clean up audio file
         try:
             await asyncio.sleep(1)
-            os.remove(file_path)
+            for path in [file_path, *self.track_paths.values()]:
+                os.remove(path)
+            self.track_paths = {}
             await ctx.send("Cleaned up audio file.")
         except OSError as e:
             log.warning(f"Could not delete audio file: {e}")
@@ -0,0 +1,253 @@
+import abc
+import asyncio
+import json
+import logging
+import os
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+
+import aiohttp
+import numpy as np
+
+from bot.core.http import get_http_client
+from bot.features.meeting_notes.transcode import Decimator
+
+log = logging.getLogger(__name__)
+
+
+@dataclass
+class Segment:
+    """A finalized piece of transcript; times are seconds since the recording started."""
+
+    start: float
+    end: float
+    text: str
+
+
+class StreamingASRBackend(abc.ABC):
+    """
+    Receives mono int16 PCM while a meeting is recorded and reports finalized
+    segments through the callback given to `start`. Subclass and register to
+    plug in a service.
+    """
+
+    name = "base"
+    sample_rate = 16000
+
+    @abc.abstractmethod
+    async def start(self, on_segment: Callable[[Segment], None]):
+        ...
+
+    @abc.abstractmethod
+    async def send(self, pcm: np.ndarray):
+        ...
+
+    @abc.abstractmethod
+    async def finish(self):
+        """Flush buffered audio; once this returns, no further segments arrive."""
+
+
+class FakeStreamingBackend(StreamingASRBackend):
+    """
+    Offline backend for local runs and tests.
+
+    Speech is detected by frame energy. Each utterance (ended by `gap` seconds
+    of quiet) becomes one segment. Its text is taken from `script` in order,
+    or describes the utterance once the script runs out.
+    """
+
+    name = "fake"
+
+    def __init__(self, script: Optional[List[str]] = None, threshold_db: float = -45.0, gap: float = 0.6):
+        self.script = list(script or [])
+        self.threshold = 32768 * 10 ** (threshold_db / 20)
+        self.frame = self.sample_rate * 30 // 1000
+        self.gap_frames = int(gap * 1000) // 30
+        self.on_segment = None
+        self.position = 0  # frames received
+        self.carry = np.zeros(0, dtype=np.int16)
+        self.speech_start = None
+        self.last_speech = 0
+
+    async def start(self, on_segment):
+        self.on_segment = on_segment
+
+    def _emit(self):
+        start = self.speech_start * self.frame / self.sample_rate
+        end = (self.last_speech + 1) * self.frame / self.sample_rate
+        text = self.script.pop(0) if self.script else f"[speech {start:.1f}s-{end:.1f}s]"
+        self.on_segment(Segment(start, end, text))
+        self.speech_start = None
+
+    async def send(self, pcm):
+        x = np.concatenate([self.carry, pcm])
+        count = len(x) // self.frame
+        self.carry = x[count * self.frame:]
+        frames = x[:count * self.frame].reshape(count, self.frame)
+        rms = np.sqrt(np.mean(np.square(frames, dtype=np.float64), axis=1))
+        for speech in rms > self.threshold:
+            if speech:
+                if self.speech_start is None:
+                    self.speech_start = self.position
+                self.last_speech = self.position
+            elif self.speech_start is not None and self.position - self.last_speech >= self.gap_frames:
+                self._emit()
+            self.position += 1
+
+    async def finish(self):
+        if self.speech_start is not None:
+            self._emit()
+
+
+class DeepgramStreamingBackend(StreamingASRBackend):
+    """Deepgram's live `/v1/listen` websocket, fed raw linear16 PCM."""
+
+    name = "deepgram"
+
+    def __init__(self, api_key: str, model: str = "nova-3", url: str = "wss://api.deepgram.com/v1/listen"):
+        self.api_key = api_key
+        self.model = model
+        self.url = url
+        self.ws = None
+        self.reader = None
+
+    async def start(self, on_segment):
+        params = {
+            "model": self.model,
+            "encoding": "linear16",
+            "sample_rate": str(self.sample_rate),
+            "channels": "1",
+            "smart_format": "true",
+        }
+        self.ws = await get_http_client().session.ws_connect(
+            self.url, params=params, headers={"Authorization": f"Token {self.api_key}"}, heartbeat=20
+        )
+        self.reader = asyncio.create_task(self._read(on_segment))
+
+    async def _read(self, on_segment):
+        async for message in self.ws:
+            if message.type != aiohttp.WSMsgType.TEXT:
+                continue
+            data = json.loads(message.data)
+            if data.get("type") != "Results" or not data.get("is_final"):
+                continue
+            text = data["channel"]["alternatives"][0].get("transcript", "").strip()
+            if text:
+                start = data.get("start", 0.0)
+                on_segment(Segment(start, start + data.get("duration", 0.0), text))
+
+    async def send(self, pcm):
+        await self.ws.send_bytes(pcm.tobytes())
+
+    async def finish(self):
+        # CloseStream makes Deepgram flush its final results and then close the socket
+        await self.ws.send_str(json.dumps({"type": "CloseStream"}))
+        try:
+            await self.reader
+        finally:
+            await self.ws.close()
+
+
+STREAMING_BACKENDS: Dict[str, Callable[[], StreamingASRBackend]] = {
+    "fake": lambda: FakeStreamingBackend(),
+    "deepgram": lambda: DeepgramStreamingBackend(
+        os.getenv("DEEPGRAM_API_KEY", ""), os.getenv("MEETING_LIVE_MODEL", "nova-3")
+    ),
+}
+
+
+def register_streaming_backend(name: str, factory: Callable[[], StreamingASRBackend]):
+    """Make a backend selectable through MEETING_LIVE_TRANSCRIPTION."""
+    STREAMING_BACKENDS[name] = factory
+
+
+def create_streaming_backend(name: Optional[str]) -> Optional[StreamingASRBackend]:
+    """Return the named backend, or None when live transcription is off."""
+    name = (name or "off").strip().lower()
+    if name in ("", "off", "none"):
+        return None
+    factory = STREAMING_BACKENDS.get(name)
+    if factory is None:
+        log.warning(f"Unknown live transcription backend '{name}', live transcription disabled")
+        return None
+    return factory()
+
+
+class LiveTranscriber:
+    """
+    Streams a recording to a `StreamingASRBackend` while it is being made.
+
+    `feed` is called by the disk writer thread with each finished 48 kHz
+    block. The block is downsampled there and handed to the event loop
+    through a bounded queue, and a task forwards it to the backend. Finalized
+    segments accumulate in `segments`. When the recording stops, `finish`
+    returns with the transcript nearly complete. If the backend fails,
+    `error` is set and the caller falls back to batch transcription.
+    """
+
+    def __init__(self, backend: StreamingASRBackend, loop: asyncio.AbstractEventLoop, input_rate: int, max_queued: int = 120):
+        self.backend = backend
+        self.loop = loop
+        factor = input_rate // backend.sample_rate
+        self.decimator = Decimator(factor) if factor > 1 else None
+        self.queue: "asyncio.Queue" = asyncio.Queue(maxsize=max_queued)
+        self.segments: List[Segment] = []
+        self.sent = 0  # samples sent to the backend
+        self.dropped = 0  # samples dropped because the backend fell behind
+        self.error: Optional[BaseException] = None
+        self.task = None
+
+    async def start(self):
+        await self.backend.start(self.segments.append)
+        self.task = asyncio.create_task(self._run())
+
+    def feed(self, block: np.ndarray):
+        pcm = self.decimator.process(block) if self.decimator is not None else block
+        self.loop.call_soon_threadsafe(self._enqueue, pcm)
+
+    def _enqueue(self, pcm):
+        try:
+            self.queue.put_nowait(pcm)
+        except asyncio.QueueFull:
+            self.dropped += len(pcm)
+
+    async def _run(self):
+        while True:
+            pcm = await self.queue.get()
+            if pcm is None:
+                return
+            if self.error is not None:
+                continue  # keep draining so finish() is not blocked
+            try:
+                await self.backend.send(pcm)
+                self.sent += len(pcm)
+            except Exception as e:
+                log.error(f"Live transcription failed: {e}")
+                self.error = e
+
+    async def finish(self, timeout: float = 30.0):
+        """Send the remaining audio and wait for the backend's last segments."""
+        # blocks handed over by feed are still scheduled on the loop; queue them before the end marker
+        handed_over = self.loop.create_future()
+        self.loop.call_soon(handed_over.set_result, None)
+        await handed_over
+        await self.queue.put(None)
+        try:
+            await asyncio.wait_for(self.task, timeout)
+            if self.error is None:
+                await asyncio.wait_for(self.backend.finish(), timeout)
+        except Exception as e:
+            log.error(f"Live transcription did not finish: {e}")
+            self.error = self.error or e
+
+    def transcript(self) -> str:
+        return " ".join(segment.text for segment in sorted(self.segments, key=lambda segment: segment.start))
+
+    def stats(self) -> Dict[str, float]:
+        rate = self.backend.sample_rate
+        return {
+            "segments": len(self.segments),
+            "sent_seconds": self.sent / rate,
+            "queued": self.queue.qsize(),
+            "dropped_seconds": self.dropped / rate,
+        }
@@ -0,0 +1,118 @@
+import collections
+import os
+from typing import Dict, Iterator
+
+import numpy as np
+import soundfile as sf
+from numpy.lib.stride_tricks import sliding_window_view
+
+UPLOAD_CHUNK_BYTES = 64 * 1024
+
+
+class Decimator:
+    """
+    Streaming integer-factor downsampler (48 kHz to 16 kHz is factor 3).
+
+    A windowed-sinc low-pass removes everything above the new Nyquist rate.
+    Only the output samples that are kept get computed: each one is a dot
+    product of the filter with a strided window view, so a whole block is a
+    single matrix-vector product. The filter's history carries over between
+    blocks, so block boundaries are seamless.
+    """
+
+    def __init__(self, factor: int, taps: int = 63):
+        self.factor = factor
+        n = np.arange(taps) - (taps - 1) / 2
+        cutoff = 0.45 / factor  # as a fraction of the input rate, just under the new Nyquist
+        h = 2 * cutoff * np.sinc(2 * cutoff * n) * np.hamming(taps)
+        self.h = (h / h.sum()).astype(np.float32)  # symmetric, so no need to reverse it
+        self.history = np.zeros(taps - 1, dtype=np.float32)
+        self.phase = 0  # index of the next kept sample within the next block
+
+    def process(self, block: np.ndarray) -> np.ndarray:
+        x = np.concatenate([self.history, block.astype(np.float32)])
+        out = sliding_window_view(x, len(self.h))[self.phase::self.factor] @ self.h
+        self.phase = (self.phase - len(block)) % self.factor
+        self.history = x[len(x) - len(self.history):]
+        return np.clip(np.rint(out), -32768, 32767).astype(np.int16)
+
+
+class SilenceTrimmer:
+    """
+    Energy-based voice activity trimming.
+
+    Audio is judged in 30 ms frames by RMS level. Frames within `pad_ms` of
+    speech are kept, so words are not clipped and short pauses survive. Longer
+    silences are cut down to twice the padding.
+    """
+
+    def __init__(self, sample_rate: int, threshold_db: float = -45.0, pad_ms: int = 300, frame_ms: int = 30):
+        self.frame = sample_rate * frame_ms // 1000
+        self.pad = max(1, pad_ms // frame_ms)
+        self.threshold = 32768 * 10 ** (threshold_db / 20)
+        self.pending = collections.deque(maxlen=self.pad)  # silence that may precede speech
+        self.since_speech = self.pad + 1
+        self.carry = np.zeros(0, dtype=np.int16)
+
+    def process(self, block: np.ndarray) -> np.ndarray:
+        x = np.concatenate([self.carry, block])
+        count = len(x) // self.frame
+        self.carry = x[count * self.frame:]
+        frames = x[:count * self.frame].reshape(count, self.frame)
+        rms = np.sqrt(np.mean(np.square(frames, dtype=np.float64), axis=1))
+
+        kept = []
+        for frame, speech in zip(frames, rms > self.threshold):
+            if speech:
+                kept.extend(self.pending)
+                self.pending.clear()
+                kept.append(frame)
+                self.since_speech = 0
+            else:
+                self.since_speech += 1
+                if self.since_speech <= self.pad:
+                    kept.append(frame)
+                else:
+                    self.pending.append(frame)
+        return np.concatenate(kept) if kept else np.zeros(0, dtype=np.int16)
+
+
+def transcode(src_path: str, dst_path: str, rate: int = 16000, trim: bool = False, threshold_db: float = -45.0) -> Dict[str, float]:
+    """
+    Convert a recording into a compact FLAC for upload, one block at a time.
+
+    The audio is downsampled to `rate` and, with `trim`, long silences are
+    removed. Returns the input/output durations and file sizes.
+    """
+    info = sf.info(src_path)
+    if info.samplerate % rate:
+        raise ValueError(f"cannot downsample {info.samplerate} Hz to {rate} Hz by an integer factor")
+    decimator = Decimator(info.samplerate // rate) if info.samplerate != rate else None
+    trimmer = SilenceTrimmer(rate, threshold_db) if trim else None
+
+    frames_out = 0
+    with sf.SoundFile(dst_path, "w", rate, 1, format="FLAC", subtype="PCM_16") as dst:
+        for block in sf.blocks(src_path, blocksize=info.samplerate, dtype="int16"):
+            if decimator is not None:
+                block = decimator.process(block)
+            if trimmer is not None:
+                block = trimmer.process(block)
+            dst.write(block)
+            frames_out += len(block)
+
+    return {
+        "seconds_in": info.frames / info.samplerate,
+        "seconds_out": frames_out / rate,
+        "bytes_in": os.path.getsize(src_path),
+        "bytes_out": os.path.getsize(dst_path),
+    }
+
+
+def iter_file(path: str, chunk_size: int = UPLOAD_CHUNK_BYTES) -> Iterator[bytes]:
+    """Read a file in chunks, so an upload streams from disk instead of one bytes object."""
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
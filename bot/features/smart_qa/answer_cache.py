@@ -0,0 +1,108 @@
+import re
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Set, Tuple
+
+CacheKey = Tuple[str, Tuple[Tuple[str, str], ...]]
+
+_PUNCTUATION = re.compile(r"[^\w\s]+")
+_NEGATED = re.compile(r"n['\u2019]t\b")
+_IS = re.compile(r"\b(what|where|who|how|when|why|which|there|it|that)['\u2019]s\b")
+
+# words that change how a question is phrased but not what it asks; question
+# words, negations and tense-bearing auxiliaries (was, will, ...) are kept
+FILLER = frozenset("a an the do does is are am be can i we to please".split())
+
+
+def normalize_question(question: str) -> str:
+    """
+    Reduce a question to the words that decide its answer, in order.
+
+    Casing and punctuation are dropped, contractions are expanded ("don't" ->
+    "do not") and filler words such as articles and present-tense auxiliaries
+    are removed, so "How do I flash the BMS?" and "how to flash BMS" share one
+    key. Unlike the retrieval tokenizer, question words and negations stay:
+    "when" and "where", or "can" and "can't", get different answers even when
+    the same documents are retrieved.
+    """
+    text = question.lower().replace("won't", "will not").replace("can't", "can not")
+    text = _IS.sub(r"\1 is", _NEGATED.sub(" not", text))
+    return " ".join(word for word in _PUNCTUATION.sub(" ", text).split() if word not in FILLER)
+
+
+class AnswerCache:
+    """
+    LRU + TTL cache of Smart Q&A answers.
+
+    Keys combine the normalized question with the (document id, updatedAt) pairs
+    of the documents the answer was built from, so an edited document can never
+    serve a stale answer. Entries are also purged eagerly via `invalidate_document`.
+    """
+
+    def __init__(self, max_entries: int = 256, ttl: float = 3600):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[CacheKey, Tuple[float, object]]" = OrderedDict()
+        self._by_doc: Dict[str, Set[CacheKey]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def make_key(question: str, versions: Iterable[Tuple[str, str]]) -> CacheKey:
+        return normalize_question(question), tuple(sorted(set(versions)))
+
+    def get(self, key: CacheKey) -> Optional[object]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        stored_at, value = entry
+        if time.monotonic() - stored_at > self.ttl:
+            self._remove(key)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key: CacheKey, value: object):
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = (time.monotonic(), value)
+        for doc_id, _ in key[1]:
+            self._by_doc.setdefault(doc_id, set()).add(key)
+        while len(self._entries) > self.max_entries:
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+
+    def invalidate_document(self, doc_id: str):
+        """Drop every answer that was built from `doc_id`."""
+        for key in list(self._by_doc.get(doc_id, ())):
+            self._remove(key)
+            self.invalidations += 1
+
+    def clear(self):
+        self._entries.clear()
+        self._by_doc.clear()
+
+    def _remove(self, key: CacheKey):
+        self._entries.pop(key, None)
+        for doc_id, _ in key[1]:
+            keys = self._by_doc.get(doc_id)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_doc[doc_id]
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
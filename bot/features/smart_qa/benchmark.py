@@ -0,0 +1,97 @@
+"""
+Benchmark local BM25 collection routing against the DeepSeek router.
+
+Usage:
+    python -m bot.features.smart_qa.benchmark cases.json [--k 3] [--skip-llm]
+
+`cases.json` is a list of labelled questions:
+    [{"question": "How do I flash the BMS?", "collection": "Electrical"}, ...]
+
+Reads OUTLINE_API_URL, OUTLINE_API_KEY and DEEPSEEK_API_KEY from `.env`.
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+from dotenv import load_dotenv
+
+from bot.core.http import close_http_client
+
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def _report(name, latencies, hits_at_1, hits_at_k, total, k):
+    print(
+        f"{name:<6} hit@1 {hits_at_1}/{total} ({hits_at_1 / total:.0%})  "
+        f"hit@{k} {hits_at_k}/{total} ({hits_at_k / total:.0%})  "
+        f"mean {statistics.mean(latencies):8.1f} ms  "
+        f"p50 {_percentile(latencies, 50):8.1f} ms  "
+        f"p95 {_percentile(latencies, 95):8.1f} ms"
+    )
+
+
+async def run(cases, k: int, skip_llm: bool):
+    # Imported late so load_dotenv() has populated the environment first
+    from bot.features.smart_qa.cog import SmartQACog
+
+    cog = SmartQACog(None)
+    collections = await cog._fetch_collections()
+    names = [c.get("name") for c in collections if c.get("name")]
+    if not names:
+        print("No collections found; check OUTLINE_API_URL / OUTLINE_API_KEY.")
+        return
+
+    started = time.perf_counter()
+    await cog.retriever.refresh()
+    print(f"Index build (includes mirror warm-up): {(time.perf_counter() - started) * 1000:.1f} ms, "
+          f"{len(cog.retriever.index)} passages\n")
+
+    routers = {"bm25": lambda q: cog.retriever.rank_collections(q, limit=k)}
+    if not skip_llm:
+        routers["llm"] = lambda q: cog._llm_select_collections(q, names, k, k)
+
+    for name, route in routers.items():
+        latencies, hits_at_1, hits_at_k = [], 0, 0
+        for case in cases:
+            expected = case["collection"].strip().lower()
+            started = time.perf_counter()
+            ranked = await route(case["question"])
+            latencies.append((time.perf_counter() - started) * 1000)
+            ranked = [r.lower() for r in ranked]
+            hits_at_1 += bool(ranked) and ranked[0] == expected
+            hits_at_k += expected in ranked[:k]
+        _report(name, latencies, hits_at_1, hits_at_k, len(cases), k)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("cases", help="JSON file of {question, collection} pairs")
+    parser.add_argument("--k", type=int, default=3, help="candidates considered for hit@k")
+    parser.add_argument("--skip-llm", action="store_true", help="only benchmark the local router")
+    args = parser.parse_args()
+
+    load_dotenv()
+    with open(args.cases, "r", encoding="utf-8") as f:
+        cases = json.load(f)
+    if not cases:
+        print("No benchmark cases.")
+        return
+
+    async def _main():
+        try:
+            await run(cases, args.k, args.skip_llm)
+        finally:
+            await close_http_client()
+
+    asyncio.run(_main())
+
+
+if __name__ == "__main__":
+    main()
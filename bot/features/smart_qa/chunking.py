@@ -0,0 +1,119 @@
+import re
+from dataclasses import dataclass
+from typing import Iterable, List, Tuple, TypeVar
+
+from bot.core.tokens import estimate_tokens
+
+_HEADING_RE = re.compile(r"^(#{1,6})\s+(.*?)\s*#*\s*$")
+_FENCE_RE = re.compile(r"^\s*(```|~~~)")
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+")
+
+T = TypeVar("T")
+
+
+@dataclass(frozen=True)
+class Chunk:
+    heading: str  # "Setup > Wiring" style trail of the enclosing headings
+    text: str
+    position: int
+    tokens: int
+
+
+def _split_oversized(block: str, max_tokens: int) -> List[str]:
+    """Split a block that is too large on sentences, then lines, then hard by size."""
+    if estimate_tokens(block) <= max_tokens:
+        return [block]
+    multiline = "\n" in block.strip()
+    pieces = block.splitlines() if multiline else _SENTENCE_RE.split(block)
+    if len(pieces) == 1:
+        step = max_tokens * 4
+        return [block[i:i + step] for i in range(0, len(block), step)]
+
+    separator = "\n" if multiline else " "
+    parts, current = [], ""
+    for piece in pieces:
+        candidate = f"{current}{separator}{piece}" if current else piece
+        if current and estimate_tokens(candidate) > max_tokens:
+            parts.extend(_split_oversized(current, max_tokens))
+            current = piece
+        else:
+            current = candidate
+    if current:
+        parts.extend(_split_oversized(current, max_tokens))
+    return parts
+
+
+def chunk_markdown(text: str, max_tokens: int = 200) -> List[Chunk]:
+    """
+    Split Outline markdown into chunks on headings and paragraphs.
+
+    Consecutive paragraphs under the same heading are merged while they fit in
+    `max_tokens`; larger paragraphs are split on sentence or line boundaries.
+    Fenced code blocks are never split across paragraphs.
+    """
+    blocks: List[Tuple[str, str]] = []  # (heading trail, paragraph)
+    headings: List[str] = []
+    paragraph: List[str] = []
+    in_fence = False
+
+    def flush():
+        if paragraph:
+            body = "\n".join(paragraph).strip()
+            if body:
+                blocks.append((" > ".join(h for h in headings if h), body))
+            paragraph.clear()
+
+    for line in (text or "").splitlines():
+        if _FENCE_RE.match(line):
+            in_fence = not in_fence
+            paragraph.append(line)
+            continue
+        if not in_fence:
+            heading = _HEADING_RE.match(line)
+            if heading:
+                flush()
+                level = len(heading.group(1))
+                del headings[level - 1:]
+                headings.extend([""] * (level - 1 - len(headings)))
+                headings.append(heading.group(2))
+                continue
+            if not line.strip():
+                flush()
+                continue
+        paragraph.append(line)
+    flush()
+
+    chunks: List[Chunk] = []
+    current_heading, current = None, ""
+
+    def emit():
+        if current:
+            chunks.append(Chunk(current_heading or "", current, len(chunks), estimate_tokens(current)))
+
+    for heading, body in blocks:
+        for part in _split_oversized(body, max_tokens):
+            candidate = f"{current}\n\n{part}" if current else part
+            if heading != current_heading or (current and estimate_tokens(candidate) > max_tokens):
+                emit()
+                current_heading, current = heading, part
+            else:
+                current = candidate
+    emit()
+    return chunks
+
+
+def select_within_budget(scored: Iterable[Tuple[float, T]], cost, budget_tokens: int) -> List[T]:
+    """
+    Greedily take the highest-scoring items whose cost still fits in the budget.
+
+    `cost(item)` returns an item's token cost. Items come back in selection order;
+    callers re-sort them if document order matters.
+    """
+    selected, used = [], 0
+    for _, item in sorted(scored, key=lambda pair: pair[0], reverse=True):
+        item_cost = cost(item)
+        if used + item_cost > budget_tokens:
+            continue
+        selected.append(item)
+        used += item_cost
+    return selected
@@ -1,83 +1,51 @@
 from discord.ext import commands
 import discord
 from io import BytesIO
-from typing import List, Optional
+from typing import AsyncIterator, List, Optional
 import logging
 import os
 import aiohttp
 import json
 
-logger = logging.getLogger("utilitybot.smart_qa")
-
-# Only for testing purposes. Actual document is fetched from Outline API.
-def _get_mock_knowledge_document() -> str:
-    '''Mock knowledge base. Will be replaced by an actual document in the future.'''
-    return (
-        "Electrium Mobility is a student design team based at the University of Waterloo. Its goal is to create sustainable and affordable transportation in the form of Personal Electric Vehicles."
-        "UtilityBot is a modular Discord bot written in Python using discord.py. "
-        "Features are implemented as Cogs and are auto-loaded from bot/features. "
-        "The Smart Q&A module answers user questions by consulting relevant notes. "
-        "Commands use the '!' prefix (e.g., !qa). Message content intent must be enabled. "
-        "Environment variables are provided via a .env file (DISCORD_TOKEN). "
-        "Logging is configured through bot/core/logging.py. "
-        "To run the bot: activate the venv and execute `python -m bot.main`. "
-        "Extensions are discovered and loaded by bot/core/loader.py. "
-        "This is a mock knowledge base used only for development without external APIs."
-    )
-
-async def _ask_deepseek(question: str, knowledge_document: str) -> Optional[str]:
-    """Ask DeepSeek with knowledge context. Returns answer or None on failure."""
-    api_key = os.getenv("DEEPSEEK_API_KEY", "").strip()
-    if not api_key:
-        return None
-
-    url = "https://api.deepseek.com/v1/chat/completions"
-    payload = {
-        "model": "deepseek-chat",
-        "temperature": 0.2,
-        "messages": [
-            {
-                "role": "system",
-                "content": (
-                    "You are a helpful assistant. Answer strictly using the provided knowledge. "
-                    "If the answer is not present, say: 'I don't know based on the provided knowledge.'"
-                ),
-            },
-            {
-                "role": "user",
-                "content": (
-                    f"Knowledge:\n{knowledge_document}\n\n"
-                    f"Question:\n{question}\n\n"
-                    "Answer in 1-2 concise sentences."
-                ),
-            },
-        ],
-    }
-
-    # Standard header
-    headers = {
-        "Authorization": f"Bearer {api_key}",
-        "Content-Type": "application/json",
-    }
-
-    try:
-        async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=20)) as session:
-            async with session.post(url, json=payload, headers=headers) as resp:
-                if resp.status != 200:
-                    logger.warning("DeepSeek API non-200: %s", resp.status)
-                    return None
+from bot.core.http import get_http_client
+from bot.core.llm import stream_chat_completion, stream_to_message
+from bot.features.smart_qa.answer_cache import AnswerCache
+from bot.features.smart_qa.outline_mirror import OutlineMirror
+from bot.features.smart_qa.prompt import assemble_context
+from bot.features.smart_qa.retrieval import KnowledgeRetriever
+from bot.features.smart_qa.vector_index import SemanticIndex, VectorIndex, create_embedding_provider
 
-                # Handles none type at each level
-                data = await resp.json()
-                choices = (data or {}).get("choices") or []
-                if not choices:
-                    return None
-                content = (((choices[0] or {}).get("message") or {}).get("content") or "").strip()
+logger = logging.getLogger("utilitybot.smart_qa")
 
-                return content or None
-    except Exception:
-        logger.exception("DeepSeek API call failed")
-        return None
+# Upper bound on knowledge tokens sent to DeepSeek, regardless of document size
+CONTEXT_TOKENS = int(os.getenv("SMART_QA_CONTEXT_TOKENS", "1500"))
+VECTOR_INDEX_PATH = os.getenv("SMART_QA_VECTOR_DIR") or os.path.join(os.path.dirname(__file__), "vector_index")
+
+
+def _qa_messages(question: str, knowledge_document: str) -> List[dict]:
+    """Chat messages asking DeepSeek to answer strictly from the given knowledge."""
+    return [
+        {
+            "role": "system",
+            "content": (
+                "You are a helpful assistant. Answer strictly using the provided knowledge. "
+                "If the answer is not present, say: 'I don't know based on the provided knowledge.'"
+            ),
+        },
+        {
+            "role": "user",
+            "content": (
+                f"Knowledge:\n{knowledge_document}\n\n"
+                f"Question:\n{question}\n\n"
+                "Answer in 1-2 concise sentences."
+            ),
+        },
+    ]
+
+
+def _stream_deepseek(question: str, knowledge_document: str) -> AsyncIterator[str]:
+    """Stream DeepSeek's answer as content deltas. Raises LLMError on failure."""
+    return stream_chat_completion(_qa_messages(question, knowledge_document), temperature=0.2, timeout=20)
 
 
 class SmartQACog(commands.Cog):
@@ -88,11 +56,86 @@ class SmartQACog(commands.Cog):
         # get API info
         self.api_url = os.getenv("OUTLINE_API_URL")
         self.api_token = os.getenv("OUTLINE_API_KEY")
+        # in-memory (optionally disk-backed) copy of the Outline knowledge base
+        self.mirror = OutlineMirror.from_env(self.api_url, self.api_token)
+        # local BM25 search over the mirror, optionally fused with dense vector search;
+        # the LLM only re-ranks when enabled
+        provider = create_embedding_provider(os.getenv("SMART_QA_EMBEDDINGS"))
+        semantic = None
+        if provider is not None:
+            quantize = os.getenv("SMART_QA_VECTOR_INT8", "").strip().lower() in ("1", "true", "yes")
+            semantic = SemanticIndex(provider, VectorIndex(VECTOR_INDEX_PATH, quantize=quantize))
+        self.retriever = KnowledgeRetriever(self.mirror, semantic=semantic)
+        # answers keyed on the normalized question plus the source document versions
+        self.answer_cache = AnswerCache(
+            max_entries=int(os.getenv("SMART_QA_ANSWER_CACHE_SIZE", "256")),
+            ttl=float(os.getenv("SMART_QA_ANSWER_CACHE_TTL", "3600")),
+        )
+        self.mirror.add_change_listener(self.answer_cache.invalidate_document)
+        self.llm_rerank = os.getenv("SMART_QA_LLM_RERANK", "").strip().lower() in ("1", "true", "yes")
+
+    async def cog_unload(self):
+        # the mirror writes its disk cache on a delay; don't lose the last changes
+        await self.mirror.close()
 
     @commands.command(name="qa")
     async def qa(self, ctx: commands.Context, *, question: str):
-        """Placeholder command: accept a question and return a placeholder response."""
-        await ctx.send(f"Received question: {question}\n(Placeholder response, to be implemented)")
+        """Answer a question from the Outline knowledge base."""
+        if not self.api_url or not self.api_token:
+            return await ctx.send("❌ Smart Q&A is not configured (OUTLINE_API_URL / OUTLINE_API_KEY missing).")
+
+        async with ctx.typing():
+            try:
+                hits = await self.retriever.search(question, k=3, passages_per_doc=8)
+            except Exception:
+                logger.exception("Retrieval failed for question '%s'", question)
+                return await ctx.send("❌ Could not search the knowledge base right now.")
+
+        if not hits:
+            return await ctx.send("I couldn't find anything relevant in the knowledge base.")
+
+        cache_key = self.answer_cache.make_key(
+            question, ((hit.doc_id, self.retriever.versions.get(hit.doc_id, "")) for hit in hits)
+        )
+        cached = self.answer_cache.get(cache_key)
+        if cached is not None:
+            answer, paths = cached
+            sources = "\n".join(f"- {path}" for path in paths)
+            return await ctx.send(f"{answer}\n\n**Sources:**\n{sources}")
+
+        knowledge, paths = assemble_context(
+            (scored for hit in hits for scored in hit.passages), CONTEXT_TOKENS
+        )
+        sources = "\n".join(f"- {path}" for path in paths)
+        if not os.getenv("DEEPSEEK_API_KEY", "").strip():
+            return await ctx.send(f"⚠️ AI answer unavailable. The most relevant documents are:\n{sources}")
+
+        # Stream the answer into a placeholder so users see it as it is generated
+        try:
+            answer = await stream_to_message(
+                ctx,
+                _stream_deepseek(question, knowledge),
+                placeholder="🧠 Thinking...",
+                render=lambda text: f"{text}\n\n**Sources:**\n{sources}",
+            )
+        except Exception:
+            logger.exception("DeepSeek API call failed")
+            return await ctx.send(f"⚠️ AI answer unavailable. The most relevant documents are:\n{sources}")
+
+        if answer.strip():
+            self.answer_cache.put(cache_key, (answer.strip(), paths))
+
+    @commands.command(name="qa_stats")
+    async def qa_stats(self, ctx: commands.Context):
+        """Show Smart Q&A answer cache counters."""
+        stats = self.answer_cache.stats()
+        outline = self.mirror.stats
+        await ctx.send(
+            f"**Answer cache:** {stats['size']} entries\n"
+            f"Hits: {stats['hits']} | Misses: {stats['misses']} | Hit rate: {stats['hit_rate']:.0%}\n"
+            f"Evictions: {stats['evictions']} | Invalidations: {stats['invalidations']}\n"
+            f"**Outline requests:** {outline['requests']} sent | {outline['coalesced']} coalesced"
+        )
 
     @commands.command(name="docs")
     async def get_bottom_docs(self, ctx):
@@ -141,8 +184,9 @@ class SmartQACog(commands.Cog):
 
         await ctx.send(f"Fetching bottom-level documents from **{collection_name}**...")
 
-        # Fetch documents
-        docs = await self._fetch_documents(collection_id) # get all documents inside collection
+        # Fetch documents and their precomputed path index
+        index = await self.mirror.index(collection_id) # get all documents inside collection
+        docs = index.docs
         
         if not docs: # no documents in collection
             return await ctx.send("No documents found in this collection.")
@@ -151,11 +195,10 @@ class SmartQACog(commands.Cog):
 
         count = len(docs) # number of documents
         
-        by_id = {doc["id"]: doc for doc in docs} # dictionary map id to doc (key : value) for each document 
         response = f"**{count} bottom-level documents found in {collection_name}:**\n"
         
-        for doc in docs: # get full path of all documents
-            response += f"- {self._get_full_path(doc, by_id)}\n"
+        for doc in docs: # full paths are materialized once per fetch, so this is O(n)
+            response += f"- {index.full_path(doc)}\n"
 
         await ctx.send(response) # print full path of all documents 
 
@@ -238,6 +281,14 @@ class SmartQACog(commands.Cog):
             await ctx.send(f"❌ Error while calling _fetch_collections: {str(e)}")
             logger.exception("Error in test_fetch_collections command")
 
+    @commands.command(name="refresh_docs")
+    async def refresh_docs(self, ctx: commands.Context):
+        """Drop the cached Outline mirror so the next lookup refetches everything."""
+        self.mirror.invalidate()
+        self.answer_cache.clear()
+        await self.mirror.save()
+        await ctx.send("✅ Outline cache cleared. The next request will refetch from Outline.")
+
     @commands.command(name="test_get_document")
     async def test_get_document(self, ctx: commands.Context, *, document_path: Optional[str] = None):
         """Test command for _find_document_by_path function."""
@@ -288,26 +339,24 @@ class SmartQACog(commands.Cog):
             logger.exception("Error in test_get_document command")
 
     async def _fetch_collections(self):
-        """Fetch all collections."""
-        headers = {"Authorization": f"Bearer {self.api_token}"}
-        async with aiohttp.ClientSession() as session:
-            async with session.post(f"{self.api_url}/collections.list", headers=headers) as resp:
-                res = await resp.json()
-                return res.get("data", [])
+        """Fetch all collections (served from the mirror while fresh)."""
+        return await self.mirror.collections()
 
     # Select most relevant collection for a question based on collection names.
     async def _select_collection(self, question: str, match_limit: int = 3, result_limit: int = 1) -> List[str]:
         """
-        Uses AI to determine which collections are most likely to contain information helpful for the question.
-        Fetches all collections using _fetch_collections() and then uses AI to select the most relevant ones.
+        Determines which collections are most likely to contain information helpful for the question.
+        Ranks collections locally with the BM25 retriever over the mirrored documents. DeepSeek is only
+        consulted as a re-ranker when SMART_QA_LLM_RERANK is enabled, or as a fallback when the local
+        index has no match at all.
         
         Args:
             question: The question to find relevant information for
-            match_limit: Maximum number of collection names to request from the AI (>=1)
+            match_limit: Maximum number of candidate collection names to consider (>=1)
             result_limit: Number of collection names to return to the user (<= match_limit, >=1)
         
         Returns:
-            List of the most relevant collection names (ordered by relevance), or empty list if AI call fails
+            List of the most relevant collection names (ordered by relevance), or empty list if nothing matches
         """
         match_limit = max(1, match_limit)
         result_limit = max(1, min(result_limit, match_limit))
@@ -327,7 +376,26 @@ class SmartQACog(commands.Cog):
         
         if len(collection_names) == 1:
             return collection_names
-        
+
+        try:
+            ranked = await self.retriever.rank_collections(question, limit=match_limit)
+        except Exception:
+            logger.exception("Local collection ranking failed")
+            ranked = []
+
+        if ranked and not self.llm_rerank:
+            logger.info("Selected %d collection(s) locally for question '%s': %s", min(len(ranked), result_limit), question, ranked[:result_limit])
+            return ranked[:result_limit]
+
+        # Re-rank the local candidates with the LLM, or let it choose among all collections
+        reranked = await self._llm_select_collections(question, ranked or collection_names, match_limit, result_limit)
+        return reranked or ranked[:result_limit]
+
+    async def _llm_select_collections(self, question: str, collection_names: List[str], match_limit: int, result_limit: int) -> List[str]:
+        """Ask DeepSeek to pick the most relevant of `collection_names`. Returns empty list on failure."""
+        if len(collection_names) == 1:
+            return collection_names
+
         api_key = os.getenv("DEEPSEEK_API_KEY", "").strip()
         if not api_key:
             logger.warning("DEEPSEEK_API_KEY not set, cannot select relevant collections")
@@ -374,106 +442,83 @@ class SmartQACog(commands.Cog):
         }
         
         try:
-            async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=20)) as session:
-                async with session.post(url, json=payload, headers=headers) as resp:
-                    if resp.status != 200:
-                        logger.warning("DeepSeek API non-200 when selecting collections: %s", resp.status)
-                        return []
+            client = get_http_client()
+            async with client.post(url, json=payload, headers=headers, timeout=aiohttp.ClientTimeout(total=20)) as resp:
+                if resp.status != 200:
+                    logger.warning("DeepSeek API non-200 when selecting collections: %s", resp.status)
+                    return []
+                
+                data = await resp.json()
+                choices = (data or {}).get("choices") or []
+                if not choices:
+                    return []
+                
+                content = (((choices[0] or {}).get("message") or {}).get("content") or "").strip()
+                
+                if not content:
+                    return []
+                
+                # Parse JSON response
+                try:
+                    response_data = json.loads(content)
+                    matched_collections = response_data.get("collections", [])
                     
-                    data = await resp.json()
-                    choices = (data or {}).get("choices") or []
-                    if not choices:
+                    if not matched_collections:
+                        logger.warning("AI returned empty collections array in JSON response")
                         return []
                     
-                    content = (((choices[0] or {}).get("message") or {}).get("content") or "").strip()
+                    # Validate that all returned collections exist in the original collection list
+                    valid_collections = []
+                    for collection_name in matched_collections:
+                        # Find matching collection (case-insensitive)
+                        for original_collection in collection_names:
+                            if original_collection.lower() == collection_name.lower():
+                                if original_collection not in valid_collections:  # Avoid duplicates
+                                    valid_collections.append(original_collection)
+                                break
                     
-                    if not content:
+                    if not valid_collections:
+                        logger.warning("None of the AI-selected collections matched the original collection list. AI response: %s", content)
                         return []
                     
-                    # Parse JSON response
-                    try:
-                        response_data = json.loads(content)
-                        matched_collections = response_data.get("collections", [])
-                        
-                        if not matched_collections:
-                            logger.warning("AI returned empty collections array in JSON response")
-                            return []
-                        
-                        # Validate that all returned collections exist in the original collection list
-                        valid_collections = []
-                        for collection_name in matched_collections:
-                            # Find matching collection (case-insensitive)
-                            for original_collection in collection_names:
-                                if original_collection.lower() == collection_name.lower():
-                                    if original_collection not in valid_collections:  # Avoid duplicates
-                                        valid_collections.append(original_collection)
-                                    break
-                        
-                        if not valid_collections:
-                            logger.warning("None of the AI-selected collections matched the original collection list. AI response: %s", content)
-                            return []
-                        
-                        # Limit to requested number of collections (if more were returned)
-                        top_collections = valid_collections[:result_limit]
+                    # Limit to requested number of collections (if more were returned)
+                    top_collections = valid_collections[:result_limit]
+                    logger.info(
+                        "Selected %d collection(s) for question '%s': %s",
+                        len(top_collections),
+                        question,
+                        top_collections,
+                    )
+                    return top_collections
+                    
+                except json.JSONDecodeError as e:
+                    logger.warning("Failed to parse AI response as JSON: %s. Response: %s", e, content)
+                    # Fallback: try to extract collection names from text if JSON parsing fails
+                    matched_collections = []
+                    for collection_name in collection_names:
+                        if collection_name.lower() in content.lower():
+                            matched_collections.append(collection_name)
+                    
+                    if matched_collections:
+                        top_collections = matched_collections[:result_limit]
                         logger.info(
-                            "Selected %d collection(s) for question '%s': %s",
+                            "Fallback: Selected %d collection(s) using text matching: %s",
                             len(top_collections),
-                            question,
                             top_collections,
                         )
                         return top_collections
-                        
-                    except json.JSONDecodeError as e:
-                        logger.warning("Failed to parse AI response as JSON: %s. Response: %s", e, content)
-                        # Fallback: try to extract collection names from text if JSON parsing fails
-                        matched_collections = []
-                        for collection_name in collection_names:
-                            if collection_name.lower() in content.lower():
-                                matched_collections.append(collection_name)
-                        
-                        if matched_collections:
-                            top_collections = matched_collections[:result_limit]
-                            logger.info(
-                                "Fallback: Selected %d collection(s) using text matching: %s",
-                                len(top_collections),
-                                top_collections,
-                            )
-                            return top_collections
-                        else:
-                            logger.warning("Could not extract collections from AI response, using first collection as fallback")
-                            return [collection_names[0]]
-                    
+                    else:
+                        logger.warning("Could not extract collections from AI response, using first collection as fallback")
+                        return [collection_names[0]]
+                
         except Exception as e:
             logger.exception("Error selecting relevant collections: %s", e)
             return []
 
     async def _fetch_documents(self, collection_id):
-        """Fetch all documents in a collection (recursively)."""
-        headers = {"Authorization": f"Bearer {self.api_token}"}
-        data = {"collectionId": collection_id}
-
-        async with aiohttp.ClientSession() as session:
-            async with session.post(f"{self.api_url}/documents.list", headers=headers, json=data) as resp:
-                res = await resp.json()
-                return res.get("data", [])
+        """Fetch all documents in a collection (served from the mirror while fresh)."""
+        return await self.mirror.documents(collection_id)
     
-    def _get_full_path(self, doc, by_id):
-        """Gets full path of document, separated by '/'"""
-        parts = [doc.get("title")] # get title of each document and store in array `parts`
-        parent_id = doc.get("parentDocumentId") # get parent id of each document
-        
-        while parent_id: # while we havent reached root
-            parent = by_id.get(parent_id) # find curr document's parent using id 
-                                          # (pass parent_id as key in by_id)
-            parts.append(parent["title"]) # add title of parent to path
-            parent_id = parent.get("parentDocumentId") # set new parent id as the parent_id 
-                                                       # of curr document
-
-        parts.reverse() # reverse titles (path is from root to document, but its the other way
-                        # around since we found it recursively)
-
-        return "/".join(parts) # join titles with '/', then return it
-
     # Returns: the path of the document as a tuple. The last element is the document name.
     def _parse_document_path(self, full_name: str) -> tuple[str, list[str], str]:
         """
@@ -498,44 +543,6 @@ class SmartQACog(commands.Cog):
         else:
             return "", [], ""
 
-    def _verify_document_path(self, doc: dict, subparents: list[str], by_id: dict) -> bool:
-        """
-        Verify that a document's hierarchical path matches the expected subparents.
-        
-        Args:
-            doc: The document to verify
-            subparents: List of expected parent document names in order (closest to root first)
-            by_id: Dictionary mapping document IDs to document objects
-        
-        Returns:
-            True if the document's path matches the expected subparents, False otherwise
-        """
-        # Build the document's actual parent path by traversing parentDocumentId
-        actual_path = []
-        parent_id = doc.get("parentDocumentId")
-        
-        while parent_id:
-            parent_doc = by_id.get(parent_id)
-            if not parent_doc:
-                logger.debug(f"Parent document ID '{parent_id}' not found in collection - possible data inconsistency")
-                break
-            actual_path.append(parent_doc.get("title", "").strip())
-            parent_id = parent_doc.get("parentDocumentId")
-        
-        # Reverse to get root-to-document order (actual_path is built from doc to root)
-        actual_path.reverse()
-        
-        # Compare expected subparents with actual path (case-insensitive)
-        if len(subparents) != len(actual_path):
-            return False
-        
-        for expected, actual in zip(subparents, actual_path):
-            if expected.strip().lower() != actual.lower():
-                return False
-        
-        return True
-
-        
     async def _find_document_by_path(self, path: tuple[str, list[str], str]) -> Optional[str]:
         """
         Find a document by matching its title and hierarchical path in the specified collection.
@@ -567,71 +574,35 @@ class SmartQACog(commands.Cog):
 
         collection_id = parent_collection.get("id")
 
-        # Step 2: Fetch all documents in the collection
-        docs = await self._fetch_documents(collection_id)
-        if not docs:
+        # Step 2: Fetch the collection's path index
+        index = await self.mirror.index(collection_id)
+        if not index.docs:
             logger.warning(f"No documents found in collection '{parent_name}'")
             return None
 
-        # Build a dictionary to look up documents by ID for path verification
-        by_id = {doc["id"]: doc for doc in docs}
-
-        # Step 3: Match the document by title and verify hierarchical path
-        target_doc = None
-        doc_name_lower = doc_name.strip().lower()
-        
-        for doc in docs:
-            if doc.get('title', '').strip().lower() == doc_name_lower:
-                # Verify the document's hierarchical path matches the subparents
-                if self._verify_document_path(doc, subparents, by_id):
-                    target_doc = doc
-                    break
+        # Step 3: Look the document up by its full (case-insensitive) path
+        target_doc = index.find(subparents, doc_name)
 
         if not target_doc:
             # Log available document titles for debugging
-            available_titles = [doc.get('title', 'Untitled') for doc in docs[:10]]
+            available_titles = [doc.get('title', 'Untitled') for doc in index.docs[:10]]
             logger.warning(
                 f"Document '{doc_name}' not found in collection '{parent_name}' with path {subparents}. "
                 f"Available documents (first 10): {available_titles}"
             )
             return None
 
-        # Step 4: Fetch document content
-        document_id = target_doc["id"]
-        headers = {"Authorization": f"Bearer {self.api_token}"}
-        data = {"id": document_id}
-
+        # Step 4: Fetch document content (from the mirror unless it changed upstream)
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.post(f"{self.api_url}/documents.info", headers=headers, json=data) as resp:
-                    if resp.status == 200:
-                        res = await resp.json()
-                        doc_data = res.get("data", {})
-
-                        # Try different possible content fields
-                        content = (
-                            doc_data.get("text") or
-                            doc_data.get("content") or
-                            doc_data.get("body") or
-                            doc_data.get("markdown") or
-                            ""
-                        )
-
-                        if content:
-                            logger.info(f"Successfully fetched document '{doc_name}' from collection '{parent_name}' ({len(content)} chars)")
-                            return content
-                        else:
-                            logger.warning(f"Document '{doc_name}' found but has no content. Available fields: {list(doc_data.keys())}")
-                            return None
-                    else:
-                        error_text = await resp.text()
-                        logger.warning(f"Failed to fetch document content: HTTP {resp.status} - {error_text}")
-                        return None
-
+            content = await self.mirror.document_text(target_doc)
         except Exception as e:
             logger.exception(f"Error fetching document content: {e}")
             return None
 
+        if content:
+            logger.info(f"Successfully fetched document '{doc_name}' from collection '{parent_name}' ({len(content)} chars)")
+        return content
+
 
 
 async def setup(bot: commands.Bot):
@@ -0,0 +1,78 @@
+import logging
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger("utilitybot.smart_qa")
+
+
+def _fold(title: Optional[str]) -> str:
+    return (title or "").strip().casefold()
+
+
+class DocumentTreeIndex:
+    """
+    Path index over one collection's documents, built once per fetch.
+
+    - `paths`: document id -> tuple of titles from the root down to the document
+    - `by_title`: case-folded title -> every document with that title
+    - `by_path`: case-folded path tuple -> document (first one wins on duplicates)
+
+    Every path is materialized in a single O(n) pass by reusing the already computed
+    path of the parent. A parent that is missing from the listing simply ends the
+    path there instead of raising.
+    """
+
+    def __init__(self, docs: Iterable[dict]):
+        self.docs: List[dict] = list(docs)
+        self.by_id: Dict[str, dict] = {doc["id"]: doc for doc in self.docs}
+        self.paths: Dict[str, Tuple[str, ...]] = {}
+        self.by_title: Dict[str, List[dict]] = defaultdict(list)
+        self.by_path: Dict[Tuple[str, ...], dict] = {}
+
+        for doc in self.docs:
+            path = self._materialize(doc)
+            self.by_title[_fold(doc.get("title"))].append(doc)
+            self.by_path.setdefault(tuple(_fold(part) for part in path), doc)
+
+    def _materialize(self, doc: dict) -> Tuple[str, ...]:
+        """Compute a document's path, memoizing every ancestor visited on the way."""
+        if doc["id"] in self.paths:
+            return self.paths[doc["id"]]
+
+        # Walk up until we reach the root, a missing parent or an already known path
+        chain = [doc]
+        seen = {doc["id"]}
+        prefix: Tuple[str, ...] = ()
+        parent_id = doc.get("parentDocumentId")
+        while parent_id:
+            if parent_id in self.paths:
+                prefix = self.paths[parent_id]
+                break
+            parent = self.by_id.get(parent_id)
+            if parent is None:
+                logger.debug(f"Parent document ID '{parent_id}' not found in collection - possible data inconsistency")
+                break
+            if parent_id in seen:
+                logger.warning(f"Cycle in parentDocumentId chain at '{parent_id}'")
+                break
+            seen.add(parent_id)
+            chain.append(parent)
+            parent_id = parent.get("parentDocumentId")
+
+        # Assign paths root-first so each document extends its parent's tuple
+        for node in reversed(chain):
+            prefix = prefix + ((node.get("title") or "").strip(),)
+            self.paths[node["id"]] = prefix
+        return self.paths[doc["id"]]
+
+    def full_path(self, doc: dict) -> str:
+        """Full path of a document, separated by '/'."""
+        return "/".join(self.paths.get(doc["id"]) or (doc.get("title") or "",))
+
+    def find(self, subparents: List[str], doc_name: str) -> Optional[dict]:
+        """Look up a document by its parent titles and its own title (case-insensitive)."""
+        return self.by_path.get(tuple(_fold(part) for part in [*subparents, doc_name]))
+
+    def titled(self, title: str) -> List[dict]:
+        """Every document with the given title (case-insensitive)."""
+        return self.by_title.get(_fold(title), [])
@@ -0,0 +1,332 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from typing import Callable, Dict, List, Optional
+
+from bot.core.http import get_http_client
+from bot.core.singleflight import SingleFlight
+from bot.features.smart_qa.doc_index import DocumentTreeIndex
+
+logger = logging.getLogger("utilitybot.smart_qa")
+
+PAGE_LIMIT = 100  # Outline caps list endpoints at 100 items per page
+SAVE_DELAY = 5.0  # seconds changes may wait before the mirror is written to disk
+
+
+class OutlineMirror:
+    """
+    In-process mirror of Outline collections, document trees and document bodies.
+
+    Every entity type has its own TTL. When a collection's document tree expires it
+    is refreshed incrementally: `documents.list` is paged newest-first by `updatedAt`
+    and paging stops at the first document that is not newer than what we already
+    hold. Only documents whose `updatedAt` changed lose their cached body. A full
+    resync still runs every `full_sync_ttl` seconds so deletions are picked up.
+
+    If `cache_path` is set, the mirror is persisted as JSON and reloaded on startup.
+    Changes are written at most once per `save_delay` seconds, so a refresh that
+    fetches many bodies rewrites the file a handful of times rather than per body.
+    """
+
+    def __init__(
+        self,
+        api_url: Optional[str],
+        api_token: Optional[str],
+        collections_ttl: float = 300,
+        tree_ttl: float = 120,
+        body_ttl: float = 3600,
+        full_sync_ttl: float = 3600,
+        cache_path: Optional[str] = None,
+        save_delay: float = SAVE_DELAY,
+    ):
+        self.api_url = api_url
+        self.api_token = api_token
+        self.collections_ttl = collections_ttl
+        self.tree_ttl = tree_ttl
+        self.body_ttl = body_ttl
+        self.full_sync_ttl = full_sync_ttl
+        self.cache_path = cache_path
+        self.save_delay = save_delay
+
+        self._collections: List[dict] = []
+        self._collections_fetched_at = 0.0
+        # collection_id -> {"docs": {doc_id: doc}, "fetched_at": ts, "full_sync_at": ts}
+        self._trees: Dict[str, dict] = {}
+        # doc_id -> {"updatedAt": str, "text": str, "fetched_at": ts}
+        self._bodies: Dict[str, dict] = {}
+        # collection_id -> path index, rebuilt only when that tree changes
+        self._indexes: Dict[str, DocumentTreeIndex] = {}
+        # called with a document id whenever that document changes or disappears upstream
+        self._change_listeners: List[Callable[[str], None]] = []
+        # concurrent cold lookups share one Outline request instead of each sending their own
+        self._flight = SingleFlight()
+        self._loaded = False
+        self._save_task: Optional[asyncio.Task] = None
+
+    @classmethod
+    def from_env(cls, api_url: Optional[str], api_token: Optional[str]) -> "OutlineMirror":
+        return cls(
+            api_url,
+            api_token,
+            collections_ttl=float(os.getenv("OUTLINE_COLLECTIONS_TTL", "300")),
+            tree_ttl=float(os.getenv("OUTLINE_TREE_TTL", "120")),
+            body_ttl=float(os.getenv("OUTLINE_BODY_TTL", "3600")),
+            full_sync_ttl=float(os.getenv("OUTLINE_FULL_SYNC_TTL", "3600")),
+            cache_path=os.getenv("OUTLINE_CACHE_PATH") or None,
+        )
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        """Outline requests actually sent, and lookups that joined one already in flight."""
+        return {"requests": self._flight.calls, "coalesced": self._flight.shared}
+
+    def add_change_listener(self, callback: Callable[[str], None]):
+        """Register `callback(doc_id)` to run when a mirrored document changes or is removed."""
+        self._change_listeners.append(callback)
+
+    def _notify_changed(self, doc_id: str):
+        for callback in self._change_listeners:
+            try:
+                callback(doc_id)
+            except Exception:
+                logger.exception("Outline mirror change listener failed")
+
+    async def _post(self, endpoint: str, data: Optional[dict] = None) -> dict:
+        headers = {"Authorization": f"Bearer {self.api_token}"}
+        client = get_http_client()
+        async with client.post(f"{self.api_url}/{endpoint}", headers=headers, json=data or {}) as resp:
+            if resp.status != 200:
+                error_text = await resp.text()
+                logger.warning(f"Outline {endpoint} failed: HTTP {resp.status} - {error_text}")
+                return {}
+            return await resp.json()
+
+    async def _ensure_loaded(self):
+        if not self._loaded:
+            await self._flight.do("load", self._load)
+
+    async def _load(self):
+        if self._loaded:
+            return
+        self._loaded = True
+        if self.cache_path and os.path.exists(self.cache_path):
+            try:
+                state = await asyncio.to_thread(self._read_cache_file)
+                self._collections = state.get("collections", [])
+                self._collections_fetched_at = state.get("collections_fetched_at", 0.0)
+                self._trees = state.get("trees", {})
+                self._bodies = state.get("bodies", {})
+                logger.info(f"Loaded Outline mirror from {self.cache_path} ({len(self._bodies)} bodies)")
+            except Exception:
+                logger.exception("Failed to load Outline mirror cache, starting empty")
+
+    def _read_cache_file(self) -> dict:
+        with open(self.cache_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def _write_cache_file(self, state: dict):
+        tmp_path = f"{self.cache_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+        os.replace(tmp_path, self.cache_path)
+
+    async def save(self):
+        """Persist the mirror to disk, if disk backing is enabled."""
+        if not self.cache_path:
+            return
+        # shallow copies, since the event loop keeps mutating the mirror while the file is written
+        state = {
+            "collections": list(self._collections),
+            "collections_fetched_at": self._collections_fetched_at,
+            "trees": {cid: {**tree, "docs": dict(tree["docs"])} for cid, tree in self._trees.items()},
+            "bodies": dict(self._bodies),
+        }
+        try:
+            await asyncio.to_thread(self._write_cache_file, state)
+        except Exception:
+            logger.exception("Failed to persist Outline mirror cache")
+
+    def _schedule_save(self):
+        """Persist the mirror after `save_delay`, folding in every change made until then."""
+        if self.cache_path and (self._save_task is None or self._save_task.done()):
+            self._save_task = asyncio.create_task(self._save_later())
+
+    async def _save_later(self):
+        await asyncio.sleep(self.save_delay)
+        await self.save()
+
+    async def close(self):
+        """Write out any change still waiting for its delayed save."""
+        if self._save_task is not None and not self._save_task.done():
+            self._save_task.cancel()
+            await self.save()
+        self._save_task = None
+
+    def invalidate(self):
+        """Drop all cached state so the next access refetches from Outline."""
+        self._collections = []
+        self._collections_fetched_at = 0.0
+        self._trees.clear()
+        self._bodies.clear()
+        self._indexes.clear()
+
+    async def collections(self, force: bool = False) -> List[dict]:
+        """Return all collections, refetching only when the TTL has expired."""
+        await self._ensure_loaded()
+        if force or not self._collections or time.time() - self._collections_fetched_at > self.collections_ttl:
+            await self._flight.do("collections.list", self._refresh_collections)
+        return self._collections
+
+    async def _refresh_collections(self):
+        collections = []
+        offset = 0
+        while True:
+            res = await self._post("collections.list", {"offset": offset, "limit": PAGE_LIMIT})
+            if not res:
+                # keep the previous list rather than replacing it with a partial one
+                return
+            page = res.get("data", [])
+            collections.extend(page)
+            if len(page) < PAGE_LIMIT:
+                break
+            offset += PAGE_LIMIT
+        self._collections = collections
+        self._collections_fetched_at = time.time()
+        self._schedule_save()
+
+    async def documents(self, collection_id: str, force: bool = False) -> List[dict]:
+        """Return every document in a collection, refreshing the tree incrementally."""
+        await self._ensure_loaded()
+        tree = self._trees.get(collection_id)
+        now = time.time()
+        if tree is None or force or now - tree["fetched_at"] > self.tree_ttl or now - tree["full_sync_at"] > self.full_sync_ttl:
+            await self._flight.do(("documents.list", collection_id), lambda: self._refresh_tree(collection_id, force))
+            tree = self._trees.get(collection_id)
+        return list(tree["docs"].values()) if tree else []
+
+    async def _refresh_tree(self, collection_id: str, force: bool):
+        now = time.time()
+        tree = self._trees.get(collection_id)
+
+        if tree is None or force or now - tree["full_sync_at"] > self.full_sync_ttl:
+            docs = await self._list_documents(collection_id)
+            if docs is None:
+                return
+            previous = tree["docs"] if tree else {}
+            tree = {"docs": {doc["id"]: doc for doc in docs}, "fetched_at": now, "full_sync_at": now}
+            for doc_id in set(previous) - set(tree["docs"]):
+                self._bodies.pop(doc_id, None)
+                self._notify_changed(doc_id)
+            for doc in docs:
+                old = previous.get(doc["id"])
+                if old is not None and old.get("updatedAt") != doc.get("updatedAt"):
+                    self._notify_changed(doc["id"])
+            self._trees[collection_id] = tree
+            self._indexes.pop(collection_id, None)
+            self._absorb_bodies(docs, now)
+            self._schedule_save()
+        elif now - tree["fetched_at"] > self.tree_ttl:
+            high_water = max((doc.get("updatedAt") or "" for doc in tree["docs"].values()), default="")
+            changed = await self._list_documents(collection_id, newer_than=high_water)
+            if changed is not None:
+                for doc in changed:
+                    old = tree["docs"].get(doc["id"])
+                    tree["docs"][doc["id"]] = doc
+                    if old is not None and old.get("updatedAt") != doc.get("updatedAt"):
+                        self._notify_changed(doc["id"])
+                tree["fetched_at"] = now
+                self._absorb_bodies(changed, now)
+                if changed:
+                    self._indexes.pop(collection_id, None)
+                    logger.info(f"Outline mirror refreshed {len(changed)} changed document(s) in {collection_id}")
+                    self._schedule_save()
+
+    async def index(self, collection_id: str) -> DocumentTreeIndex:
+        """Return the path index for a collection, built once per tree refresh."""
+        docs = await self.documents(collection_id)
+        index = self._indexes.get(collection_id)
+        if index is None:
+            index = self._indexes[collection_id] = DocumentTreeIndex(docs)
+        return index
+
+    async def _list_documents(self, collection_id: str, newer_than: Optional[str] = None) -> Optional[List[dict]]:
+        """
+        Page through documents.list newest-first.
+
+        With `newer_than`, paging stops at the first document whose `updatedAt` is not
+        newer than the given ISO timestamp (ISO-8601 strings compare chronologically).
+        Returns None if the first request fails so callers can keep stale data.
+        """
+        docs = []
+        offset = 0
+        while True:
+            res = await self._post(
+                "documents.list",
+                {
+                    "collectionId": collection_id,
+                    "sort": "updatedAt",
+                    "direction": "DESC",
+                    "offset": offset,
+                    "limit": PAGE_LIMIT,
+                },
+            )
+            if not res:
+                return docs if offset else None
+            page = res.get("data", [])
+            for doc in page:
+                if newer_than is not None and (doc.get("updatedAt") or "") <= newer_than:
+                    return docs
+                docs.append(doc)
+            if len(page) < PAGE_LIMIT:
+                return docs
+            offset += PAGE_LIMIT
+
+    def _absorb_bodies(self, docs: List[dict], now: float):
+        """Keep bodies that came with a listing; drop cached bodies that are now stale."""
+        for doc in docs:
+            cached = self._bodies.get(doc["id"])
+            if doc.get("text"):
+                self._bodies[doc["id"]] = {"updatedAt": doc.get("updatedAt"), "text": doc["text"], "fetched_at": now}
+            elif cached and cached.get("updatedAt") != doc.get("updatedAt"):
+                del self._bodies[doc["id"]]
+
+    async def document_text(self, doc: dict) -> Optional[str]:
+        """Return a document's markdown body, served from memory while it is current."""
+        await self._ensure_loaded()
+        now = time.time()
+        cached = self._bodies.get(doc["id"])
+        if (
+            cached
+            and cached.get("updatedAt") == doc.get("updatedAt")
+            and now - cached["fetched_at"] <= self.body_ttl
+        ):
+            return cached["text"]
+        return await self._flight.do(("documents.info", doc["id"]), lambda: self._fetch_body(doc))
+
+    async def _fetch_body(self, doc: dict) -> Optional[str]:
+        now = time.time()
+        res = await self._post("documents.info", {"id": doc["id"]})
+        doc_data = res.get("data", {}) if res else {}
+
+        # Try different possible content fields
+        content = (
+            doc_data.get("text") or
+            doc_data.get("content") or
+            doc_data.get("body") or
+            doc_data.get("markdown") or
+            ""
+        )
+        if not content:
+            if doc_data:
+                logger.warning(f"Document '{doc.get('title')}' found but has no content. Available fields: {list(doc_data.keys())}")
+            return None
+
+        self._bodies[doc["id"]] = {
+            "updatedAt": doc_data.get("updatedAt", doc.get("updatedAt")),
+            "text": content,
+            "fetched_at": now,
+        }
+        self._schedule_save()
+        return content
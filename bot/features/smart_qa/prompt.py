@@ -0,0 +1,26 @@
+from collections import OrderedDict
+from typing import Iterable, List, Tuple
+
+from bot.core.tokens import estimate_tokens
+from bot.features.smart_qa.chunking import select_within_budget
+from bot.features.smart_qa.retrieval import Passage
+
+
+def assemble_context(scored_passages: Iterable[Tuple[float, Passage]], budget_tokens: int) -> Tuple[str, List[str]]:
+    """
+    Build a knowledge block from retrieved passages under a token budget.
+
+    Returns the rendered context and the document paths it cites. Passages are
+    grouped per document (best document first) and kept in reading order.
+    """
+    scored_passages = list(scored_passages)
+    labelled = [(score, (f"[{passage.label}]\n{passage.text}", passage)) for score, passage in scored_passages]
+    selected = select_within_budget(labelled, lambda item: estimate_tokens(item[0]), budget_tokens)
+
+    doc_rank = {}
+    for score, passage in sorted(scored_passages, key=lambda pair: pair[0], reverse=True):
+        doc_rank.setdefault(passage.doc_id, len(doc_rank))
+    selected.sort(key=lambda item: (doc_rank[item[1].doc_id], item[1].position))
+
+    sources = OrderedDict((item[1].doc_id, item[1].path) for item in selected)
+    return "\n\n".join(item[0] for item in selected), list(sources.values())
@@ -0,0 +1,249 @@
+import heapq
+import logging
+import math
+import re
+import time
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from bot.core.singleflight import SingleFlight
+from bot.features.smart_qa.chunking import chunk_markdown
+
+logger = logging.getLogger("utilitybot.smart_qa")
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+RRF_K = 60  # reciprocal rank fusion damping constant
+
+STOPWORDS = frozenset(
+    "a an and are as at be but by can do does for from has have how i if in is it its "
+    "me my of on or our so that the their them then there these they this to was we "
+    "what when where which who why will with you your".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase, split on non-alphanumerics, drop stopwords and fold simple plurals."""
+    tokens = []
+    for token in _TOKEN_RE.findall((text or "").lower()):
+        if token in STOPWORDS:
+            continue
+        if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+
+@dataclass(frozen=True)
+class Passage:
+    doc_id: str
+    collection_id: str
+    collection_name: str
+    title: str
+    path: str
+    heading: str
+    text: str
+    position: int
+    tokens: int
+
+    @property
+    def label(self) -> str:
+        return f"{self.path} > {self.heading}" if self.heading else self.path
+
+
+@dataclass
+class SearchHit:
+    """A document ranked for a query, with its best-scoring passages."""
+    doc_id: str
+    collection_id: str
+    collection_name: str
+    title: str
+    path: str
+    score: float
+    passages: List[Tuple[float, Passage]] = field(default_factory=list)
+
+
+class BM25Index:
+    """Inverted index over arbitrary items (usually passages) with Okapi BM25 scoring."""
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.passages: List[Any] = []
+        self.postings: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+        self.lengths: List[int] = []
+        self._total_length = 0
+
+    def add(self, passage: Any, text: str):
+        terms = Counter(tokenize(text))
+        idx = len(self.passages)
+        self.passages.append(passage)
+        length = sum(terms.values())
+        self.lengths.append(length)
+        self._total_length += length
+        for term, tf in terms.items():
+            self.postings[term].append((idx, tf))
+
+    def __len__(self) -> int:
+        return len(self.passages)
+
+    def idf(self, term: str) -> float:
+        n = len(self.passages)
+        df = len(self.postings.get(term, ()))
+        return math.log(1 + (n - df + 0.5) / (df + 0.5))
+
+    def search(self, query: str, k: int = 10) -> List[Tuple[float, Any]]:
+        """Return the top-k passages for a query as (score, passage) pairs."""
+        if not self.passages:
+            return []
+        avgdl = self._total_length / len(self.passages) or 1.0
+        scores: Dict[int, float] = defaultdict(float)
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = self.idf(term)
+            for idx, tf in postings:
+                norm = self.k1 * (1 - self.b + self.b * self.lengths[idx] / avgdl)
+                scores[idx] += idf * tf * (self.k1 + 1) / (tf + norm)
+        best = heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+        return [(score, self.passages[idx]) for idx, score in best]
+
+
+def reciprocal_rank_fusion(rankings: Iterable[List[Tuple[float, Passage]]]) -> List[Tuple[float, Passage]]:
+    """Merge several ranked passage lists, scoring each passage by sum(1 / (RRF_K + rank))."""
+    fused: Dict[Tuple[str, int], List] = {}
+    for ranking in rankings:
+        for rank, (_, passage) in enumerate(ranking):
+            entry = fused.setdefault((passage.doc_id, passage.position), [0.0, passage])
+            entry[0] += 1.0 / (RRF_K + rank + 1)
+    return sorted(((score, passage) for score, passage in fused.values()), key=lambda pair: pair[0], reverse=True)
+
+
+class KnowledgeRetriever:
+    """
+    Local retrieval over the mirrored Outline knowledge base.
+
+    The BM25 index is rebuilt only when the set of (document id, updatedAt) pairs in
+    the mirror changes, so steady-state searches never touch the network. With a
+    `semantic` index attached, its vector hits are fused with BM25 by reciprocal rank.
+    """
+
+    def __init__(self, mirror, semantic=None):
+        self.mirror = mirror
+        self.semantic = semantic
+        self.index = BM25Index()
+        # doc id -> updatedAt of every indexed document
+        self.versions: Dict[str, str] = {}
+        self._signature: Optional[frozenset] = None
+        self._pending_semantic: Optional[Dict[str, Tuple[str, List[Passage]]]] = None
+        self._flight = SingleFlight()
+
+    async def refresh(self) -> BM25Index:
+        """Make sure the index reflects the current mirror contents (one rebuild at a time)."""
+        return await self._flight.do("refresh", self._refresh)
+
+    async def _refresh(self) -> BM25Index:
+        entries = []
+        for collection in await self.mirror.collections():
+            collection_id = collection.get("id")
+            if not collection_id:
+                continue
+            tree_index = await self.mirror.index(collection_id)
+            for doc in tree_index.docs:
+                entries.append((collection, tree_index, doc))
+
+        signature = frozenset((doc["id"], doc.get("updatedAt")) for _, _, doc in entries)
+        if signature == self._signature:
+            await self._sync_semantic()
+            return self.index
+
+        started = time.perf_counter()
+        index = BM25Index()
+        documents: Dict[str, Tuple[str, List[Passage]]] = {}
+        for collection, tree_index, doc in entries:
+            text = await self.mirror.document_text(doc)
+            if not text:
+                continue
+            path = tree_index.full_path(doc)
+            doc_passages = documents.setdefault(doc["id"], (doc.get("updatedAt") or "", []))[1]
+            for chunk in chunk_markdown(text):
+                passage = Passage(
+                    doc_id=doc["id"],
+                    collection_id=collection["id"],
+                    collection_name=collection.get("name", ""),
+                    title=doc.get("title", ""),
+                    path=path,
+                    heading=chunk.heading,
+                    text=chunk.text,
+                    position=chunk.position,
+                    tokens=chunk.tokens,
+                )
+                # Paths and headings are indexed with the body so they count as evidence
+                index.add(passage, f"{path} {chunk.heading} {chunk.text}")
+                doc_passages.append(passage)
+        self.index = index
+        self.versions = {doc_id: version for doc_id, (version, _) in documents.items()}
+        self._signature = signature
+        logger.info(
+            f"Built retrieval index: {len(index)} passages from {len(entries)} documents "
+            f"in {(time.perf_counter() - started) * 1000:.1f} ms"
+        )
+        if self.semantic is not None:
+            self._pending_semantic = documents
+            await self._sync_semantic()
+        return index
+
+    async def _sync_semantic(self):
+        """Push pending document changes into the vector index; retried on the next refresh if it fails."""
+        if self.semantic is None or self._pending_semantic is None:
+            return
+        try:
+            await self.semantic.sync(self._pending_semantic)
+            self._pending_semantic = None
+        except Exception:
+            logger.exception("Failed to update the semantic index")
+
+    async def _candidates(self, question: str, pool: int) -> List[Tuple[float, Passage]]:
+        scored = self.index.search(question, k=pool)
+        if self.semantic is None:
+            return scored
+        try:
+            semantic = await self.semantic.search(question, k=pool)
+        except Exception:
+            logger.exception("Semantic search failed, using BM25 only")
+            return scored
+        return reciprocal_rank_fusion([scored, semantic])[:pool]
+
+    async def search(self, question: str, k: int = 3, passages_per_doc: int = 2) -> List[SearchHit]:
+        """Return the top-k documents for a question, each with its best passages."""
+        await self.refresh()
+        return self.rank(await self._candidates(question, max(k * 5, 20)), k, passages_per_doc)
+
+    @staticmethod
+    def rank(scored: Iterable[Tuple[float, Passage]], k: int, passages_per_doc: int) -> List[SearchHit]:
+        """Group passage hits by document, scoring each document by its best passage."""
+        hits: Dict[str, SearchHit] = {}
+        for score, passage in scored:
+            hit = hits.get(passage.doc_id)
+            if hit is None:
+                hit = hits[passage.doc_id] = SearchHit(
+                    doc_id=passage.doc_id,
+                    collection_id=passage.collection_id,
+                    collection_name=passage.collection_name,
+                    title=passage.title,
+                    path=passage.path,
+                    score=score,
+                )
+            if len(hit.passages) < passages_per_doc:
+                hit.passages.append((score, passage))
+        return sorted(hits.values(), key=lambda hit: hit.score, reverse=True)[:k]
+
+    async def rank_collections(self, question: str, limit: int = 3) -> List[str]:
+        """Rank collection names by the summed score of their top matching documents."""
+        scores: Dict[str, float] = defaultdict(float)
+        for hit in await self.search(question, k=20, passages_per_doc=1):
+            if hit.collection_name:
+                scores[hit.collection_name] += hit.score
+        return [name for name, _ in sorted(scores.items(), key=lambda item: item[1], reverse=True)[:limit]]
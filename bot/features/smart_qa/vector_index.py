@@ -0,0 +1,389 @@
+import abc
+import asyncio
+import json
+import logging
+import os
+import zlib
+from dataclasses import asdict
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from bot.core.http import get_http_client
+from bot.features.smart_qa.retrieval import Passage, tokenize
+
+logger = logging.getLogger("utilitybot.smart_qa")
+
+SEARCH_BLOCK_ROWS = 65536  # rows scored per matmul, bounds temporary memory
+COMPACT_DEAD_RATIO = 0.3  # rewrite the matrix once this share of rows is stale
+EMBED_BATCH = 64
+
+
+class EmbeddingProvider(abc.ABC):
+    """Turns text into L2-normalized float32 vectors. Subclass and register to plug in a model."""
+
+    name = "base"
+
+    @abc.abstractmethod
+    async def embed(self, texts: List[str]) -> np.ndarray:
+        ...
+
+
+class HashingEmbeddingProvider(EmbeddingProvider):
+    """
+    Deterministic, offline hashing vectorizer.
+
+    Unigrams and bigrams are hashed with CRC32 (stable across processes, unlike
+    `hash()`) into `dim` signed buckets, damped with log1p and L2-normalized.
+    """
+
+    name = "hashing"
+
+    def __init__(self, dim: int = 512):
+        self.dim = dim
+
+    def _embed_sync(self, texts: List[str]) -> np.ndarray:
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            tokens = tokenize(text)
+            features = tokens + [f"{a}_{b}" for a, b in zip(tokens, tokens[1:])]
+            if not features:
+                continue
+            hashes = np.fromiter((zlib.crc32(f.encode("utf-8")) for f in features), dtype=np.uint32, count=len(features))
+            signs = np.where(hashes & 0x80000000, -1.0, 1.0).astype(np.float32)
+            np.add.at(out[row], (hashes % self.dim).astype(np.intp), signs)
+        np.copysign(np.log1p(np.abs(out)), out, out=out)
+        norms = np.linalg.norm(out, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return out / norms
+
+    async def embed(self, texts: List[str]) -> np.ndarray:
+        return await asyncio.to_thread(self._embed_sync, texts)
+
+
+class OpenAICompatibleEmbeddingProvider(EmbeddingProvider):
+    """Embeddings from any OpenAI-compatible `/embeddings` endpoint."""
+
+    name = "openai"
+
+    def __init__(self, base_url: str, api_key: str, model: str):
+        self.base_url = base_url.rstrip("/")
+        self.api_key = api_key
+        self.model = model
+
+    async def embed(self, texts: List[str]) -> np.ndarray:
+        headers = {"Authorization": f"Bearer {self.api_key}"}
+        client = get_http_client()
+        async with client.post(f"{self.base_url}/embeddings", headers=headers, json={"model": self.model, "input": texts}) as resp:
+            if resp.status != 200:
+                raise RuntimeError(f"Embedding API non-200: {resp.status}")
+            data = await resp.json()
+        rows = sorted(data.get("data", []), key=lambda item: item.get("index", 0))
+        out = np.asarray([row["embedding"] for row in rows], dtype=np.float32)
+        norms = np.linalg.norm(out, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return out / norms
+
+
+EMBEDDING_PROVIDERS: Dict[str, Callable[[], EmbeddingProvider]] = {
+    "hashing": lambda: HashingEmbeddingProvider(int(os.getenv("SMART_QA_HASHING_DIM", "512"))),
+    "openai": lambda: OpenAICompatibleEmbeddingProvider(
+        os.getenv("SMART_QA_EMBEDDING_URL", "https://api.openai.com/v1"),
+        os.getenv("SMART_QA_EMBEDDING_API_KEY", ""),
+        os.getenv("SMART_QA_EMBEDDING_MODEL", "text-embedding-3-small"),
+    ),
+}
+
+
+def register_embedding_provider(name: str, factory: Callable[[], EmbeddingProvider]):
+    """Make a provider selectable through SMART_QA_EMBEDDINGS."""
+    EMBEDDING_PROVIDERS[name] = factory
+
+
+def create_embedding_provider(name: Optional[str]) -> Optional[EmbeddingProvider]:
+    """Return the named provider, or None when semantic search is off."""
+    name = (name or "off").strip().lower()
+    if name in ("", "off", "none"):
+        return None
+    factory = EMBEDDING_PROVIDERS.get(name)
+    if factory is None:
+        logger.warning(f"Unknown embedding provider '{name}', semantic search disabled")
+        return None
+    return factory()
+
+
+class VectorIndex:
+    """
+    Append-only float32 vector matrix memory-mapped from `<directory>/vectors.f32`.
+
+    Row metadata and a liveness mask live in `meta.json`. Updating a document
+    tombstones its old rows and appends new ones, so only changed documents are
+    re-embedded; the file is compacted once too many rows are stale. With
+    `quantize`, search runs on an in-memory int8 copy with per-row scales;
+    appended rows are quantized on their own into spare capacity, so only a
+    load or compaction quantizes the whole matrix.
+    """
+
+    def __init__(self, directory: str, quantize: bool = False):
+        self.directory = directory
+        self.quantize = quantize
+        self.provider_name: Optional[str] = None
+        self.dim: Optional[int] = None
+        self.rows: List[dict] = []
+        self.alive = np.zeros(0, dtype=bool)
+        self.versions: Dict[str, str] = {}
+        self._doc_rows: Dict[str, List[int]] = {}
+        self._matrix: Optional[np.memmap] = None
+        self._q: Optional[np.ndarray] = None
+        self._scales: Optional[np.ndarray] = None
+        # quantized rows live in over-allocated buffers; _q/_scales are views of the used part
+        self._q_buf: Optional[np.ndarray] = None
+        self._scales_buf: Optional[np.ndarray] = None
+
+    @property
+    def vectors_path(self) -> str:
+        return os.path.join(self.directory, "vectors.f32")
+
+    @property
+    def meta_path(self) -> str:
+        return os.path.join(self.directory, "meta.json")
+
+    def __len__(self) -> int:
+        return int(self.alive.sum())
+
+    def load(self, provider_name: str):
+        """Load the index from disk, discarding it if it was built by another provider."""
+        os.makedirs(self.directory, exist_ok=True)
+        self.provider_name = provider_name
+        if not os.path.exists(self.meta_path):
+            self.reset()
+            return
+        with open(self.meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        expected_bytes = len(meta.get("rows", [])) * (meta.get("dim") or 0) * 4
+        if (
+            meta.get("provider") != provider_name
+            or not os.path.exists(self.vectors_path)
+            or os.path.getsize(self.vectors_path) != expected_bytes
+        ):
+            logger.info("Vector index does not match the current provider or is incomplete, rebuilding")
+            self.reset()
+            return
+        self.dim = meta.get("dim")
+        self.rows = meta["rows"]
+        self.alive = np.asarray(meta["alive"], dtype=bool)
+        self.versions = meta.get("versions", {})
+        self._reindex_docs()
+        self._map()
+        self._requantize()
+
+    def reset(self):
+        self._matrix = None
+        self.dim = None
+        self.rows = []
+        self.alive = np.zeros(0, dtype=bool)
+        self.versions = {}
+        self._doc_rows = {}
+        if os.path.exists(self.vectors_path):
+            os.remove(self.vectors_path)
+        self._map()
+        self._requantize()
+
+    def save(self):
+        tmp_path = f"{self.meta_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "provider": self.provider_name,
+                    "dim": self.dim,
+                    "rows": self.rows,
+                    "alive": self.alive.tolist(),
+                    "versions": self.versions,
+                },
+                f,
+            )
+        os.replace(tmp_path, self.meta_path)
+
+    def _reindex_docs(self):
+        self._doc_rows = {}
+        for i, row in enumerate(self.rows):
+            if self.alive[i]:
+                self._doc_rows.setdefault(row["doc_id"], []).append(i)
+
+    def _map(self):
+        self._matrix = None
+        n = len(self.rows)
+        if n and self.dim:
+            self._matrix = np.memmap(self.vectors_path, dtype=np.float32, mode="r", shape=(n, self.dim))
+
+    def _requantize(self):
+        """Quantize the whole matrix; only needed after a load."""
+        self._q = self._scales = self._q_buf = self._scales_buf = None
+        if self.quantize and self._matrix is not None:
+            self._q_buf, self._scales_buf = self._quantize(self._matrix)
+            self._q, self._scales = self._q_buf, self._scales_buf
+
+    def _append_quantized(self, start: int, vectors: np.ndarray):
+        """Quantize just the rows appended at `start`, growing the buffers geometrically."""
+        q, scales = self._quantize(vectors)
+        end = start + len(vectors)
+        if self._q_buf is None or len(self._q_buf) < end:
+            capacity = max(end, 2 * (len(self._q_buf) if self._q_buf is not None else 0))
+            q_buf = np.empty((capacity, vectors.shape[1]), dtype=np.int8)
+            scales_buf = np.empty(capacity, dtype=np.float32)
+            if start:
+                q_buf[:start] = self._q_buf[:start]
+                scales_buf[:start] = self._scales_buf[:start]
+            self._q_buf, self._scales_buf = q_buf, scales_buf
+        self._q_buf[start:end] = q
+        self._scales_buf[start:end] = scales
+        self._q, self._scales = self._q_buf[:end], self._scales_buf[:end]
+
+    @staticmethod
+    def _quantize(matrix: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Symmetric per-row int8 quantization: row ~= q * scale."""
+        scales = np.abs(matrix).max(axis=1).astype(np.float32) / 127.0
+        scales[scales == 0] = 1.0
+        q = np.empty(matrix.shape, dtype=np.int8)
+        for start in range(0, matrix.shape[0], SEARCH_BLOCK_ROWS):
+            block = matrix[start:start + SEARCH_BLOCK_ROWS]
+            q[start:start + SEARCH_BLOCK_ROWS] = np.rint(block / scales[start:start + SEARCH_BLOCK_ROWS, None])
+        return q, scales
+
+    def remove_document(self, doc_id: str):
+        for i in self._doc_rows.pop(doc_id, []):
+            self.alive[i] = False
+        self.versions.pop(doc_id, None)
+
+    def add_document(self, doc_id: str, version: str, passages: List[Passage], vectors: np.ndarray):
+        """Append the vectors for one document version (after `remove_document`)."""
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        if self.dim is None:
+            self.dim = vectors.shape[1]
+        if vectors.shape[1] != self.dim:
+            raise ValueError(f"Vector dim {vectors.shape[1]} does not match index dim {self.dim}")
+
+        # Drop the read-only map before growing the file underneath it
+        self._matrix = None
+        with open(self.vectors_path, "ab") as f:
+            f.write(vectors.tobytes())
+
+        start = len(self.rows)
+        self.rows.extend({"doc_id": doc_id, "passage": asdict(p)} for p in passages)
+        self.alive = np.concatenate([self.alive, np.ones(len(passages), dtype=bool)])
+        self._doc_rows[doc_id] = list(range(start, start + len(passages)))
+        self.versions[doc_id] = version
+        self._map()
+        if self.quantize:
+            self._append_quantized(start, vectors)
+
+    def compact(self):
+        """Rewrite the matrix without tombstoned rows once enough of them pile up."""
+        n = len(self.rows)
+        if not n or (n - len(self)) / n < COMPACT_DEAD_RATIO:
+            return
+        keep = np.flatnonzero(self.alive)
+        tmp_path = f"{self.vectors_path}.tmp"
+        if self._matrix is not None and len(keep):
+            with open(tmp_path, "wb") as f:
+                for start in range(0, len(keep), SEARCH_BLOCK_ROWS):
+                    f.write(np.ascontiguousarray(self._matrix[keep[start:start + SEARCH_BLOCK_ROWS]]).tobytes())
+        else:
+            open(tmp_path, "wb").close()
+        self._matrix = None
+        os.replace(tmp_path, self.vectors_path)
+        self.rows = [self.rows[i] for i in keep]
+        self.alive = np.ones(len(self.rows), dtype=bool)
+        self._reindex_docs()
+        self._map()
+        if self._q is not None and len(keep):
+            # the surviving rows are already quantized
+            self._q_buf, self._scales_buf = self._q[keep], self._scales[keep]
+            self._q, self._scales = self._q_buf, self._scales_buf
+        else:
+            self._requantize()
+        logger.info(f"Compacted vector index from {n} to {len(self.rows)} rows")
+
+    def search(self, query: np.ndarray, k: int = 10) -> List[Tuple[float, dict]]:
+        """Top-k rows by dot product (cosine, since vectors are normalized)."""
+        live = len(self)
+        if self._matrix is None or not live:
+            return []
+        query = np.asarray(query, dtype=np.float32).reshape(-1)
+        n = len(self.rows)
+        scores = np.empty(n, dtype=np.float32)
+        for start in range(0, n, SEARCH_BLOCK_ROWS):
+            end = min(start + SEARCH_BLOCK_ROWS, n)
+            if self.quantize:
+                scores[start:end] = (self._q[start:end] @ query) * self._scales[start:end]
+            else:
+                scores[start:end] = self._matrix[start:end] @ query
+        scores[~self.alive] = -np.inf
+        k = min(k, live)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(float(scores[i]), self.rows[i]) for i in top]
+
+
+class SemanticIndex:
+    """
+    Keeps a VectorIndex in sync with the retriever's passages and searches it.
+
+    `_lock` guards the index itself: mutations run in worker threads and
+    `search` waits for them. Embedding happens outside it, so searches are only
+    held up for one document's append, not a whole sync. `_sync_lock` keeps
+    syncs from overlapping.
+    """
+
+    def __init__(self, provider: EmbeddingProvider, index: VectorIndex):
+        self.provider = provider
+        self.index = index
+        self._loaded = False
+        self._lock = asyncio.Lock()
+        self._sync_lock = asyncio.Lock()
+
+    async def sync(self, documents: Dict[str, Tuple[str, List[Passage]]]):
+        """
+        Bring the index up to date with `{doc_id: (updatedAt, passages)}`.
+
+        Only new or changed documents are embedded; removed documents are tombstoned.
+        """
+        async with self._sync_lock:
+            if not self._loaded:
+                async with self._lock:
+                    await asyncio.to_thread(self.index.load, self.provider.name)
+                self._loaded = True
+
+            stale = [doc_id for doc_id in self.index.versions if doc_id not in documents]
+            changed = [doc_id for doc_id, (version, _) in documents.items() if self.index.versions.get(doc_id) != version]
+            if not stale and not changed:
+                return
+
+            for doc_id in stale:
+                self.index.remove_document(doc_id)
+            for doc_id in changed:
+                version, passages = documents[doc_id]
+                if not passages:
+                    self.index.remove_document(doc_id)
+                    continue
+                texts = [f"{p.path} {p.heading}\n{p.text}" for p in passages]
+                vectors = np.concatenate(
+                    [await self.provider.embed(texts[i:i + EMBED_BATCH]) for i in range(0, len(texts), EMBED_BATCH)]
+                )
+                # the old rows stay searchable until the new ones are in
+                async with self._lock:
+                    self.index.remove_document(doc_id)
+                    await asyncio.to_thread(self.index.add_document, doc_id, version, passages, vectors)
+
+            async with self._lock:
+                await asyncio.to_thread(self.index.compact)
+                await asyncio.to_thread(self.index.save)
+            logger.info(f"Vector index updated: {len(changed)} changed, {len(stale)} removed, {len(self.index)} live rows")
+
+    async def search(self, question: str, k: int = 20) -> List[Tuple[float, Passage]]:
+        if not self._loaded:
+            return []
+        query = (await self.provider.embed([question]))[0]
+        async with self._lock:
+            results = self.index.search(query, k)
+        return [(score, Passage(**row["passage"])) for score, row in results]
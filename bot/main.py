@@ -5,14 +5,23 @@ import discord
 from discord.ext import commands
 import asyncio
 
+from bot.core.http import close_http_client
 from bot.core.loader import load_feature_extensions
 
+
+class UtilityBot(commands.Bot):
+    async def close(self):
+        await super().close()
+        # Shared HTTP pool outlives every cog, so release it last
+        await close_http_client()
+
+
 def create_bot() -> commands.Bot:
     intents = discord.Intents.default()
     intents.message_content = True
     intents.voice_states = True
     intents.guilds = True
-    bot = commands.Bot(command_prefix="!", intents=intents)
+    bot = UtilityBot(command_prefix="!", intents=intents)
     return bot
 
 
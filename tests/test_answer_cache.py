@@ -0,0 +1,72 @@
+import pytest
+
+from bot.features.smart_qa import answer_cache
+from bot.features.smart_qa.answer_cache import AnswerCache, normalize_question
+
+
+@pytest.mark.parametrize("first, second", [
+    ("How do I flash the BMS?", "how to flash BMS"),
+    ("How do I flash the BMS?", "How can I flash the BMS"),
+    ("What's the pack voltage", "what is the pack voltage?"),
+    ("Why doesn't the motor spin?", "why does not the motor spin"),
+])
+def test_rewordings_share_a_key(first, second):
+    assert normalize_question(first) == normalize_question(second)
+
+
+@pytest.mark.parametrize("first, second", [
+    ("When is the weekly meeting?", "Where is the weekly meeting?"),
+    ("Why does the motor spin?", "Why doesn't the motor spin?"),
+    ("Can I flash it?", "Can't I flash it?"),
+    ("Who was the lead?", "Who is the lead?"),
+    ("How do I flash the BMS?", "How do I flash the ESC?"),
+])
+def test_different_questions_keep_different_keys(first, second):
+    assert normalize_question(first) != normalize_question(second)
+
+
+def key(question, *versions):
+    return AnswerCache.make_key(question, versions)
+
+
+def test_key_depends_on_document_versions_not_their_order():
+    assert key("q", ("a", "1"), ("b", "1")) == key("q", ("b", "1"), ("a", "1"))
+    assert key("q", ("a", "1")) != key("q", ("a", "2"))
+
+
+def test_lru_eviction_and_stats():
+    cache = AnswerCache(max_entries=2)
+    cache.put(key("one", ("a", "1")), 1)
+    cache.put(key("two", ("a", "1")), 2)
+    assert cache.get(key("one", ("a", "1"))) == 1  # "two" is now least recently used
+    cache.put(key("three", ("a", "1")), 3)
+    assert cache.get(key("two", ("a", "1"))) is None
+    assert cache.get(key("three", ("a", "1"))) == 3
+    stats = cache.stats()
+    assert (stats["size"], stats["hits"], stats["misses"], stats["evictions"]) == (2, 2, 1, 1)
+
+
+def test_entries_expire_after_the_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(answer_cache.time, "monotonic", lambda: now[0])
+    cache = AnswerCache(ttl=60)
+    cache.put(key("q", ("a", "1")), "answer")
+    now[0] += 59
+    assert cache.get(key("q", ("a", "1"))) == "answer"
+    now[0] += 2
+    assert cache.get(key("q", ("a", "1"))) is None
+    assert cache.stats()["size"] == 0
+
+
+def test_invalidate_document_drops_only_answers_built_from_it():
+    cache = AnswerCache()
+    cache.put(key("q1", ("a", "1"), ("b", "1")), 1)
+    cache.put(key("q2", ("b", "1")), 2)
+    cache.put(key("q3", ("c", "1")), 3)
+    cache.invalidate_document("b")
+    assert cache.get(key("q1", ("a", "1"), ("b", "1"))) is None
+    assert cache.get(key("q2", ("b", "1"))) is None
+    assert cache.get(key("q3", ("c", "1"))) == 3
+    assert cache.stats()["invalidations"] == 2
+    cache.invalidate_document("a")  # already gone with q1
+    assert cache.stats()["invalidations"] == 2
@@ -0,0 +1,63 @@
+import asyncio
+
+from bot.features.auto_pr_review.atom import AtomEntryParser, parse_atom_entries, read_new_entries
+
+
+def feed(*ids: str) -> bytes:
+    entries = "".join(
+        f"<entry><id>{entry_id}</id><title>Commit {entry_id}</title>"
+        f'<link href="https://example.com/{entry_id}"/><updated>2024-01-0{i + 1}T00:00:00Z</updated>'
+        f"<author><name>dev{i}</name></author></entry>"
+        for i, entry_id in enumerate(ids)
+    )
+    return f'<?xml version="1.0"?><feed xmlns="http://www.w3.org/2005/Atom"><title>t</title>{entries}</feed>'.encode()
+
+
+async def chunked(data: bytes, size: int):
+    for start in range(0, len(data), size):
+        yield data[start:start + size]
+
+
+def test_entries_are_parsed_in_feed_order():
+    entries = parse_atom_entries(feed("c", "b", "a").decode())
+    assert [entry["id"] for entry in entries] == ["c", "b", "a"]
+    assert entries[0] == {
+        "id": "c",
+        "title": "Commit c",
+        "link": "https://example.com/c",
+        "updated": "2024-01-01T00:00:00Z",
+        "author": "dev0",
+    }
+
+
+def test_parser_stops_at_the_last_seen_entry():
+    parser = AtomEntryParser(stop_at="b")
+    data = feed("d", "c", "b", "a")
+    for start in range(0, len(data), 16):
+        parser.feed(data[start:start + 16])
+        if parser.done:
+            break
+    assert parser.reached_stop
+    assert [entry["id"] for entry in parser.entries] == ["d", "c"]
+
+
+def test_finished_entries_are_detached_from_the_tree():
+    parser = AtomEntryParser()
+    parser.feed(feed("b", "a"))
+    parser.close()
+    assert len(parser.entries) == 2
+    assert len(parser._root.findall("{http://www.w3.org/2005/Atom}entry")) == 0
+
+
+def test_read_new_entries_streams_and_reports_the_stop():
+    entries, reached = asyncio.run(read_new_entries(chunked(feed("c", "b", "a"), 10), stop_at="a"))
+    assert [entry["id"] for entry in entries] == ["c", "b"]
+    assert reached
+    entries, reached = asyncio.run(read_new_entries(chunked(feed("c", "b"), 10), stop_at="z"))
+    assert len(entries) == 2
+    assert not reached
+
+
+def test_malformed_feed_yields_nothing():
+    assert parse_atom_entries("<feed><entry>") == []
+    assert asyncio.run(read_new_entries(chunked(b"<feed><entry></feed>", 5))) == ([], False)
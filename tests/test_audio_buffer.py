@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+
+from bot.features.meeting_notes.audio_buffer import BlockPool, BufferFull, RecordingBuffer
+
+RATE = 100  # tiny blocks keep the arithmetic readable
+
+
+def test_pool_reuses_zeroed_blocks_and_enforces_its_limit():
+    pool = BlockPool(block_samples=4, max_blocks=1)
+    block = pool.acquire()
+    block[:] = 7
+    with pytest.raises(BufferFull):
+        pool.acquire()
+    pool.release(block)
+    again = pool.acquire()
+    assert again is block
+    assert not again.any()
+
+
+def test_pop_ready_waits_for_the_watermark():
+    buffer = RecordingBuffer(sample_rate=RATE)
+    buffer.write("a", np.ones(150, dtype=np.int16))
+    assert buffer.pop_ready(watermark=99) is None
+    mixed, _ = buffer.pop_ready(watermark=100)
+    assert len(mixed) == RATE
+    assert buffer.pop_ready(watermark=150) is None
+    # the final drain returns the partial last block
+    mixed, _ = buffer.pop_ready()
+    assert len(mixed) == 50
+    assert buffer.pop_ready() is None
+
+
+def test_pop_ready_mixes_speakers_with_saturation():
+    buffer = RecordingBuffer(sample_rate=RATE)
+    buffer.write("a", np.full(RATE, 30000, dtype=np.int16))
+    buffer.write("b", np.full(RATE, 10000, dtype=np.int16))
+    buffer.write("c", np.full(RATE // 2, -5000, dtype=np.int16), position=RATE // 2)
+    mixed, own = buffer.pop_ready(tracks=True)
+    assert mixed.dtype == np.int16
+    assert (mixed[:RATE // 2] == 32767).all()  # 40000 clips instead of wrapping around
+    assert (mixed[RATE // 2:] == 32767).all()  # 35000 still clips
+    assert set(own) == {"a", "b", "c"}
+    assert (own["c"][:RATE // 2] == 0).all()
+
+
+def test_pop_ready_mixes_below_the_limit_exactly():
+    buffer = RecordingBuffer(sample_rate=RATE)
+    buffer.write("a", np.full(RATE, 1000, dtype=np.int16))
+    buffer.write("b", np.full(RATE, -3000, dtype=np.int16))
+    mixed, own = buffer.pop_ready()
+    assert (mixed == -2000).all()
+    assert own == {}
+
+
+def test_silent_seconds_come_out_as_zeros_and_blocks_return_to_the_pool():
+    buffer = RecordingBuffer(sample_rate=RATE)
+    buffer.write("a", np.ones(10, dtype=np.int16), position=2 * RATE)
+    first, _ = buffer.pop_ready()
+    assert not first.any()
+    buffer.pop_ready()
+    last, _ = buffer.pop_ready()
+    assert len(last) == 10
+    assert buffer.pool.stats()["free"] == buffer.pool.allocated == 1
+
+
+def test_late_and_dropped_samples_are_counted():
+    buffer = RecordingBuffer(sample_rate=RATE, max_bytes=RATE * 2)  # one block
+    buffer.write("a", np.ones(RATE, dtype=np.int16))
+    buffer.write("b", np.ones(10, dtype=np.int16))
+    assert buffer.dropped == 10
+    buffer.pop_ready()
+    buffer.write("a", np.ones(30, dtype=np.int16), position=RATE - 20)
+    assert buffer.late == 20
+    assert buffer.duration("a") == 1.1
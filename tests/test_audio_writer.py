@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+import soundfile as sf
+
+from bot.features.meeting_notes.audio_buffer import RecordingBuffer
+from bot.features.meeting_notes.audio_writer import AudioWriter
+
+RATE = 100
+
+
+def test_pump_respects_latency_and_close_writes_everything(tmp_path):
+    buffer = RecordingBuffer(sample_rate=RATE)
+    writer = AudioWriter(buffer, str(tmp_path / "meeting.wav"), latency=50)
+    writer.start()
+    buffer.write("a", np.full(250, 100, dtype=np.int16))
+    assert writer.pump(now=120) == 0  # the first block is not 50 samples old yet
+    assert writer.pump(now=150) == 1
+    writer.close()
+
+    audio, rate = sf.read(writer.path, dtype="int16")
+    assert rate == RATE
+    assert len(audio) == 250
+    assert (audio == 100).all()
+    assert writer.frames == 250
+    assert writer.stats()["written_seconds"] == 2.5
+
+
+def test_late_speakers_get_tracks_on_the_shared_timeline(tmp_path):
+    buffer = RecordingBuffer(sample_rate=RATE)
+    blocks = []
+    writer = AudioWriter(buffer, str(tmp_path / "meeting.wav"), latency=0, tracks=True, on_block=blocks.append)
+    writer.start()
+    buffer.write("a", np.full(3 * RATE, 10, dtype=np.int16))
+    buffer.write("b", np.full(RATE, 20, dtype=np.int16), position=RATE)
+    writer.close()
+
+    mix = sf.read(writer.path, dtype="int16")[0]
+    a = sf.read(writer.track_paths["a"], dtype="int16")[0]
+    b = sf.read(writer.track_paths["b"], dtype="int16")[0]
+    assert len(mix) == len(a) == len(b) == 3 * RATE
+    assert (mix[RATE:2 * RATE] == 30).all() and (mix[:RATE] == 10).all()
+    assert (a == 10).all()
+    assert not b[:RATE].any() and (b[RATE:2 * RATE] == 20).all() and not b[2 * RATE:].any()
+    assert sum(len(block) for block in blocks) == 3 * RATE
+
+
+def test_a_failing_listener_does_not_stop_the_recording(tmp_path):
+    buffer = RecordingBuffer(sample_rate=RATE)
+    calls = []
+
+    def listener(block):
+        calls.append(len(block))
+        raise RuntimeError("backend gone")
+
+    writer = AudioWriter(buffer, str(tmp_path / "meeting.wav"), latency=0, on_block=listener)
+    writer.start()
+    buffer.write("a", np.ones(2 * RATE, dtype=np.int16))
+    writer.close()
+    assert calls == [RATE]
+    assert len(sf.read(writer.path, dtype="int16")[0]) == 2 * RATE
+
+
+def test_write_errors_are_raised_on_close(tmp_path):
+    (tmp_path / "taken").write_text("not a directory")
+    writer = AudioWriter(RecordingBuffer(sample_rate=RATE), str(tmp_path / "taken" / "meeting.wav"), latency=0)
+    writer._thread.start()  # skip start(): it would fail creating the directory
+    with pytest.raises(sf.LibsndfileError):
+        writer.close()
+    assert writer.error is not None
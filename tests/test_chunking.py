@@ -0,0 +1,76 @@
+from bot.core.tokens import estimate_tokens
+from bot.features.smart_qa.chunking import chunk_markdown, select_within_budget
+from bot.features.smart_qa.prompt import assemble_context
+from bot.features.smart_qa.retrieval import Passage
+
+DOC = """\
+Intro paragraph.
+
+# Setup
+## Wiring
+Connect the red lead.
+
+Then the black lead.
+
+```
+# not a heading
+
+still code
+```
+## Flashing
+Use the programmer.
+"""
+
+
+def test_chunks_follow_headings_and_keep_code_fences_whole():
+    chunks = chunk_markdown(DOC)
+    assert [chunk.heading for chunk in chunks] == ["", "Setup > Wiring", "Setup > Flashing"]
+    # paragraphs under one heading merge while they fit; the fence stays intact
+    assert chunks[1].text == "Connect the red lead.\n\nThen the black lead.\n\n```\n# not a heading\n\nstill code\n```"
+    assert [chunk.position for chunk in chunks] == [0, 1, 2]
+
+
+def test_small_limit_keeps_paragraphs_apart():
+    chunks = chunk_markdown(DOC, max_tokens=8)
+    assert "Connect the red lead." in [chunk.text for chunk in chunks]
+    assert all(chunk.tokens <= 8 for chunk in chunks)
+
+
+def test_oversized_paragraphs_are_split_under_the_limit():
+    sentences = " ".join(f"Sentence number {i} talks about the battery pack." for i in range(100))
+    chunks = chunk_markdown(sentences, max_tokens=50)
+    assert len(chunks) > 1
+    assert all(chunk.tokens <= 50 for chunk in chunks)
+    assert " ".join(chunk.text for chunk in chunks) == sentences
+
+
+def test_unbroken_text_is_split_by_size():
+    chunks = chunk_markdown("x" * 1000, max_tokens=50)
+    assert all(chunk.tokens <= 50 for chunk in chunks)
+    assert "".join(chunk.text for chunk in chunks) == "x" * 1000
+
+
+def test_select_within_budget_skips_items_that_do_not_fit():
+    scored = [(3.0, "big"), (2.0, "small"), (1.0, "tiny")]
+    cost = {"big": 8, "small": 5, "tiny": 2}.get
+    assert select_within_budget(scored, cost, 10) == ["big", "tiny"]
+    assert select_within_budget(scored, cost, 1) == []
+
+
+def passage(doc_id, position, text):
+    return Passage(doc_id, "c", "C", doc_id, f"Docs/{doc_id}", f"H{position}", text, position, estimate_tokens(text))
+
+
+def test_assemble_context_stays_within_budget_in_reading_order():
+    scored = [
+        (0.9, passage("b", 1, "b one " * 20)),
+        (0.8, passage("a", 0, "a zero " * 20)),
+        (0.7, passage("b", 0, "b zero " * 20)),
+        (0.1, passage("a", 5, "a five " * 200)),
+    ]
+    context, paths = assemble_context(scored, budget_tokens=150)
+    assert estimate_tokens(context) <= 150
+    # best document first, passages in document order, the oversized one left out
+    assert context.index("[Docs/b > H0]") < context.index("[Docs/b > H1]") < context.index("[Docs/a > H0]")
+    assert "a five" not in context
+    assert paths == ["Docs/b", "Docs/a"]
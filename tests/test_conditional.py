@@ -0,0 +1,80 @@
+import asyncio
+
+from aiohttp import web
+
+from bot.core.http import HttpClient
+from bot.features.auto_pr_review import cog
+from bot.features.auto_pr_review.conditional import ValidatorCache, validator_headers
+
+
+def test_validator_headers():
+    assert validator_headers(None, None) == {}
+    assert validator_headers('"abc"', "Tue, 01 Oct 2024 00:00:00 GMT") == {
+        "If-None-Match": '"abc"',
+        "If-Modified-Since": "Tue, 01 Oct 2024 00:00:00 GMT",
+    }
+
+
+def test_cache_replays_the_stored_body():
+    cache = ValidatorCache()
+    cache.store("k", {"ETag": '"v1"', "Content-Type": "application/json", "X-Other": "x"}, b'{"n": 1}')
+    assert cache.request_headers("k") == {"If-None-Match": '"v1"'}
+    replayed = cache.replay("k")
+    assert replayed.status == 200 and replayed.from_cache
+    assert replayed.headers == {"ETag": '"v1"', "Content-Type": "application/json"}
+    assert asyncio.run(replayed.json()) == {"n": 1}
+    assert (cache.modified, cache.not_modified) == (1, 1)
+
+
+def test_responses_without_validators_or_too_large_are_forgotten():
+    cache = ValidatorCache(max_body_bytes=10)
+    cache.store("k", {"ETag": '"v1"'}, b"small")
+    cache.store("k", {}, b"small")
+    assert len(cache) == 0 and cache.request_headers("k") == {}
+    cache.store("k", {"ETag": '"v1"'}, b"x" * 11)
+    assert len(cache) == 0
+    assert cache.replay("missing") is None
+
+
+def test_least_recently_used_entries_are_evicted():
+    cache = ValidatorCache(max_entries=2)
+    for key in ("a", "b"):
+        cache.store(key, {"ETag": key}, b"")
+    cache.replay("a")
+    cache.store("c", {"ETag": "c"}, b"")
+    assert cache.request_headers("b") == {}
+    assert cache.request_headers("a") == {"If-None-Match": "a"}
+
+
+def test_github_get_sends_validators_and_replays_on_304(monkeypatch):
+    async def run():
+        seen = []
+
+        async def handler(request):
+            seen.append(request.headers.get("If-None-Match"))
+            if request.headers.get("If-None-Match") == '"v1"':
+                return web.Response(status=304)
+            return web.json_response({"sha": "abc"}, headers={"ETag": '"v1"'})
+
+        app = web.Application()
+        app.router.add_get("/repos/x", handler)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        url = f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}/repos/x"
+        client = HttpClient()
+        monkeypatch.setattr(cog, "get_http_client", lambda: client)
+        monkeypatch.setattr(cog, "github_validators", ValidatorCache())
+        try:
+            first = await cog.api_call_retry("GET", url)
+            second = await cog.api_call_retry("GET", url)
+            return seen, await first.json(), second, await second.json()
+        finally:
+            await client.close()
+            await runner.cleanup()
+
+    seen, first_body, second, second_body = asyncio.run(run())
+    assert seen == [None, '"v1"']
+    assert first_body == second_body == {"sha": "abc"}
+    assert getattr(second, "from_cache", False)
@@ -0,0 +1,98 @@
+import asyncio
+
+from bot.features.auto_pr_review.diff_stream import DiffParser, iter_lines, parse_diff_stream
+
+DIFF = """\
+diff --git a/src/app.py b/src/app.py
+index 1111111..2222222 100644
+--- a/src/app.py
++++ b/src/app.py
+@@ -1,4 +1,5 @@ def main():
+ context line
+-    return 1
++    return 2
++
++    # explained
+\\ No newline at end of file
+@@ -20,2 +21,2 @@ class App:
+-old = True
++new = True
+diff --git a/package-lock.json b/package-lock.json
+--- a/package-lock.json
++++ b/package-lock.json
+@@ -1 +1 @@
+-"version": "1"
++"version": "2"
+diff --git a/old/name.py b/new/name.py
+@@ -1 +1 @@
++renamed = 1
+"""
+
+
+async def chunked(data: bytes, size: int):
+    for start in range(0, len(data), size):
+        yield data[start:start + size]
+
+
+def parse(**kwargs):
+    parser = DiffParser(**kwargs)
+    for line in DIFF.splitlines():
+        parser.feed_line(line)
+    return parser.result
+
+
+def test_parser_groups_changed_lines_by_file_and_hunk():
+    result = parse(is_ignored=lambda path: path.endswith(".json"))
+    assert [f.path for f in result.files] == ["src/app.py", "new/name.py"]
+    assert result.skipped_files == ["package-lock.json"]
+    app = result.files[0]
+    assert [h.header for h in app.hunks] == ["@@ -1,4 +1,5 @@ def main():", "@@ -20,2 +21,2 @@ class App:"]
+    # context, blank lines and the no-newline marker are left out
+    assert app.hunks[0].lines == ["-return 1", "+return 2", "+# explained"]
+    assert app.added == ["return 2", "# explained", "new = True"]
+    assert result.changes() == [["return 2", "# explained", "new = True", "renamed = 1"], ["return 1", "old = True"]]
+
+
+def test_parser_applies_keep_filter_and_line_budget():
+    result = parse(keep=lambda line: bool(line) and not line.startswith("#"), max_lines=3)
+    assert result.truncated
+    assert result.changes() == [["return 2"], ["return 1", "old = True"]]
+
+
+def test_iter_lines_caps_long_lines_across_chunks():
+    data = b"short\n" + b"x" * 50 + b"\nend"
+
+    async def collect():
+        return [line async for line in iter_lines(chunked(data, 7), max_line_bytes=10)]
+
+    assert asyncio.run(collect()) == [b"short", b"x" * 10, b"end"]
+
+
+def test_parse_diff_stream_matches_line_by_line_parsing():
+    result = asyncio.run(parse_diff_stream(chunked(DIFF.encode(), 13)))
+    assert result.changes() == parse().changes()
+    assert result.bytes_read == len(DIFF.encode())
+    assert not result.truncated
+
+
+def test_parse_diff_stream_stops_at_the_byte_budget():
+    result = asyncio.run(parse_diff_stream(chunked(DIFF.encode(), 13), max_bytes=100))
+    assert result.truncated
+    assert result.bytes_read < len(DIFF.encode())
+
+
+
+def test_per_file_cap_leaves_room_for_later_files():
+    big = "diff --git a/big.py b/big.py\n@@ -1 +1 @@\n" + "".join(f"+line {n}\n" for n in range(50))
+    small = "diff --git a/small.py b/small.py\n@@ -1 +1 @@\n+kept = True\n"
+    result = asyncio.run(parse_diff_stream(chunked((big + small).encode(), 64), max_lines=20, max_file_lines=10))
+    assert [f.path for f in result.files] == ["big.py", "small.py"]
+    assert len(result.files[0].added) == 10
+    assert result.files[0].unread_lines == 40
+    assert result.files[1].added == ["kept = True"]
+    assert not result.truncated
+
+    # without the per-file cap the first file uses the whole budget
+    result = asyncio.run(parse_diff_stream(chunked((big + small).encode(), 64), max_lines=20))
+    assert [f.path for f in result.files] == ["big.py"]
+    assert result.truncated
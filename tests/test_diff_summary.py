@@ -0,0 +1,63 @@
+from bot.core.tokens import estimate_tokens
+from bot.features.auto_pr_review.diff_stream import DiffParser
+from bot.features.auto_pr_review.diff_summary import line_signal, summarize_diff
+
+
+def test_estimate_tokens():
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("abcd") == 1
+    assert estimate_tokens("abcde") == 2
+    # short words cost at least one token each
+    assert estimate_tokens("a b c d e f") == 6
+    assert estimate_tokens("x" * 400) == 100
+
+
+def test_line_signal():
+    assert line_signal("def handler(event):") == 2.0
+    assert line_signal("value = compute()") == 1.0
+    assert line_signal("});") == 0.1
+
+
+def parse(text, **kwargs):
+    parser = DiffParser(**kwargs)
+    for line in text.splitlines():
+        parser.feed_line(line)
+    return parser.result
+
+
+def file_diff(path, hunks, lines_per_hunk):
+    out = [f"diff --git a/{path} b/{path}"]
+    for h in range(hunks):
+        out.append(f"@@ -{h * 100},1 +{h * 100},1 @@")
+        out.extend(f"+value_{h}_{n} = compute({n}, {h})" for n in range(lines_per_hunk))
+    return "\n".join(out)
+
+
+def test_summary_keeps_diff_order_within_budget():
+    diff = "\n".join([file_diff("src/app.py", 3, 4), file_diff("src/util.py", 1, 2)])
+    summary = summarize_diff(parse(diff), token_budget=200)
+    assert summary.index("### src/app.py") < summary.index("### src/util.py")
+    assert estimate_tokens(summary) <= 200 + 20
+
+
+def test_every_file_gets_a_share_of_the_budget():
+    diff = "\n".join([file_diff("huge.py", 20, 20), file_diff("small.py", 1, 1)])
+    summary = summarize_diff(parse(diff, max_lines=1000), token_budget=400)
+    assert "### small.py (+1 -0, 1 hunk)" in summary
+    assert "value_0_0 = compute(0, 0)" in summary.split("### small.py")[1]
+    assert "omitted" in summary.split("### small.py")[0]
+
+
+def test_summary_reports_lines_past_the_per_file_cap():
+    diff = "\n".join([file_diff("big.py", 1, 30), file_diff("small.py", 1, 1)])
+    summary = summarize_diff(parse(diff, max_file_lines=10), token_budget=1000)
+    assert "### big.py (+10 -0, 1 hunk, 20 more changed lines not read)" in summary
+    assert "### small.py (+1 -0, 1 hunk)" in summary
+
+
+def test_summary_notes_skipped_and_truncated_diffs():
+    diff = "\n".join([file_diff("data.json", 1, 5), file_diff("a.py", 1, 5)])
+    summary = summarize_diff(parse(diff, is_ignored=lambda path: path.endswith(".json"), max_lines=3), token_budget=500)
+    assert "1 docs/data/binary file(s) skipped" in summary
+    assert "Diff was cut off" in summary
+    assert summarize_diff(parse("")) == "(no reviewable code changes)"
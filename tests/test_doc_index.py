@@ -0,0 +1,46 @@
+from bot.features.smart_qa.doc_index import DocumentTreeIndex
+
+
+def doc(doc_id, title, parent=None):
+    return {"id": doc_id, "title": title, "parentDocumentId": parent}
+
+
+TREE = [
+    doc("leaf", "Flashing", "fw"),  # listed before its ancestors on purpose
+    doc("root", "Electrical"),
+    doc("fw", "Firmware ", "root"),
+    doc("bms", "BMS", "root"),
+    doc("dup", "flashing", "bms"),
+]
+
+
+def test_paths_are_built_from_the_root_regardless_of_listing_order():
+    index = DocumentTreeIndex(TREE)
+    assert index.paths["leaf"] == ("Electrical", "Firmware", "Flashing")
+    assert index.full_path(TREE[0]) == "Electrical/Firmware/Flashing"
+    assert index.full_path(TREE[1]) == "Electrical"
+
+
+def test_find_and_titled_are_case_insensitive():
+    index = DocumentTreeIndex(TREE)
+    assert index.find(["electrical", "FIRMWARE"], "flashing")["id"] == "leaf"
+    assert index.find(["Electrical", "BMS"], "Flashing")["id"] == "dup"
+    assert index.find(["Electrical"], "Flashing") is None
+    assert {d["id"] for d in index.titled("FLASHING")} == {"leaf", "dup"}
+    assert index.titled("missing") == []
+
+
+def test_missing_parent_ends_the_path():
+    index = DocumentTreeIndex([doc("orphan", "Orphan", "gone")])
+    assert index.paths["orphan"] == ("Orphan",)
+
+
+def test_parent_cycles_do_not_loop_forever():
+    index = DocumentTreeIndex([doc("a", "A", "b"), doc("b", "B", "a")])
+    assert index.paths["a"][-1] == "A"
+    assert index.paths["b"][-1] == "B"
+
+
+def test_unknown_document_falls_back_to_its_title():
+    index = DocumentTreeIndex([])
+    assert index.full_path(doc("x", "Loose")) == "Loose"
@@ -0,0 +1,129 @@
+import asyncio
+
+from bot.features.auto_pr_review.feed_scheduler import FeedScheduler
+
+
+async def settle(scheduler):
+    while scheduler.in_flight:
+        await asyncio.gather(*scheduler.in_flight.values(), return_exceptions=True)
+
+
+def test_run_due_starts_polls_without_waiting_for_them():
+    async def run():
+        release = asyncio.Event()
+        polled = []
+
+        async def poll(key):
+            polled.append(key)
+            await release.wait()
+            return False
+
+        scheduler = FeedScheduler(poll)
+        assert scheduler.run_due(["a", "b"]) == 2
+        await asyncio.sleep(0)
+        assert sorted(polled) == ["a", "b"]
+        assert scheduler.stats()["in_flight"] == 2
+        release.set()
+        await settle(scheduler)
+        return scheduler
+
+    scheduler = asyncio.run(run())
+    assert scheduler.stats()["in_flight"] == 0
+
+
+def test_a_busy_feed_is_skipped_while_others_keep_polling():
+    async def run():
+        slow = asyncio.Event()
+        counts = {"slow": 0, "fast": 0}
+
+        async def poll(key):
+            counts[key] += 1
+            if key == "slow":
+                await slow.wait()
+            return True
+
+        scheduler = FeedScheduler(poll, min_interval=0)
+        for _ in range(3):
+            scheduler.run_due(["slow", "fast"])
+            await asyncio.sleep(0.01)
+        slow.set()
+        await settle(scheduler)
+        return counts
+
+    assert asyncio.run(run()) == {"slow": 1, "fast": 3}
+
+
+def test_intervals_back_off_when_quiet_and_reset_on_change():
+    async def run():
+        changed = {"value": False}
+
+        async def poll(key):
+            return changed["value"]
+
+        scheduler = FeedScheduler(poll, min_interval=10, max_interval=30, backoff=2)
+        intervals = []
+        for value in (False, False, False, True):
+            changed["value"] = value
+            scheduler.state("a").next_due = 0
+            scheduler.run_due(["a"])
+            await settle(scheduler)
+            intervals.append(scheduler.state("a").interval)
+        return intervals, scheduler.run_due(["a"])
+
+    intervals, started = asyncio.run(run())
+    assert intervals == [20, 30, 30, 10]
+    assert started == 0  # not due again yet
+
+
+def test_failures_are_recorded_and_back_off():
+    async def run():
+        async def poll(key):
+            raise ConnectionError("timeout")
+
+        scheduler = FeedScheduler(poll, min_interval=10, backoff=2)
+        scheduler.run_due(["a"])
+        await settle(scheduler)
+        return scheduler
+
+    scheduler = asyncio.run(run())
+    state = scheduler.state("a")
+    assert (state.failures, state.last_error, state.interval) == (1, "timeout", 20)
+    assert scheduler.stats()["failing"] == 1
+
+
+def test_concurrency_is_capped():
+    async def run():
+        active = peak = 0
+
+        async def poll(key):
+            nonlocal active, peak
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.01)
+            active -= 1
+            return False
+
+        scheduler = FeedScheduler(poll, concurrency=3)
+        scheduler.run_due([f"feed{i}" for i in range(10)])
+        await settle(scheduler)
+        return peak
+
+    assert asyncio.run(run()) == 3
+
+
+def test_untracked_feeds_are_forgotten_and_close_cancels_polls():
+    async def run():
+        async def poll(key):
+            await asyncio.sleep(3600)
+
+        scheduler = FeedScheduler(poll)
+        scheduler.run_due(["a", "b"])
+        await asyncio.sleep(0)
+        tasks = list(scheduler.in_flight.values())
+        scheduler.run_due(["b"])
+        assert set(scheduler.states) == {"b"}
+        await scheduler.close()
+        return tasks
+
+    tasks = asyncio.run(run())
+    assert all(task.cancelled() for task in tasks)
@@ -0,0 +1,95 @@
+import asyncio
+
+from aiohttp import web
+
+from bot.config import _parse_host_limits
+from bot.core.http import HttpClient
+
+
+async def serve(handler):
+    app = web.Application()
+    app.router.add_get("/{tail:.*}", handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://127.0.0.1:{port}"
+
+
+def test_parse_host_limits_skips_malformed_entries():
+    assert _parse_host_limits("API.github.com=4, example.com=x,=3,outline.local=2") == {
+        "api.github.com": 4,
+        "outline.local": 2,
+    }
+    assert _parse_host_limits("") == {}
+
+
+def test_requests_share_one_session_and_reuse_connections():
+    async def run():
+        peers = set()
+
+        async def handler(request):
+            peers.add(request.transport.get_extra_info("peername"))
+            return web.Response(text="ok")
+
+        runner, base = await serve(handler)
+        client = HttpClient()
+        try:
+            session = client.session
+            for _ in range(5):
+                async with client.get(f"{base}/x") as resp:
+                    assert await resp.text() == "ok"
+            assert client.session is session
+        finally:
+            await client.close()
+            await runner.cleanup()
+        return peers
+
+    # sequential requests ride on one kept-alive connection
+    assert len(asyncio.run(run())) == 1
+
+
+def test_host_limit_caps_concurrent_requests():
+    async def run():
+        active = peak = 0
+
+        async def handler(request):
+            nonlocal active, peak
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.02)
+            active -= 1
+            return web.Response(text="ok")
+
+        runner, base = await serve(handler)
+        client = HttpClient(host_limits={"127.0.0.1": 2})
+
+        async def fetch():
+            async with client.get(f"{base}/x") as resp:
+                return resp.status
+
+        try:
+            statuses = await asyncio.gather(*(fetch() for _ in range(8)))
+        finally:
+            await client.close()
+            await runner.cleanup()
+        return statuses, peak
+
+    statuses, peak = asyncio.run(run())
+    assert statuses == [200] * 8
+    assert peak == 2
+
+
+def test_close_is_idempotent_and_a_new_session_is_created_after():
+    async def run():
+        client = HttpClient()
+        first = client.session
+        await client.close()
+        await client.close()
+        assert first.closed
+        second = client.session
+        assert second is not first
+        await client.close()
+
+    asyncio.run(run())
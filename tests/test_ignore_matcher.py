@@ -0,0 +1,57 @@
+import re
+
+from bot.features.auto_pr_review.cog import IGNORE_PATTERNS, is_ignored_path
+from bot.features.auto_pr_review.ignore_matcher import IgnoreMatcher, _trie_regex
+
+PATHS = [
+    "README.md",
+    "docs/guide.md",
+    "src/app.py",
+    "src/mocks/client.py",
+    "assets/logo.png",
+    "build/app.exe",
+    "requirements.txt",
+    "src/markdown.py",
+    ".github/workflows/ci.yml",
+    "data/test_data/cases.json",
+    "package-lock.json",
+    "LICENSE",
+]
+
+
+def test_trie_regex_factors_common_prefixes():
+    assert _trie_regex([".png", ".pdf", ".gif"]) == r"\.(?:gif|p(?:df|ng))"
+    # a word that is a prefix of another makes the rest optional
+    regex = re.compile(_trie_regex(["ab", "abc"]))
+    assert regex.fullmatch("ab") and regex.fullmatch("abc")
+    assert not regex.fullmatch("a")
+
+
+def test_literal_patterns_match_like_the_substring_check():
+    matcher = IgnoreMatcher(IGNORE_PATTERNS)
+    expected = [path for path in PATHS if any(pattern in path for pattern in IGNORE_PATTERNS)]
+    assert matcher.filter(PATHS) == expected
+    assert [path for path in PATHS if is_ignored_path(path)] == expected
+    assert not matcher.matches("src/app.py")
+
+
+def test_glob_patterns():
+    matcher = IgnoreMatcher(["*.lock", "docs/**", "**/fixtures/*.json", "img?.[jp]ng", "vendor/*"])
+    assert matcher.matches("poetry.lock")
+    assert matcher.matches("sub/Cargo.lock")
+    assert not matcher.matches("poetry.lock.bak")
+    assert matcher.matches("docs/a/b/c.py")
+    assert matcher.matches("fixtures/x.json")
+    assert matcher.matches("tests/unit/fixtures/x.json")
+    assert not matcher.matches("tests/fixtures/deep/x.json")
+    assert matcher.matches("img1.png") and matcher.matches("img2.jng")
+    assert not matcher.matches("img10.png")
+    assert matcher.matches("vendor/lib.py")
+    assert not matcher.matches("src/app.py")
+
+
+def test_mixed_and_empty_pattern_sets():
+    matcher = IgnoreMatcher([".md", "*.lock", ".md"])
+    assert matcher.patterns == ["*.lock", ".md"]
+    assert matcher.filter(["a.md", "b.py", "c.lock"]) == ["a.md", "c.lock"]
+    assert not IgnoreMatcher([]).matches("anything")
@@ -0,0 +1,119 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from bot.features.meeting_notes.live_transcription import (
+    FakeStreamingBackend,
+    LiveTranscriber,
+    StreamingASRBackend,
+    create_streaming_backend,
+)
+
+INPUT_RATE = 48000
+
+
+def tone(seconds: float, rate: int = INPUT_RATE, amplitude: int = 8000) -> np.ndarray:
+    t = np.arange(int(seconds * rate)) / rate
+    return (amplitude * np.sin(2 * np.pi * 440 * t)).astype(np.int16)
+
+
+def silence(seconds: float, rate: int = INPUT_RATE) -> np.ndarray:
+    return np.zeros(int(seconds * rate), dtype=np.int16)
+
+
+def test_fake_backend_splits_utterances_on_gaps():
+    async def run():
+        segments = []
+        backend = FakeStreamingBackend(script=["hello", "world"])
+        await backend.start(segments.append)
+        await backend.send(np.concatenate([tone(1.0, 16000), silence(1.0, 16000), tone(0.5, 16000)]))
+        await backend.finish()
+        return segments
+
+    segments = asyncio.run(run())
+    assert [segment.text for segment in segments] == ["hello", "world"]
+    assert segments[0].start == 0.0
+    assert abs(segments[0].end - 1.0) < 0.05
+    assert abs(segments[1].start - 2.0) < 0.05
+
+
+def test_fake_backend_describes_speech_once_the_script_runs_out():
+    async def run():
+        segments = []
+        backend = FakeStreamingBackend()
+        await backend.start(segments.append)
+        await backend.send(tone(0.3, 16000))
+        await backend.finish()
+        return segments
+
+    (segment,) = asyncio.run(run())
+    assert segment.text.startswith("[speech 0.0s-")
+
+
+def test_transcriber_feeds_backend_from_another_thread():
+    async def run():
+        transcriber = LiveTranscriber(FakeStreamingBackend(script=["first", "second"]), asyncio.get_running_loop(), INPUT_RATE)
+        await transcriber.start()
+        blocks = [tone(1.0), silence(1.0), tone(1.0)]
+        # the disk writer calls feed from its own thread
+        await asyncio.to_thread(lambda: [transcriber.feed(block) for block in blocks])
+        await transcriber.finish()
+        return transcriber
+
+    transcriber = asyncio.run(run())
+    assert transcriber.error is None
+    assert transcriber.transcript() == "first second"
+    assert transcriber.sent == 3 * 16000
+    assert transcriber.stats()["dropped_seconds"] == 0
+
+
+def test_transcriber_drops_audio_when_the_queue_is_full():
+    async def run():
+        transcriber = LiveTranscriber(FakeStreamingBackend(), asyncio.get_running_loop(), INPUT_RATE, max_queued=2)
+        await transcriber.start()
+        # nothing is forwarded until the loop runs again, so only two blocks fit
+        for _ in range(5):
+            transcriber._enqueue(silence(1.0, 16000))
+        await transcriber.finish()
+        return transcriber
+
+    transcriber = asyncio.run(run())
+    assert transcriber.dropped == 3 * 16000
+    assert transcriber.sent == 2 * 16000
+
+
+def test_transcriber_records_backend_failure_and_still_finishes():
+    class FailingBackend(FakeStreamingBackend):
+        async def send(self, pcm):
+            raise ConnectionError("socket closed")
+
+    async def run():
+        transcriber = LiveTranscriber(FailingBackend(), asyncio.get_running_loop(), INPUT_RATE)
+        await transcriber.start()
+        transcriber.feed(tone(1.0))
+        transcriber.feed(tone(1.0))
+        await transcriber.finish(timeout=5)
+        return transcriber
+
+    transcriber = asyncio.run(run())
+    assert isinstance(transcriber.error, ConnectionError)
+    assert transcriber.sent == 0
+
+
+def test_create_streaming_backend():
+    assert create_streaming_backend(None) is None
+    assert create_streaming_backend("off") is None
+    assert create_streaming_backend("nope") is None
+    assert isinstance(create_streaming_backend(" Fake "), FakeStreamingBackend)
+
+
+def test_backends_must_implement_the_streaming_methods():
+    class Incomplete(StreamingASRBackend):
+        async def start(self, on_segment):
+            pass
+
+    with pytest.raises(TypeError):
+        StreamingASRBackend()
+    with pytest.raises(TypeError):
+        Incomplete()
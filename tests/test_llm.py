@@ -0,0 +1,138 @@
+import asyncio
+import json
+
+import pytest
+from aiohttp import web
+
+from bot.core import llm
+from bot.core.http import HttpClient
+from bot.core.llm import DISCORD_MESSAGE_LIMIT, LLMError, chat_completion, stream_to_message
+
+
+class Message:
+    def __init__(self, channel, content):
+        self.channel = channel
+        self.content = content
+        self.edits = 0
+
+    async def edit(self, content):
+        assert len(content) <= DISCORD_MESSAGE_LIMIT
+        self.content = content
+        self.edits += 1
+
+
+class Channel:
+    def __init__(self):
+        self.messages = []
+
+    async def send(self, content):
+        assert len(content) <= DISCORD_MESSAGE_LIMIT
+        message = Message(self, content)
+        self.messages.append(message)
+        return message
+
+
+async def chunks(*parts, fail=False):
+    for part in parts:
+        yield part
+    if fail:
+        raise LLMError("stream broke off")
+
+
+def stream(parts, **kwargs):
+    channel = Channel()
+    text = asyncio.run(stream_to_message(channel, chunks(*parts), **kwargs))
+    return channel, text
+
+
+def test_first_chunk_is_shown_and_later_edits_are_throttled():
+    channel, text = stream(["Hel", "lo", " wor", "ld"], interval=3600)
+    (message,) = channel.messages
+    assert text == "Hello world"
+    assert message.content == "Hello world"
+    assert message.edits == 2  # first chunk, then the final text
+
+
+def test_render_wraps_the_text():
+    channel, _ = stream(["answer"], render=lambda text: f"{text}\n\n**Sources:**\n- Docs/BMS")
+    assert channel.messages[0].content == "answer\n\n**Sources:**\n- Docs/BMS"
+
+
+def test_long_output_continues_in_new_messages_on_line_breaks():
+    lines = [f"line {i:04d} " + "x" * 80 + "\n" for i in range(60)]
+    channel, text = stream(lines, interval=0)
+    assert len(channel.messages) == 3
+    assert all(message.content.startswith("line ") for message in channel.messages)
+    assert all(message.content.endswith("\n") for message in channel.messages)
+    assert "".join(message.content for message in channel.messages) == text
+
+
+def test_growing_render_never_exceeds_the_limit():
+    # like the PR review render, this lengthens the text itself rather than adding a fixed overhead
+    def render(text):
+        return "## Review\n" + text.replace("\n**", "\n\n**")
+
+    parts = ["\n**Point** detail" * 10] * 40
+    channel, text = stream(parts, render=render, interval=0)
+    assert len(channel.messages) > 1
+    assert all(len(message.content) <= DISCORD_MESSAGE_LIMIT for message in channel.messages)
+
+
+def test_oversized_render_overhead_still_terminates():
+    channel, _ = stream(["abc"], render=lambda text: "#" * (DISCORD_MESSAGE_LIMIT + 10) + text, interval=0)
+    assert len(channel.messages) <= 4
+
+
+def test_failures_keep_the_partial_text_and_empty_streams_say_so():
+    channel = Channel()
+    with pytest.raises(LLMError):
+        asyncio.run(stream_to_message(channel, chunks("partial", fail=True)))
+    assert channel.messages[0].content == "partial"
+    channel, text = stream([])
+    assert text == ""
+    assert channel.messages[0].content.startswith("⚠️")
+
+
+def test_chat_completion_parses_server_sent_events(monkeypatch):
+    events = [
+        ": keep-alive",
+        "data: " + json.dumps({"choices": [{"delta": {"role": "assistant"}}]}),
+        "data: " + json.dumps({"choices": [{"delta": {"content": "Hello"}}]}),
+        "data: not json",
+        "data: " + json.dumps({"choices": [{"delta": {"content": " there"}}]}),
+        "data: [DONE]",
+        "data: " + json.dumps({"choices": [{"delta": {"content": " ignored"}}]}),
+    ]
+
+    async def handler(request):
+        body = await request.json()
+        assert body["stream"] is True and request.headers["Authorization"] == "Bearer key"
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+        for event in events:
+            await response.write(f"{event}\n\n".encode())
+        return response
+
+    async def run():
+        app = web.Application()
+        app.router.add_post("/chat", handler)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        client = HttpClient()
+        monkeypatch.setattr(llm, "get_http_client", lambda: client)
+        try:
+            return await chat_completion([{"role": "user", "content": "hi"}], api_key="key", url=f"http://127.0.0.1:{port}/chat")
+        finally:
+            await client.close()
+            await runner.cleanup()
+
+    assert asyncio.run(run()) == "Hello there"
+
+
+def test_missing_api_key_is_an_error(monkeypatch):
+    monkeypatch.delenv("DEEPSEEK_API_KEY", raising=False)
+    with pytest.raises(LLMError):
+        asyncio.run(chat_completion([]))
@@ -0,0 +1,163 @@
+import asyncio
+import json
+
+from bot.features.smart_qa.outline_mirror import PAGE_LIMIT, OutlineMirror
+
+
+class FakeOutline:
+    """Answers the mirror's POSTs from in-memory collections and documents, and logs every call."""
+
+    def __init__(self, collections=1, docs=None):
+        self.collections = [{"id": f"c{i}", "name": f"Collection {i}"} for i in range(collections)]
+        self.docs = {doc["id"]: doc for doc in (docs or [])}
+        self.calls = []
+
+    async def post(self, endpoint, data=None):
+        data = data or {}
+        self.calls.append((endpoint, data))
+        offset, limit = data.get("offset", 0), data.get("limit", PAGE_LIMIT)
+        if endpoint == "collections.list":
+            return {"data": self.collections[offset:offset + limit]}
+        if endpoint == "documents.list":
+            docs = sorted(self.docs.values(), key=lambda doc: doc["updatedAt"], reverse=True)
+            return {"data": [{k: v for k, v in doc.items() if k != "text"} for doc in docs][offset:offset + limit]}
+        if endpoint == "documents.info":
+            return {"data": self.docs[data["id"]]}
+        return {}
+
+    def count(self, endpoint):
+        return sum(1 for called, _ in self.calls if called == endpoint)
+
+
+def doc(doc_id, updated, text="body"):
+    return {"id": doc_id, "title": doc_id, "updatedAt": updated, "text": text, "parentDocumentId": None}
+
+
+def mirror_for(outline, **kwargs):
+    mirror = OutlineMirror("https://outline.local/api", "token", **kwargs)
+    mirror._post = outline.post
+    return mirror
+
+
+def test_collections_are_paged_and_cached_until_the_ttl_expires():
+    outline = FakeOutline(collections=PAGE_LIMIT + 5)
+    mirror = mirror_for(outline, collections_ttl=300)
+
+    async def run():
+        first = await mirror.collections()
+        await mirror.collections()
+        mirror._collections_fetched_at -= 301
+        await mirror.collections()
+        return first
+
+    assert len(asyncio.run(run())) == PAGE_LIMIT + 5
+    assert outline.count("collections.list") == 4  # two pages, twice
+
+
+def test_tree_refresh_fetches_only_documents_newer_than_the_mirror():
+    outline = FakeOutline(docs=[doc(f"d{i}", f"2024-01-{i + 1:02d}") for i in range(5)])
+    mirror = mirror_for(outline, tree_ttl=120)
+    changed = []
+    mirror.add_change_listener(changed.append)
+
+    async def run():
+        await mirror.documents("c0")
+        outline.docs["d1"] = doc("d1", "2024-02-01", "new body")
+        outline.docs["d9"] = doc("d9", "2024-02-02")
+        mirror._trees["c0"]["fetched_at"] -= 121
+        calls_before = len(outline.calls)
+        docs = await mirror.documents("c0")
+        return docs, outline.calls[calls_before:]
+
+    docs, calls = asyncio.run(run())
+    assert {d["id"] for d in docs} == {f"d{i}" for i in range(5)} | {"d9"}
+    assert [endpoint for endpoint, _ in calls] == ["documents.list"]
+    assert changed == ["d1"]
+
+
+def test_full_sync_drops_deleted_documents():
+    outline = FakeOutline(docs=[doc("a", "2024-01-01"), doc("b", "2024-01-02")])
+    mirror = mirror_for(outline, full_sync_ttl=3600)
+    changed = []
+    mirror.add_change_listener(changed.append)
+
+    async def run():
+        await mirror.documents("c0")
+        del outline.docs["a"]
+        mirror._trees["c0"]["full_sync_at"] -= 3601
+        return await mirror.documents("c0")
+
+    assert [d["id"] for d in asyncio.run(run())] == ["b"]
+    assert changed == ["a"]
+
+
+def test_bodies_are_served_from_memory_until_updated_at_changes():
+    outline = FakeOutline(docs=[doc("a", "2024-01-01", "v1")])
+    mirror = mirror_for(outline)
+    listed = {"id": "a", "updatedAt": "2024-01-01"}
+
+    async def run():
+        texts = [await mirror.document_text(listed), await mirror.document_text(listed)]
+        outline.docs["a"] = doc("a", "2024-01-02", "v2")
+        texts.append(await mirror.document_text({"id": "a", "updatedAt": "2024-01-02"}))
+        return texts
+
+    assert asyncio.run(run()) == ["v1", "v1", "v2"]
+    assert outline.count("documents.info") == 2
+
+
+def test_concurrent_cold_lookups_share_one_request():
+    outline = FakeOutline(docs=[doc("a", "2024-01-01")])
+    mirror = mirror_for(outline)
+
+    async def run():
+        return await asyncio.gather(*(mirror.document_text({"id": "a", "updatedAt": "2024-01-01"}) for _ in range(5)))
+
+    assert asyncio.run(run()) == ["body"] * 5
+    assert outline.count("documents.info") == 1
+
+
+def test_cache_file_is_written_once_per_burst_and_reloaded(tmp_path):
+    path = tmp_path / "mirror.json"
+    outline = FakeOutline(docs=[doc(f"d{i}", "2024-01-01", f"text {i}") for i in range(20)])
+    mirror = mirror_for(outline, cache_path=str(path), save_delay=0.05)
+    writes = []
+    write = mirror._write_cache_file
+    mirror._write_cache_file = lambda state: (writes.append(1), write(state))
+
+    async def run():
+        for i in range(20):
+            await mirror.document_text({"id": f"d{i}", "updatedAt": "2024-01-01"})
+        await asyncio.sleep(0.1)
+        reloaded = mirror_for(FakeOutline(), cache_path=str(path))
+        return await reloaded.document_text({"id": "d3", "updatedAt": "2024-01-01"})
+
+    assert asyncio.run(run()) == "text 3"
+    assert len(writes) == 1
+    assert len(json.loads(path.read_text())["bodies"]) == 20
+
+
+def test_close_writes_a_pending_save(tmp_path):
+    path = tmp_path / "mirror.json"
+    mirror = mirror_for(FakeOutline(docs=[doc("a", "2024-01-01")]), cache_path=str(path), save_delay=60)
+
+    async def run():
+        await mirror.document_text({"id": "a", "updatedAt": "2024-01-01"})
+        assert not path.exists()
+        await mirror.close()
+
+    asyncio.run(run())
+    assert "a" in json.loads(path.read_text())["bodies"]
+
+
+def test_stats_count_sent_and_coalesced_requests():
+    outline = FakeOutline(docs=[doc("a", "2024-01-01")])
+    mirror = mirror_for(outline)
+
+    async def run():
+        await mirror.collections()
+        before = mirror.stats
+        await asyncio.gather(*(mirror.document_text({"id": "a", "updatedAt": "2024-01-01"}) for _ in range(3)))
+        return {name: mirror.stats[name] - before[name] for name in before}
+
+    assert asyncio.run(run()) == {"requests": 1, "coalesced": 2}
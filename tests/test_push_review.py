@@ -0,0 +1,111 @@
+import asyncio
+
+from bot.features.auto_pr_review import cog as review_cog
+from bot.features.auto_pr_review.cog import AutoPRReviewCog
+from bot.features.auto_pr_review.review_cache import ReviewCache
+
+
+class Channel:
+    def __init__(self):
+        self.sent = []
+
+    async def send(self, content=None, **kwargs):
+        self.sent.append(content)
+
+
+class Bot:
+    def __init__(self, channel):
+        self.channel = channel
+
+    def get_channel(self, channel_id):
+        return self.channel
+
+
+def entry(n):
+    return {
+        "id": f"tag:github.com,2008:Grit::Commit/sha{n}",
+        "title": f"commit {n}",
+        "author": "dev",
+        "link": f"https://github.com/o/r/commit/sha{n}",
+    }
+
+
+def make_cog(tmp_path, concurrency=4):
+    channel = Channel()
+    cog = AutoPRReviewCog(Bot(channel))
+    cog.review_cache = ReviewCache(str(tmp_path / "reviews"))
+    cog.review_semaphore = asyncio.Semaphore(concurrency)
+    return cog, channel
+
+
+def test_push_reviews_run_concurrently_but_post_in_commit_order(tmp_path):
+    async def run():
+        cog, channel = make_cog(tmp_path)
+        running = peak = 0
+
+        async def review_commit(key, e):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            # older commits take longer, so finishing order is the reverse of commit order
+            await asyncio.sleep(0.01 * int(e["id"][-1]))
+            running -= 1
+            return f"review of {e['title']}"
+
+        cog.review_commit = review_commit
+        # entries arrive newest first, as in the Atom feed
+        await cog.notify_commits("o/r", {"channel_id": 1}, [entry(n) for n in (1, 2, 3)])
+        return channel.sent, peak
+
+    sent, peak = asyncio.run(run())
+    assert peak == 3
+    reviews = [message for message in sent if message.startswith("review of")]
+    assert reviews == ["review of commit 3", "review of commit 2", "review of commit 1"]
+    assert sent.index("review of commit 3") < sent.index("review of commit 2")
+
+
+def test_only_the_newest_commits_of_a_large_push_are_reviewed(tmp_path, monkeypatch):
+    monkeypatch.setattr(review_cog, "REVIEW_BATCH_LIMIT", 2)
+
+    async def run():
+        cog, channel = make_cog(tmp_path)
+        reviewed = []
+
+        async def review_commit(key, e):
+            reviewed.append(e["title"])
+            return "ok"
+
+        cog.review_commit = review_commit
+        await cog.notify_commits("o/r", {"channel_id": 1}, [entry(n) for n in (5, 4, 3, 2, 1)])
+        return channel.sent, reviewed
+
+    sent, reviewed = asyncio.run(run())
+    assert sorted(reviewed) == ["commit 4", "commit 5"]
+    assert sent[0].startswith("🔔 3 earlier commit(s) in `o/r`")
+
+
+def test_review_commit_is_bounded_by_the_shared_semaphore_and_cached(tmp_path):
+    async def run():
+        cog, _ = make_cog(tmp_path, concurrency=2)
+        running = peak = 0
+        calls = []
+
+        async def analyze_diff(url):
+            nonlocal running, peak
+            calls.append(url)
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+            return "looks fine"
+
+        cog.analyze_diff = analyze_diff
+        first = await asyncio.gather(*(cog.review_commit("o/r", entry(n)) for n in range(5)))
+        again = await cog.review_commit("o/r", entry(0))
+        return first, again, peak, calls
+
+    first, again, peak, calls = asyncio.run(run())
+    assert first == ["looks fine"] * 5
+    assert again == "looks fine"
+    assert peak == 2
+    assert sorted(calls) == [f"https://api.github.com/repos/o/r/commits/sha{n}" for n in range(5)]
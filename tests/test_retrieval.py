@@ -0,0 +1,106 @@
+import asyncio
+
+from bot.features.smart_qa.doc_index import DocumentTreeIndex
+from bot.features.smart_qa.retrieval import BM25Index, KnowledgeRetriever, Passage, reciprocal_rank_fusion, tokenize
+
+
+def build(texts):
+    index = BM25Index()
+    for i, text in enumerate(texts):
+        index.add(i, text)
+    return index
+
+
+def test_tokenize_drops_stopwords_and_folds_plurals():
+    assert tokenize("How do I reset the Batteries?") == ["reset", "batterie"]
+    assert tokenize("Class glass bus") == ["class", "glass", "bus"]
+
+
+def test_search_ranks_matching_passages_first():
+    index = build([
+        "Motor controller wiring and firmware flashing",
+        "Battery pack charging procedure and battery safety",
+        "Team meeting schedule",
+    ])
+    results = index.search("how do I charge the battery", k=3)
+    assert [item for _, item in results] == [1]
+    assert results[0][0] > 0
+
+
+def test_rare_terms_outweigh_common_ones():
+    index = build(["battery motor", "battery", "battery", "battery controller"])
+    results = index.search("battery motor", k=4)
+    assert results[0][1] == 0
+    assert index.idf("motor") > index.idf("battery")
+
+
+def test_shorter_passages_win_on_equal_term_frequency():
+    index = build(["firmware update", "firmware update steps with many other unrelated words around it"])
+    assert [item for _, item in index.search("firmware", k=2)] == [0, 1]
+
+
+def test_empty_index_and_unknown_terms():
+    assert BM25Index().search("anything") == []
+    index = build(["battery"])
+    assert index.search("unrelated") == []
+    assert len(index) == 1
+
+
+def passage(doc_id, position=0, collection="Electrical"):
+    return Passage(doc_id, collection.lower(), collection, doc_id, f"{collection}/{doc_id}", "", "", position, 1)
+
+
+def test_reciprocal_rank_fusion_rewards_agreement():
+    a, b, c = passage("a"), passage("b"), passage("c")
+    fused = reciprocal_rank_fusion([[(9.0, a), (5.0, b)], [(0.9, b), (0.8, c)]])
+    assert [p.doc_id for _, p in fused] == ["b", "a", "c"]
+
+
+def test_rank_groups_passages_by_document():
+    scored = [(5.0, passage("a", 0)), (4.0, passage("b", 0)), (3.0, passage("a", 1)), (2.0, passage("a", 2))]
+    hits = KnowledgeRetriever.rank(scored, k=2, passages_per_doc=2)
+    assert [hit.doc_id for hit in hits] == ["a", "b"]
+    assert [p.position for _, p in hits[0].passages] == [0, 1]
+
+
+class FakeMirror:
+    def __init__(self, collections):
+        self.data = collections  # collection name -> {doc_id: text}
+        self.version = "1"
+        self.bodies_read = 0
+
+    async def collections(self):
+        return [{"id": name.lower(), "name": name} for name in self.data]
+
+    async def index(self, collection_id):
+        name = next(name for name in self.data if name.lower() == collection_id)
+        return DocumentTreeIndex(
+            {"id": doc_id, "title": doc_id, "updatedAt": self.version, "parentDocumentId": None}
+            for doc_id in self.data[name]
+        )
+
+    async def document_text(self, doc):
+        self.bodies_read += 1
+        return next(docs[doc["id"]] for docs in self.data.values() if doc["id"] in docs)
+
+
+def test_retriever_routes_questions_and_rebuilds_only_on_change():
+    mirror = FakeMirror({
+        "Electrical": {"bms": "# BMS\nFlash the battery management firmware with the programmer."},
+        "Mechanical": {"frame": "# Frame\nWeld the aluminium frame tubes and check alignment."},
+    })
+    retriever = KnowledgeRetriever(mirror)
+
+    async def run():
+        first = await retriever.rank_collections("how do I flash the battery firmware")
+        reads = mirror.bodies_read
+        await retriever.search("frame welding")
+        unchanged_reads = mirror.bodies_read - reads
+        mirror.version = "2"
+        await retriever.search("frame welding")
+        return first, unchanged_reads, mirror.bodies_read - reads
+
+    ranked, unchanged_reads, changed_reads = asyncio.run(run())
+    assert ranked[0] == "Electrical"
+    assert unchanged_reads == 0
+    assert changed_reads == 2
@@ -0,0 +1,74 @@
+import asyncio
+import os
+
+from bot.features.auto_pr_review.review_cache import ReviewCache
+
+
+def key(n, version=2):
+    return ReviewCache.make_key("o/r", f"sha{n}", "commit", version)
+
+
+def test_reviews_survive_a_restart(tmp_path):
+    async def run():
+        cache = ReviewCache(str(tmp_path))
+        assert await cache.get(key(1)) is None
+        await cache.put(key(1), "looks good")
+        assert await cache.get(key(1)) == "looks good"
+        # a new prompt version does not reuse the old review
+        assert await cache.get(key(1, version=3)) is None
+
+        restarted = ReviewCache(str(tmp_path))
+        return cache.stats(), await restarted.get(key(1)), restarted.stats()
+
+    stats, review, restarted = asyncio.run(run())
+    assert stats["hits"] == 1 and stats["misses"] == 2 and stats["entries"] == 1
+    assert review == "looks good"
+    assert restarted["entries"] == 1 and restarted["bytes"] == stats["bytes"]
+
+
+def test_least_recently_used_reviews_are_evicted(tmp_path):
+    async def run():
+        cache = ReviewCache(str(tmp_path))
+        await cache.put(key(0), "x" * 100)
+        entry_size = cache.stats()["bytes"]
+        # room for three entries; sizes differ by a few bytes because of the stored timestamp
+        cache.max_bytes = entry_size * 3 + entry_size // 2
+        for n in (1, 2):
+            await asyncio.sleep(0.01)
+            await cache.put(key(n), "x" * 100)
+        await asyncio.sleep(0.01)
+        assert await cache.get(key(0)) is not None  # now the most recently used
+        await asyncio.sleep(0.01)
+        await cache.put(key(3), "x" * 100)
+        return cache, [await cache.get(key(n)) is not None for n in range(4)]
+
+    cache, present = asyncio.run(run())
+    assert present == [True, False, True, True]
+    stats = cache.stats()
+    assert stats["evictions"] == 1
+    assert stats["entries"] == 3
+    assert stats["bytes"] <= cache.max_bytes
+    assert len(os.listdir(tmp_path)) == 3
+
+
+def test_overwriting_a_review_keeps_the_size_accurate(tmp_path):
+    async def run():
+        cache = ReviewCache(str(tmp_path))
+        await cache.put(key(1), "short")
+        await cache.put(key(1), "a much longer review than before")
+        return cache, await cache.get(key(1))
+
+    cache, review = asyncio.run(run())
+    assert review == "a much longer review than before"
+    assert cache.stats()["bytes"] == sum(os.path.getsize(tmp_path / name) for name in os.listdir(tmp_path))
+
+
+def test_unreadable_entries_are_misses(tmp_path):
+    async def run():
+        cache = ReviewCache(str(tmp_path))
+        await cache.put(key(1), "review")
+        (name,) = os.listdir(tmp_path)
+        (tmp_path / name).write_text("{not json")
+        return await cache.get(key(1))
+
+    assert asyncio.run(run()) is None
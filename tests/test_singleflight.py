@@ -0,0 +1,91 @@
+import asyncio
+
+import pytest
+
+from bot.core.singleflight import SingleFlight
+
+
+def test_concurrent_calls_with_one_key_share_a_single_run():
+    async def run():
+        flight = SingleFlight()
+        runs = 0
+
+        async def fetch():
+            nonlocal runs
+            runs += 1
+            await asyncio.sleep(0.01)
+            return "value"
+
+        results = await asyncio.gather(*(flight.do("key", fetch) for _ in range(5)), flight.do("other", fetch))
+        return results, runs, flight
+
+    results, runs, flight = asyncio.run(run())
+    assert results == ["value"] * 6
+    assert runs == 2
+    assert (flight.calls, flight.shared, len(flight)) == (2, 4, 0)
+
+
+def test_finished_keys_run_again():
+    async def run():
+        flight = SingleFlight()
+        counter = iter(range(10))
+
+        async def fetch():
+            return next(counter)
+
+        return [await flight.do("key", fetch), await flight.do("key", fetch)]
+
+    assert asyncio.run(run()) == [0, 1]
+
+
+def test_errors_reach_every_waiter():
+    async def run():
+        flight = SingleFlight()
+
+        async def fail():
+            await asyncio.sleep(0.01)
+            raise ValueError("upstream down")
+
+        return await asyncio.gather(*(flight.do("key", fail) for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(run())
+    assert all(isinstance(result, ValueError) for result in results)
+
+
+def test_cancelled_caller_does_not_cancel_the_shared_call():
+    async def run():
+        flight = SingleFlight()
+        release = asyncio.Event()
+
+        async def fetch():
+            await release.wait()
+            return "value"
+
+        impatient = asyncio.create_task(flight.do("key", fetch))
+        patient = asyncio.create_task(flight.do("key", fetch))
+        await asyncio.sleep(0)
+        impatient.cancel()
+        await asyncio.sleep(0)
+        release.set()
+        with pytest.raises(asyncio.CancelledError):
+            await impatient
+        return await patient
+
+    assert asyncio.run(run()) == "value"
+
+
+def test_call_finishes_even_if_every_caller_gives_up():
+    async def run():
+        flight = SingleFlight()
+        finished = asyncio.Event()
+
+        async def fetch():
+            await asyncio.sleep(0.01)
+            finished.set()
+
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(flight.do("key", fetch), 0.001)
+        await asyncio.wait_for(finished.wait(), 1)
+        return len(flight)
+
+    assert asyncio.run(run()) == 0
@@ -0,0 +1,69 @@
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("opuslib")
+pytest.importorskip("discord.ext.voice_recv")
+meeting_cog = pytest.importorskip("bot.features.meeting_notes.cog")
+
+FRAME = meeting_cog.FRAME_SAMPLES
+
+
+class FakeOpus:
+    """Records how each frame was decoded instead of decoding real Opus."""
+
+    def __init__(self):
+        self.calls = []
+
+    def decode(self, data, frame_size, decode_fec=False):
+        kind = "fec" if decode_fec else ("plc" if not data else "audio")
+        self.calls.append(kind)
+        return kind
+
+
+def packet(sequence, timestamp):
+    return SimpleNamespace(sequence=sequence, timestamp=timestamp, decrypted_data=b"opus")
+
+
+def decoder_at(now):
+    clock = {"now": now}
+    decoder = meeting_cog.SpeakerDecoder(lambda: clock["now"])
+    decoder.decoder = FakeOpus()
+    return decoder, clock
+
+
+def test_rtp_timestamps_follow_the_first_packet_anchor():
+    decoder, clock = decoder_at(48000)
+    assert decoder.position(1_000_000) == 48000
+    clock["now"] = 48000 + FRAME
+    assert decoder.position(1_000_000 + FRAME) == 48000 + FRAME
+    # the 32-bit RTP timestamp wraps around
+    decoder, clock = decoder_at(0)
+    decoder.position(2**32 - FRAME)
+    assert decoder.position(FRAME) == 2 * FRAME
+
+
+def test_a_clock_jump_re_anchors_to_wall_time():
+    decoder, clock = decoder_at(0)
+    decoder.position(500)
+    clock["now"] = 10 * 48000
+    assert decoder.position(500 + 20 * 48000) == 10 * 48000
+
+
+def test_lost_packets_are_concealed_with_fec_and_plc():
+    decoder, _ = decoder_at(0)
+    assert [pcm for _, pcm in decoder.decode(packet(10, 0))] == ["audio"]
+    frames = decoder.decode(packet(13, 3 * FRAME))
+    assert [pcm for _, pcm in frames] == ["plc", "fec", "audio"]
+    assert [position for position, _ in frames] == [FRAME, 2 * FRAME, 3 * FRAME]
+    assert decoder.concealed == 2
+
+
+def test_late_packets_are_dropped_and_long_gaps_left_silent():
+    decoder, _ = decoder_at(0)
+    decoder.decode(packet(100, 0))
+    assert decoder.decode(packet(99, 0)) == []
+    gap = meeting_cog.MAX_CONCEALED_FRAMES + 5
+    frames = decoder.decode(packet(100 + gap + 1, (gap + 1) * FRAME))
+    assert [pcm for _, pcm in frames] == ["audio"]
+    assert decoder.concealed == 0
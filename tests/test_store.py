@@ -0,0 +1,116 @@
+import asyncio
+import json
+
+from bot.features.auto_pr_review.store import TrackerStore
+
+
+def run_with_store(tmp_path, body, **kwargs):
+    async def run():
+        store = TrackerStore(str(tmp_path / "tracker.sqlite3"), **kwargs)
+        await store.open()
+        try:
+            return await body(store)
+        finally:
+            await store.close()
+
+    return asyncio.run(run())
+
+
+def test_writes_are_batched_into_one_delayed_transaction(tmp_path):
+    async def body(store):
+        writes = []
+        original = store._write
+        store._write = lambda batch: (writes.append(len(batch)), original(batch))
+        store.save_feed("a/b", {"atom_url": "https://example.com/a.atom", "channel_id": 1})
+        store.save_feed("c/d", {"atom_url": "https://example.com/c.atom", "channel_id": 2})
+        store.record_pr("a/b", 1, "alice", 10, 2, 1000)
+        assert writes == []
+        await asyncio.sleep(0.1)
+        assert writes == [3]
+        return await store.load_feeds()
+
+    feeds = run_with_store(tmp_path, body, flush_delay=0.05)
+    assert set(feeds) == {"a/b", "c/d"}
+    assert feeds["a/b"]["channel_id"] == 1
+
+
+def test_queries_see_queued_changes(tmp_path):
+    async def body(store):
+        store.record_pr("a/b", 1, "alice", 10, 2, 1000)
+        store.record_pr("a/b", 2, "bob", 1, 1, 2000)
+        return await store.leaderboard()
+
+    assert run_with_store(tmp_path, body, flush_delay=60) == [("alice", 10, 2, 12, 1), ("bob", 1, 1, 2, 1)]
+
+
+def test_json_state_is_migrated_once(tmp_path):
+    json_path = tmp_path / "tracked_repos.json"
+    json_path.write_text(json.dumps({
+        "feeds": {"a/b": {"atom_url": "https://example.com/a.atom", "channel_id": 3, "last_id": "x"}},
+        "contributors": {"alice": {"total_additions": 5, "total_deletions": 1, "total_changes": 6, "pr_count": 1}},
+    }))
+
+    async def body(store):
+        return await store.load_feeds(), await store.leaderboard()
+
+    feeds, board = run_with_store(tmp_path, body, json_path=str(json_path))
+    assert feeds["a/b"]["last_id"] == "x"
+    assert board == [("alice", 5, 1, 6, 1)]
+    json_path.write_text(json.dumps({"feeds": {"e/f": {"atom_url": "u"}}}))
+    feeds, _ = run_with_store(tmp_path, body, json_path=str(json_path))
+    assert set(feeds) == {"a/b"}
+def test_re_recorded_pr_replaces_its_numbers(tmp_path):
+    async def body(store):
+        store.record_pr("a/b", 1, "alice", 10, 2, 1000)
+        store.record_pr("a/b", 1, "alice", 20, 5, 1000)
+        store.record_pr("c/d", 7, "alice", 1, 0, 5000)
+        return (
+            await store.contributor("alice"),
+            await store.leaderboard(since=2000),
+            await store.contributor_count(repo="c/d"),
+        )
+
+    contributor, recent, count = run_with_store(tmp_path, body)
+    totals, repos = contributor
+    assert totals == (21, 5, 26, 2)
+    assert repos == [("a/b", 20, 5, 25, 1), ("c/d", 1, 0, 1, 1)]
+    assert recent == [("alice", 1, 0, 1, 1)]
+    assert count == 1
+
+
+def test_rebuild_aggregates_matches_incremental_counts(tmp_path):
+    async def body(store):
+        for number in range(5):
+            store.record_pr("a/b", number, f"dev{number % 2}", number, 1, 1000 + number)
+        before = await store.leaderboard()
+        store.rebuild_aggregates(["a/b"])
+        return before, await store.leaderboard()
+
+    before, after = run_with_store(tmp_path, body)
+    assert before == after
+
+
+
+
+def test_windowed_queries_only_count_recent_prs(tmp_path):
+    async def body(store):
+        store.record_pr("a/b", 1, "alice", 100, 0, 1000)
+        store.record_pr("a/b", 2, "bob", 5, 5, 3000)
+        store.record_pr("c/d", 3, "alice", 1, 1, 4000)
+        store.record_pr("c/d", 4, "carol", 7, 0, 5000)
+        return (
+            await store.leaderboard(since=2000),
+            await store.leaderboard(since=2000, repo="c/d"),
+            await store.leaderboard(repo="a/b"),
+            await store.contributor_count(since=2000),
+            await store.contributor("alice", since=2000),
+            await store.contributor("alice", since=6000),
+        )
+
+    recent, recent_repo, repo_all_time, count, alice, nobody = run_with_store(tmp_path, body)
+    assert recent == [("bob", 5, 5, 10, 1), ("carol", 7, 0, 7, 1), ("alice", 1, 1, 2, 1)]
+    assert recent_repo == [("carol", 7, 0, 7, 1), ("alice", 1, 1, 2, 1)]
+    assert repo_all_time == [("alice", 100, 0, 100, 1), ("bob", 5, 5, 10, 1)]
+    assert count == 3
+    assert alice == ((1, 1, 2, 1), [("c/d", 1, 1, 2, 1)])
+    assert nobody is None
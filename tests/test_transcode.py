@@ -0,0 +1,57 @@
+import numpy as np
+import soundfile as sf
+
+from bot.features.meeting_notes.transcode import Decimator, SilenceTrimmer, iter_file, transcode
+
+
+def sine(freq: float, seconds: float, rate: int, amplitude: int = 10000) -> np.ndarray:
+    t = np.arange(int(seconds * rate)) / rate
+    return (amplitude * np.sin(2 * np.pi * freq * t)).astype(np.int16)
+
+
+def test_decimator_block_boundaries_are_seamless():
+    signal = sine(440, 1.0, 48000)
+    whole = Decimator(3).process(signal)
+    decimator = Decimator(3)
+    pieces = np.concatenate([decimator.process(block) for block in np.array_split(signal, [1000, 1001, 25000, 33333])])
+    assert len(whole) == len(pieces) == 16000
+    assert np.array_equal(whole, pieces)
+
+
+def test_decimator_keeps_passband_and_removes_aliases():
+    def rms(x):
+        return np.sqrt(np.mean(np.square(x[200:], dtype=np.float64)))
+
+    low = Decimator(3).process(sine(1000, 0.5, 48000))
+    high = Decimator(3).process(sine(12000, 0.5, 48000))  # above the new 8 kHz Nyquist rate
+    assert abs(rms(low) / (10000 / np.sqrt(2)) - 1) < 0.05
+    assert rms(high) < 100
+
+
+def test_silence_trimmer_shortens_long_pauses_but_keeps_speech():
+    rate = 16000
+    speech = sine(300, 0.5, rate)
+    audio = np.concatenate([speech, np.zeros(rate * 3, dtype=np.int16), speech])
+    trimmer = SilenceTrimmer(rate, pad_ms=300)
+    out = np.concatenate([trimmer.process(block) for block in np.array_split(audio, 7)])
+    # both utterances survive, three seconds of silence shrink to about 2 * 300 ms
+    assert len(speech) * 2 <= len(out) < len(speech) * 2 + int(0.7 * rate)
+
+
+def test_transcode_downsamples_to_flac(tmp_path):
+    src = tmp_path / "meeting.wav"
+    sf.write(src, sine(440, 2.0, 48000), 48000, subtype="PCM_16")
+    stats = transcode(str(src), str(tmp_path / "meeting.flac"))
+    info = sf.info(tmp_path / "meeting.flac")
+    assert info.samplerate == 16000
+    assert info.frames == 32000
+    assert stats["seconds_in"] == stats["seconds_out"] == 2.0
+    assert stats["bytes_out"] < stats["bytes_in"]
+
+
+def test_iter_file_streams_in_chunks(tmp_path):
+    path = tmp_path / "blob"
+    path.write_bytes(bytes(range(256)) * 10)
+    chunks = list(iter_file(str(path), chunk_size=1000))
+    assert [len(chunk) for chunk in chunks] == [1000, 1000, 560]
+    assert b"".join(chunks) == path.read_bytes()
@@ -0,0 +1,135 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from bot.features.smart_qa.retrieval import Passage
+from bot.features.smart_qa.vector_index import (
+    COMPACT_DEAD_RATIO,
+    EmbeddingProvider,
+    HashingEmbeddingProvider,
+    SemanticIndex,
+    VectorIndex,
+)
+
+DIM = 32
+
+
+def passages(doc_id, count):
+    return [Passage(doc_id, "c", "C", doc_id, f"Docs/{doc_id}", "", f"{doc_id} part {i}", i, 3) for i in range(count)]
+
+
+def unit_vectors(rng, count):
+    vectors = rng.standard_normal((count, DIM)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def test_providers_must_implement_embed():
+    class Incomplete(EmbeddingProvider):
+        pass
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+def test_hashing_provider_is_deterministic_and_normalized():
+    provider = HashingEmbeddingProvider(dim=64)
+    a, b, empty = asyncio.run(provider.embed(["flash the BMS", "flash the BMS", ""]))
+    assert np.array_equal(a, b)
+    assert abs(np.linalg.norm(a) - 1) < 1e-6
+    assert not empty.any()
+
+
+def test_int8_quantization_round_trips_within_one_step():
+    rng = np.random.default_rng(0)
+    matrix = unit_vectors(rng, 200)
+    q, scales = VectorIndex._quantize(matrix)
+    assert q.dtype == np.int8
+    assert np.abs(q.astype(np.float32) * scales[:, None] - matrix).max() <= scales.max() / 2 + 1e-7
+    zero_q, zero_scales = VectorIndex._quantize(np.zeros((1, DIM), dtype=np.float32))
+    assert not zero_q.any() and zero_scales[0] == 1.0
+
+
+def test_quantized_search_matches_float_search(tmp_path):
+    rng = np.random.default_rng(1)
+    exact, quantized = VectorIndex(str(tmp_path / "f"), quantize=False), VectorIndex(str(tmp_path / "q"), quantize=True)
+    for index in (exact, quantized):
+        index.load("test")
+    for n in range(30):
+        vectors = unit_vectors(rng, 4)
+        for index in (exact, quantized):
+            index.add_document(f"d{n}", "1", passages(f"d{n}", 4), vectors)
+    query = unit_vectors(rng, 1)[0]
+    exact_scores = {row["passage"]["text"]: score for score, row in exact.search(query, 120)}
+    quantized_scores = {row["passage"]["text"]: score for score, row in quantized.search(query, 120)}
+    assert exact_scores.keys() == quantized_scores.keys()
+    assert max(abs(exact_scores[text] - quantized_scores[text]) for text in exact_scores) < 0.02
+
+
+def test_incremental_quantization_matches_a_full_pass(tmp_path):
+    rng = np.random.default_rng(2)
+    index = VectorIndex(str(tmp_path), quantize=True)
+    index.load("test")
+    for n in range(40):
+        doc_id = f"d{n % 10}"
+        index.remove_document(doc_id)
+        index.add_document(doc_id, str(n), passages(doc_id, 3), unit_vectors(rng, 3))
+        q, scales = VectorIndex._quantize(index._matrix)
+        assert np.array_equal(index._q, q) and np.array_equal(index._scales, scales)
+    index.compact()
+    q, scales = VectorIndex._quantize(index._matrix)
+    assert len(index.rows) == 30
+    assert np.array_equal(index._q, q) and np.array_equal(index._scales, scales)
+
+
+def test_updates_tombstone_rows_and_compaction_drops_them(tmp_path):
+    rng = np.random.default_rng(3)
+    index = VectorIndex(str(tmp_path))
+    index.load("test")
+    index.add_document("a", "1", passages("a", 5), unit_vectors(rng, 5))
+    index.add_document("b", "1", passages("b", 5), unit_vectors(rng, 5))
+    index.remove_document("a")
+    index.add_document("a", "2", passages("a", 1), unit_vectors(rng, 1))
+    assert len(index) == 6 and len(index.rows) == 11
+    assert 5 / 11 >= COMPACT_DEAD_RATIO
+    index.compact()
+    assert len(index.rows) == 6
+    assert {row["doc_id"] for _, row in index.search(unit_vectors(rng, 1)[0], 10)} == {"a", "b"}
+
+
+def test_index_survives_a_reload_but_not_a_provider_change(tmp_path):
+    rng = np.random.default_rng(4)
+    index = VectorIndex(str(tmp_path), quantize=True)
+    index.load("hashing")
+    index.add_document("a", "1", passages("a", 2), unit_vectors(rng, 2))
+    index.save()
+    query = unit_vectors(rng, 1)[0]
+
+    reloaded = VectorIndex(str(tmp_path), quantize=True)
+    reloaded.load("hashing")
+    assert reloaded.versions == {"a": "1"}
+    assert reloaded.search(query, 2) == index.search(query, 2)
+    reloaded.load("openai")
+    assert len(reloaded) == 0
+
+
+def test_semantic_index_syncs_only_changed_documents(tmp_path):
+    class CountingProvider(HashingEmbeddingProvider):
+        embedded = 0
+
+        async def embed(self, texts):
+            CountingProvider.embedded += len(texts)
+            return await super().embed(texts)
+
+    semantic = SemanticIndex(CountingProvider(dim=DIM), VectorIndex(str(tmp_path), quantize=True))
+
+    async def run():
+        await semantic.sync({"a": ("1", passages("a", 2)), "b": ("1", passages("b", 3))})
+        first = CountingProvider.embedded
+        await semantic.sync({"a": ("2", passages("a", 1)), "b": ("1", passages("b", 3))})
+        second = CountingProvider.embedded - first
+        return first, second, await semantic.search("a part 0", k=1)
+
+    first, second, hits = asyncio.run(run())
+    assert (first, second) == (5, 1)
+    assert hits[0][1].text == "a part 0"
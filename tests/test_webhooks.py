@@ -0,0 +1,135 @@
+import asyncio
+import json
+
+from aiohttp import ClientSession, web
+
+from bot.features.auto_pr_review.webhooks import SIGNATURE_HEADER, WebhookServer, sign_payload, verify_signature
+
+SECRET = "s3cret"
+
+
+def test_verify_signature():
+    body = b'{"ref": "refs/heads/main"}'
+    signature = sign_payload(SECRET, body)
+    assert signature.startswith("sha256=")
+    assert verify_signature(SECRET, body, signature)
+    assert not verify_signature(SECRET, body + b" ", signature)
+    assert not verify_signature("other", body, signature)
+    assert not verify_signature(SECRET, body, None)
+    assert not verify_signature(SECRET, body, "")
+
+
+async def serve(server):
+    runner = web.AppRunner(server.make_app())
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://127.0.0.1:{port}{server.path}"
+
+
+async def deliver(session, url, event, payload, secret=SECRET, delivery=None):
+    body = json.dumps(payload).encode()
+    headers = {"X-GitHub-Event": event, SIGNATURE_HEADER: sign_payload(secret, body)}
+    if delivery:
+        headers["X-GitHub-Delivery"] = delivery
+    async with session.post(url, data=body, headers=headers) as resp:
+        return resp.status
+
+
+def test_bad_signature_is_rejected_before_the_handler():
+    async def run():
+        handled = []
+
+        async def handler(event, payload):
+            handled.append((event, payload))
+
+        server = WebhookServer(handler, SECRET)
+        runner, url = await serve(server)
+        try:
+            async with ClientSession() as session:
+                assert await deliver(session, url, "push", {"n": 1}, secret="wrong") == 401
+                async with session.post(url, data=b"{}", headers={"X-GitHub-Event": "push"}) as resp:
+                    assert resp.status == 401
+                assert await deliver(session, url, "push", {"n": 2}) == 202
+            await server.drain()
+        finally:
+            await runner.cleanup()
+        return server, handled
+
+    server, handled = asyncio.run(run())
+    assert server.rejected == 2
+    assert server.received == 1
+    assert handled == [("push", {"n": 2})]
+
+
+def test_other_events_and_redeliveries_are_not_handled():
+    async def run():
+        handled = []
+
+        async def handler(event, payload):
+            handled.append(event)
+
+        server = WebhookServer(handler, SECRET)
+        runner, url = await serve(server)
+        try:
+            async with ClientSession() as session:
+                assert await deliver(session, url, "ping", {"zen": "hi"}) == 202
+                assert await deliver(session, url, "pull_request", {"n": 1}, delivery="d1") == 202
+                assert await deliver(session, url, "pull_request", {"n": 1}, delivery="d1") == 202
+            await server.drain()
+        finally:
+            await runner.cleanup()
+        return handled
+
+    assert asyncio.run(run()) == ["pull_request"]
+
+
+def test_stop_waits_for_accepted_deliveries():
+    async def run():
+        handled = []
+
+        async def handler(event, payload):
+            await asyncio.sleep(0.05)
+            handled.append(payload["n"])
+
+        server = WebhookServer(handler, SECRET)
+        runner, url = await serve(server)
+        try:
+            async with ClientSession() as session:
+                for n in range(3):
+                    assert await deliver(session, url, "push", {"n": n}) == 202
+        finally:
+            await runner.cleanup()
+        await server.stop(timeout=5)
+        return server, handled
+
+    server, handled = asyncio.run(run())
+    assert sorted(handled) == [0, 1, 2]
+    assert not server._tasks
+
+
+def test_stop_cancels_deliveries_that_outlast_the_timeout():
+    async def run():
+        cancelled = []
+
+        async def handler(event, payload):
+            try:
+                await asyncio.sleep(60)
+            except asyncio.CancelledError:
+                cancelled.append(payload["n"])
+                raise
+
+        server = WebhookServer(handler, SECRET)
+        runner, url = await serve(server)
+        try:
+            async with ClientSession() as session:
+                assert await deliver(session, url, "push", {"n": 1}) == 202
+        finally:
+            await runner.cleanup()
+        await server.stop(timeout=0.05)
+        return server, cancelled
+
+    server, cancelled = asyncio.run(run())
+    assert cancelled == [1]
+    assert not server._tasks